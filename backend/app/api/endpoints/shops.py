@@ -1,36 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
 from app.core.database import get_db
-from app.schemas.shop import Shop, ShopCreate, ShopUpdate, ShopList, RegionRanking, Region
-from app.models.shop import Shop as ShopModel, ShopStatus
-from app.services.shopify_detector import ShopifyDetector
-from app.services.fashion_classifier import FashionClassifier
+from app.core.cache import bump_data_version, response_cache
+from app.core.config import settings
+from app.core.http_cache import conditional_response, data_version_etag, make_etag
+from app.schemas.shop import Shop, ShopCreate, ShopUpdate, ShopList, ShopFacets, RegionRanking, Region
+from app.models.shop import Shop as ShopModel, ShopAlias, ShopStatus, Region as RegionModel
+from app.services.canonical import apply_canonical_domain
+from app.services.facets import compute_facets
+from app.services.result_writer import ResultWriter
+from app.services.search import search_shops
+from app.services.seen_domains import SeenDomainStore
+from app.utils.domains import normalize_domain
+from app.utils.singleflight import SingleFlight
 
 router = APIRouter()
 
+# Deduplicates in-flight crawls per domain and operation, across workers
+crawl_flight = SingleFlight("crawl")
+
 @router.get("/", response_model=ShopList)
 def get_shops(
+    request: Request,
+    response: Response,
     region: Optional[Region] = Query(None, description="Filter by region"),
     is_shopify: Optional[bool] = Query(None, description="Filter by Shopify status"),
     is_womens_fashion: Optional[bool] = Query(None, description="Filter by women's fashion status"),
+    q: Optional[str] = Query(None, min_length=1, max_length=200, description="Search name, domain and description"),
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(20, ge=1, le=100, description="Page size"),
     db: Session = Depends(get_db)
 ):
     """Get list of shops with optional filters"""
+    # Unchanged data version: answer 304 before running any query
+    etag = data_version_etag("shops", request.url.query)
+    not_modified = conditional_response(request, response, etag, settings.HTTP_CACHE_LIST_MAX_AGE)
+    if not_modified:
+        return not_modified
+    
     query = db.query(ShopModel)
     
     if region:
-        query = query.filter(ShopModel.region == region)
+        query = query.filter(ShopModel.region == RegionModel(region.value))
     if is_shopify is not None:
         query = query.filter(ShopModel.is_shopify == is_shopify)
     if is_womens_fashion is not None:
         query = query.filter(ShopModel.is_womens_fashion == is_womens_fashion)
     
-    total = query.count()
+    total_query = query
+    if q:
+        # Ranked by relevance blended with overall_score
+        query = search_shops(db, query, q)
+        total_query = query.order_by(None)
+    
+    total = total_query.count()
     shops = query.offset((page - 1) * size).limit(size).all()
     
     return ShopList(
@@ -40,25 +66,75 @@ def get_shops(
         size=size
     )
 
+@router.get("/facets", response_model=ShopFacets)
+def get_shop_facets(
+    request: Request,
+    response: Response,
+    region: Optional[Region] = Query(None, description="Filter by region"),
+    is_shopify: Optional[bool] = Query(None, description="Filter by Shopify status"),
+    is_womens_fashion: Optional[bool] = Query(None, description="Filter by women's fashion status"),
+    db: Session = Depends(get_db)
+):
+    """Get shop counts per region, Shopify and fashion status, and score histograms"""
+    # Keyed by data version, so any write makes earlier results unreachable
+    version = response_cache.data_version()
+    etag = data_version_etag("facets", request.url.query)
+    not_modified = conditional_response(request, response, etag, settings.HTTP_CACHE_FACETS_MAX_AGE)
+    if not_modified:
+        return not_modified
+    
+    key = f"facets:v{version}:{region.value if region else ''}:{is_shopify}:{is_womens_fashion}"
+    facets = response_cache.get(key)
+    if facets is None:
+        facets = compute_facets(
+            db,
+            region=RegionModel(region.value) if region else None,
+            is_shopify=is_shopify,
+            is_womens_fashion=is_womens_fashion,
+        )
+        facets["data_version"] = version
+        facets["generated_at"] = datetime.utcnow()
+        response_cache.set(key, facets, settings.FACETS_CACHE_TTL)
+    return facets
+
 @router.get("/{shop_id}", response_model=Shop)
-def get_shop(shop_id: int, db: Session = Depends(get_db)):
+def get_shop(shop_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get a specific shop by ID"""
     shop = db.query(ShopModel).filter(ShopModel.id == shop_id).first()
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
+    
+    # updated_at changes on every write to the row
+    etag = make_etag("shop", shop.id, shop.updated_at.isoformat() if shop.updated_at else "")
+    not_modified = conditional_response(request, response, etag, settings.HTTP_CACHE_SHOP_MAX_AGE)
+    if not_modified:
+        return not_modified
     return shop
 
 @router.post("/", response_model=Shop)
 def create_shop(shop: ShopCreate, db: Session = Depends(get_db)):
     """Create a new shop"""
+    domain = normalize_domain(shop.domain)
+    if not domain:
+        raise HTTPException(status_code=400, detail="Invalid domain")
+    
     # Check if shop already exists
-    existing_shop = db.query(ShopModel).filter(ShopModel.domain == shop.domain).first()
+    existing_shop = db.query(ShopModel).filter(ShopModel.domain == domain).first()
     if existing_shop:
         raise HTTPException(status_code=400, detail="Shop with this domain already exists")
     
-    db_shop = ShopModel(**shop.dict())
+    alias = db.query(ShopAlias).filter(ShopAlias.domain == domain).first()
+    if alias:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Domain is an alias of shop {alias.shop_id}"
+        )
+    
+    db_shop = ShopModel(**{**shop.dict(), 'domain': domain, 'region': RegionModel(shop.region.value)})
     db.add(db_shop)
     db.commit()
+    bump_data_version()
+    SeenDomainStore.record([domain])
     db.refresh(db_shop)
     return db_shop
 
@@ -75,6 +151,7 @@ def update_shop(shop_id: int, shop_update: ShopUpdate, db: Session = Depends(get
     
     db_shop.updated_at = datetime.utcnow()
     db.commit()
+    bump_data_version()
     db.refresh(db_shop)
     return db_shop
 
@@ -87,49 +164,83 @@ def delete_shop(shop_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_shop)
     db.commit()
+    bump_data_version()
     return {"message": "Shop deleted successfully"}
 
 @router.post("/{shop_id}/verify-shopify")
-def verify_shopify(shop_id: int, db: Session = Depends(get_db)):
-    """Verify if a shop is built with Shopify"""
+def verify_shopify(shop_id: int, trace: bool = False, db: Session = Depends(get_db)):
+    """Verify if a shop is built with Shopify; trace=true adds per-stage timings"""
     db_shop = db.query(ShopModel).filter(ShopModel.id == shop_id).first()
     if not db_shop:
         raise HTTPException(status_code=404, detail="Shop not found")
     
-    detector = ShopifyDetector()
-    result = detector.detect_shopify(db_shop.domain)
-    
-    # Update shop with results
-    db_shop.is_shopify = result['is_shopify']
-    db_shop.shopify_verified_at = datetime.utcnow()
-    db_shop.last_checked = datetime.utcnow()
+    def _verify_and_store() -> dict:
+        # Imported on first use: the crawl stack (requests, bs4, dnspython) is slow to load
+        from app.services.shopify_detector import ShopifyDetector
+        detector = ShopifyDetector()
+        result = detector.detect_shopify(
+            db_shop.domain, previous_result=db_shop.last_detection_result, trace=trace
+        )
+        
+        # Update shop with results
+        writer = ResultWriter(db)
+        writer.add_detection(db_shop.id, db_shop.domain, result)
+        writer.flush()
+        
+        # Merge the shop into an existing row if it is an alias of the same store
+        merged_into = None
+        if not result.get('unchanged') and 'error' not in result:
+            merged_into = apply_canonical_domain(db, db_shop, result)
+        
+        db.commit()
+        bump_data_version()
+        return {
+            "verification_result": result,
+            "merged_into_shop_id": merged_into.id if merged_into else None
+        }
     
-    db.commit()
+    # Concurrent verifications of the same domain share one crawl and one write
+    # Traced calls only coalesce with each other, so their timings are their own
+    key = f"verify-shopify:{db_shop.domain}" + (":trace" if trace else "")
+    outcome, _ = crawl_flight.do(key, _verify_and_store)
     db.refresh(db_shop)
     
     return {
         "shop_id": shop_id,
-        "verification_result": result,
+        "verification_result": outcome["verification_result"],
+        "canonical_domain": db_shop.canonical_domain,
+        "merged_into_shop_id": outcome["merged_into_shop_id"],
         "updated_shop": db_shop
     }
 
 @router.post("/{shop_id}/classify-fashion")
-def classify_fashion(shop_id: int, db: Session = Depends(get_db)):
-    """Classify if a shop sells women's fashion"""
+def classify_fashion(shop_id: int, trace: bool = False, db: Session = Depends(get_db)):
+    """Classify if a shop sells women's fashion; trace=true adds per-stage timings"""
     db_shop = db.query(ShopModel).filter(ShopModel.id == shop_id).first()
     if not db_shop:
         raise HTTPException(status_code=404, detail="Shop not found")
     
-    classifier = FashionClassifier()
-    result = classifier.classify_fashion(db_shop.domain)
-    
-    # Update shop with results
-    db_shop.is_womens_fashion = result['is_womens_fashion']
-    db_shop.category_confidence = result['confidence']
-    db_shop.category_verified_at = datetime.utcnow()
-    db_shop.last_checked = datetime.utcnow()
+    def _classify_and_store() -> dict:
+        from app.services.catalog_crawler import shop_catalog
+        from app.services.fashion_classifier import FashionClassifier
+        classifier = FashionClassifier()
+        result = classifier.classify_fashion(
+            db_shop.domain, previous_result=db_shop.last_classification_result, trace=trace,
+            catalog=shop_catalog(db_shop)
+        )
+        
+        # Update shop with results
+        writer = ResultWriter(db)
+        writer.add_classification(db_shop.id, result)
+        writer.flush()
+        
+        db.commit()
+        bump_data_version()
+        return result
     
-    db.commit()
+    # Concurrent classifications of the same domain share one crawl and one write
+    key = f"classify-fashion:{db_shop.domain}" + (":trace" if trace else "")
+    result, _ = crawl_flight.do(key, _classify_and_store)
     db.refresh(db_shop)
     
     return {
@@ -141,12 +252,19 @@ def classify_fashion(shop_id: int, db: Session = Depends(get_db)):
 @router.get("/rankings/{region}", response_model=RegionRanking)
 def get_region_rankings(
     region: Region,
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Number of top shops to return"),
     db: Session = Depends(get_db)
 ):
     """Get top ranked shops for a specific region"""
+    etag = data_version_etag("rankings", region.value, limit)
+    not_modified = conditional_response(request, response, etag, settings.HTTP_CACHE_RANKINGS_MAX_AGE)
+    if not_modified:
+        return not_modified
+    
     shops = db.query(ShopModel).filter(
-        ShopModel.region == region,
+        ShopModel.region == RegionModel(region.value),
         ShopModel.is_shopify == True,
         ShopModel.is_womens_fashion == True,
         ShopModel.status == ShopStatus.ACTIVE
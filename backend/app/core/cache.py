@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import redis
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+
+class ResponseCache:
+    """Cache of derived API data, invalidated by a global data version
+
+    Writers call bump_data_version() after committing changes to shops;
+    readers put the current version in their cache keys, so every entry
+    computed before the write is simply never looked up again and ages
+    out through its TTL. The version and entries live in Redis, shared by
+    all workers. While Redis is unreachable a bounded in-process cache and
+    counter take over, and Redis is retried after CACHE_REDIS_RETRY_INTERVAL.
+    """
+
+    def __init__(self, namespace: str = "topshope:cache", max_local_entries: int = None):
+        self.namespace = namespace
+        self.max_local_entries = max_local_entries or settings.CACHE_LOCAL_MAX_ENTRIES
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._local_version = 0
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    @property
+    def version_key(self) -> str:
+        return f"{self.namespace}:data_version"
+
+    def data_version(self) -> int:
+        """Current data version, changed by every bump_data_version()"""
+        version = self.shared_data_version()
+        return self._local_version if version is None else version
+
+    def shared_data_version(self) -> Optional[int]:
+        """The data version as seen by all workers, or None while Redis is unreachable"""
+        client = self._client()
+        if client is not None:
+            try:
+                return int(client.get(self.version_key) or 0)
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return None
+
+    def bump_data_version(self) -> int:
+        """Invalidate everything cached so far; call after committing writes"""
+        with self._lock:
+            self._local_version += 1
+            # Entries keyed by older versions can no longer be hit
+            self._local.clear()
+        client = self._client()
+        if client is not None:
+            try:
+                return client.incr(self.version_key)
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return self._local_version
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached JSON value for key, or None"""
+        client = self._client()
+        if client is not None:
+            try:
+                payload = client.get(f"{self.namespace}:{key}")
+                return json.loads(payload) if payload is not None else None
+            except redis.RedisError as e:
+                self._redis_failed(e)
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: int):
+        """Cache a JSON-serializable value for ttl seconds"""
+        client = self._client()
+        if client is not None:
+            try:
+                client.set(f"{self.namespace}:{key}", json.dumps(value, default=str), ex=ttl)
+                return
+            except redis.RedisError as e:
+                self._redis_failed(e)
+
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def _client(self) -> Optional[redis.Redis]:
+        if time.monotonic() < self._redis_down_until:
+            return None
+        return get_redis()
+
+    def _redis_failed(self, error: Exception):
+        if time.monotonic() >= self._redis_down_until:
+            print(f"Response cache falling back to process memory: {error}")
+        self._redis_down_until = time.monotonic() + settings.CACHE_REDIS_RETRY_INTERVAL
+
+
+response_cache = ResponseCache()
+
+
+def bump_data_version() -> int:
+    """Invalidate cached API data after shops were written"""
+    return response_cache.bump_data_version()
@@ -8,6 +8,7 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
+    REDIS_SOCKET_TIMEOUT: float = 2.0
     
     # API
     API_V1_STR: str = "/api/v1"
@@ -24,7 +25,129 @@ class Settings(BaseSettings):
     SCRAPING_DELAY: float = 1.0  # seconds between requests
     MAX_RETRIES: int = 3
     REQUEST_TIMEOUT: int = 30
-    
+    PROBE_TIMEOUT: float = 5.0  # seconds per storefront JSON probe
+    PROBE_MAX_BYTES: int = 65536  # probe bodies are cut off here; a verdict needs only the start
+
+    # Adaptive fetch timeouts (crawl pipeline): budgets follow each host's recent latency
+    CRAWL_CONNECT_TIMEOUT: float = 10.0  # ceiling for connect timeouts; REQUEST_TIMEOUT caps reads
+    CRAWL_DOMAIN_DEADLINE: float = 30.0  # ceiling for all of a domain's requests (homepage and probes)
+    ADAPTIVE_TIMEOUT_PERCENTILE: float = 95.0
+    ADAPTIVE_TIMEOUT_MULTIPLIER: float = 3.0  # budget = multiplier x the host's latency percentile
+    ADAPTIVE_TIMEOUT_MIN: float = 3.0  # seconds; no budget is shorter
+    ADAPTIVE_TIMEOUT_BACKOFF: float = 2.0  # budget growth per retry of a host that ran out of time
+    HOST_LATENCY_SAMPLES: int = 16  # recent fetches kept per host (and stored on the shop)
+    HOST_LATENCY_MIN_SAMPLES: int = 3  # hosts with fewer get the fleet-wide budget
+    HOST_LATENCY_MAX_HOSTS: int = 100000
+    FLEET_LATENCY_SAMPLES: int = 2000  # recent fetches over all hosts
+    FLEET_LATENCY_MIN_SAMPLES: int = 200  # until then every host gets the ceiling
+
+    # DNS cache
+    DNS_CACHE_MAX_ENTRIES: int = 100000
+    DNS_DEFAULT_TTL: int = 300  # used when the resolver does not report a TTL
+    DNS_MIN_TTL: int = 30
+    DNS_MAX_TTL: int = 3600
+    DNS_NEGATIVE_TTL: int = 600  # how long NXDOMAIN answers are cached
+    DNS_TIMEOUT: float = 5.0
+    DNS_RESOLVE_CONCURRENCY: int = 100
+
+    # Discovery
+    DISCOVERY_VERIFY_CONCURRENCY: int = 10  # domains verified in parallel
+    SEEN_SET_CAPACITY: int = 10_000_000  # expected number of known domains
+    SEEN_SET_ERROR_RATE: float = 0.01
+    SEEN_SET_REDIS_KEY: str = "topshope:seen_domains"
+    SEEN_SET_SNAPSHOT_TTL: int = 60 * 60 * 24  # rebuild from the shops table daily
+    SEEN_SET_PENDING_KEY: str = "topshope:seen_domains:pending"  # domains stored since the last snapshot
+
+    # Single-flight deduplication of in-flight crawls
+    SINGLEFLIGHT_LOCK_TTL: int = 120  # seconds before a crashed leader's lock expires
+    SINGLEFLIGHT_WAIT_TIMEOUT: float = 120.0
+    SINGLEFLIGHT_RESULT_TTL: int = 60
+    SINGLEFLIGHT_POLL_INTERVAL: float = 0.2
+
+    # Batched result writes
+    RESULT_WRITER_BATCH_SIZE: int = 1000
+    RESULT_WRITER_FLUSH_INTERVAL: float = 5.0  # seconds
+
+    # Crawl pipeline
+    CRAWL_PROCESS_WORKERS: int = 0  # parse/classify processes, 0 = one per CPU
+    CRAWL_FETCH_CONCURRENCY: int = 50  # concurrent homepage fetches
+
+    # Distributed crawl queue (Redis, REDIS_URL)
+    CRAWL_QUEUE_NAMESPACE: str = "topshope:crawl"
+    CRAWL_QUEUE_SHARDS: int = 16  # fixed once items are queued; changing it strands queued items
+    CRAWL_LEASE_TIMEOUT: float = 300.0  # seconds a leased item stays invisible without a heartbeat
+    CRAWL_HEARTBEAT_INTERVAL: float = 60.0
+    CRAWL_MAX_ATTEMPTS: int = 5  # leases before an item is dead-lettered
+    CRAWL_RETRY_DELAY: float = 300.0
+    CRAWL_HOST_MIN_INTERVAL: float = 60.0  # seconds between leases of the same host
+    CRAWL_WORKER_BATCH_SIZE: int = 200
+    CRAWL_WORKER_POLL_INTERVAL: float = 5.0
+
+    # Prometheus /metrics of the worker scripts (crawl_worker.py run, crawl_catalogs.py, discover_shops.py)
+    WORKER_METRICS_PORT: int = 0  # 0 = not served; each worker process on a host needs its own port
+
+    # Headless rendering of JS-only storefronts, used only when the HTTP result is inconclusive
+    RENDERING_ENABLED: bool = False  # needs playwright and `playwright install chromium`
+    RENDER_POOL_SIZE: int = 4  # browser contexts, i.e. concurrent renders per process
+    RENDER_CONTEXT_MAX_PAGES: int = 50  # pages before a context is recycled
+    RENDER_PAGE_TIMEOUT: float = 15.0  # seconds per navigation
+    RENDER_IDLE_TIMEOUT: float = 3.0  # extra wait for client-side rendering to settle
+    RENDER_QUEUE_TIMEOUT: float = 30.0  # wait for a free context before giving up
+    RENDER_BLOCKED_RESOURCES: list = ["image", "font", "media"]
+    RENDER_MIN_TEXT_CHARS: int = 200  # pages showing less text are treated as JS shells
+    RENDER_UNCERTAINTY_MARGIN: float = 0.15  # render when confidence is this close to the threshold
+
+    # Catalog crawl of Shopify stores (/products.json, /collections.json)
+    CATALOG_PAGE_SIZE: int = 250  # products per page, Shopify's maximum
+    CATALOG_MAX_PAGES: int = 40  # per endpoint, so at most 10000 products per store
+    CATALOG_CONCURRENCY: int = 8  # stores crawled at once; pages of one store are sequential
+    CATALOG_BATCH_SIZE: int = 200  # shops read from the database and written back per batch
+    CATALOG_PRICE_ACCURACY: float = 0.01  # relative error of the price percentiles
+    CATALOG_MIN_PRODUCTS: int = 5  # smaller catalogs do not affect classification
+    CATALOG_CLASSIFICATION_WEIGHT: float = 0.6  # share of the catalog in the fashion confidence
+
+    # Archive of fetched homepages, replayed offline after rule changes (replay_archive.py)
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_DIR: str = ""  # absolute path, required when ARCHIVE_ENABLED
+    ARCHIVE_COMPRESSION_LEVEL: int = 6  # zstd level; higher is smaller and slower to write
+    ARCHIVE_RETENTION_DAYS: float = 30.0
+    ARCHIVE_KEEP_LATEST: int = 1  # newest pages per domain kept past the retention period
+    ARCHIVE_REPLAY_BATCH_SIZE: int = 1000  # pages analyzed and written per batch
+
+    # Bits two page simhashes may differ by and still count as unchanged
+    CONTENT_SIMHASH_THRESHOLD: int = 3
+
+    # Fashion classification
+    FASHION_CLASSIFIER_MODE: str = "keyword"  # "keyword" or "model"
+    FASHION_MODEL_NAME: str = "typeform/distilbert-base-uncased-mnli"
+    FASHION_MODEL_QUANTIZE: bool = True
+    FASHION_MODEL_BATCH_SIZE: int = 32
+    FASHION_MODEL_MAX_CHARS: int = 2000  # page text passed to the model
+    FASHION_MODEL_THRESHOLD: float = 0.5
+
+    # Cached API aggregates, invalidated on writes via a data version
+    CACHE_REDIS_RETRY_INTERVAL: float = 30.0  # seconds on the in-process fallback after a Redis error
+    CACHE_LOCAL_MAX_ENTRIES: int = 1024
+    FACETS_CACHE_TTL: int = 300  # bounds staleness from writers that do not bump the version
+
+    # HTTP caching: Cache-Control max-age per route (seconds); clients revalidate with the ETag
+    HTTP_CACHE_SHOP_MAX_AGE: int = 60
+    HTTP_CACHE_LIST_MAX_AGE: int = 30
+    HTTP_CACHE_RANKINGS_MAX_AGE: int = 300
+    HTTP_CACHE_FACETS_MAX_AGE: int = 60
+
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Search: share of overall_score in the ranking of q= results (rest is relevance)
+    SEARCH_SCORE_WEIGHT: float = 0.3
+
+    # Scoring
+    SCORING_WEIGHTS: str = "default"  # preset name in app.services.scoring.WEIGHT_PRESETS
+    SCORING_BATCH_SIZE: int = 100000
+
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
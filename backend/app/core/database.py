@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import Column, Integer, Table, create_engine, delete, insert, inspect, select, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 # Create database engine
 engine = create_engine(
@@ -9,6 +12,7 @@ engine = create_engine(
     pool_pre_ping=True,
     pool_recycle=300,
 )
+instrument_engine(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -16,6 +20,18 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create base class for models
 Base = declarative_base()
 
+# Bump when models or the search indexes change, so the next boot runs create_tables()
+SCHEMA_VERSION = 5
+
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, nullable=False),
+)
+
+# PostgreSQL advisory lock key serializing schema changes between processes
+SCHEMA_LOCK_KEY = 0x73686f70
+
 def get_db() -> Session:
     """Dependency to get database session"""
     db = SessionLocal()
@@ -24,9 +40,93 @@ def get_db() -> Session:
     finally:
         db.close()
 
+@contextmanager
+def schema_lock():
+    """
+    Hold a PostgreSQL advisory lock while changing the schema
+
+    Every API and worker process checks the schema at boot; without the
+    lock they would all issue the same CREATE and ALTER statements at once.
+    Other databases are used by a single process and need no lock.
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+            connection.commit()
+
 def create_tables():
-    """Create all tables"""
+    """Create missing tables, columns and search indexes, and record SCHEMA_VERSION"""
+    with schema_lock():
+        _create_tables()
+
+def _create_tables():
+    # Register the models, callers may not have imported them yet
+    import app.models.shop  # noqa: F401
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    from app.services.search import ensure_search_indexes
+    ensure_search_indexes(engine)
+    with engine.begin() as connection:
+        connection.execute(delete(schema_version))
+        connection.execute(insert(schema_version).values(version=SCHEMA_VERSION))
+
+def add_missing_columns():
+    """
+    Add nullable model columns missing from existing tables, with their indexes
+
+    create_all() only creates missing tables; this covers the common case
+    of a new optional column. Anything else needs reset_db.py --drop.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            added = set()
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added.add(column.name)
+                print(f"Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                if any(column.name in added for column in index.columns):
+                    index.create(connection)
+
+def current_schema_version() -> int:
+    """Schema version recorded in the database, 0 if none"""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(schema_version.c.version)).scalar() or 0
+    except DBAPIError:
+        # No schema_version table yet
+        return 0
+
+def ensure_schema() -> bool:
+    """
+    Run create_tables() only if the database is not at SCHEMA_VERSION
+
+    Cheap enough for every boot: a single-row read instead of create_all's
+    per-table introspection. Returns True if tables were created.
+    """
+    if current_schema_version() == SCHEMA_VERSION:
+        return False
+    with schema_lock():
+        # Another process may have brought the schema up to date while we waited
+        if current_schema_version() == SCHEMA_VERSION:
+            return False
+        _create_tables()
+    return True
 
 def drop_tables():
     """Drop all tables (use with caution!)"""
@@ -35,4 +135,4 @@ def drop_tables():
 def recreate_tables():
     """Drop and recreate all tables"""
     drop_tables()
-    create_tables() 
\ No newline at end of file
+    create_tables()
@@ -0,0 +1,70 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+from app.core.cache import response_cache
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given parts (ids, timestamps, data versions, query strings)
+
+    Weak, because compressed and uncompressed bodies of the same
+    representation are not byte-identical.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def data_version_etag(*parts) -> Optional[str]:
+    """
+    ETag for data derived from many shops (lists, rankings, aggregates)
+
+    None while the data version is not shared through Redis: a per-process
+    counter misses writes handled by other workers, and a 304 based on it
+    could confirm stale data indefinitely.
+    """
+    version = response_cache.shared_data_version()
+    if version is None:
+        return None
+    return make_etag(version, *parts)
+
+
+def cache_control(max_age: int) -> str:
+    """Cache-Control for API data: cacheable, revalidated with the ETag once stale"""
+    if max_age <= 0:
+        return "no-cache"
+    return f"public, max-age={max_age}"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of etag against the request's If-None-Match"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def conditional_response(request: Request, response: Response, etag: Optional[str], max_age: int) -> Optional[Response]:
+    """
+    Attach validators to a GET response, short-circuiting unchanged resources
+
+    Sets ETag (unless None) and Cache-Control on response. Returns a
+    bodiless 304 to send instead when the client already holds this
+    version, else None.
+    """
+    if etag is None:
+        response.headers["Cache-Control"] = cache_control(max_age)
+        return None
+    headers = {"ETag": etag, "Cache-Control": cache_control(max_age)}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,304 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+    start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.domains import public_suffix
+
+# Seconds; covers fast cached reads up to slow crawls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'topshope_http_request_duration_seconds',
+    'API request latency',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+
+DB_QUERY_DURATION = Histogram(
+    'topshope_db_query_duration_seconds',
+    'Database query execution time',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+
+FETCH_DURATION = Histogram(
+    'topshope_crawl_fetch_duration_seconds',
+    'Time to fetch a page or probe an endpoint',
+    ['source', 'target'],
+    buckets=LATENCY_BUCKETS
+)
+
+FETCH_BYTES = Counter(
+    'topshope_crawl_fetch_bytes',
+    'Bytes downloaded by the crawler',
+    ['source']
+)
+
+INDICATOR_CHECKS = Counter(
+    'topshope_shopify_indicator_checks',
+    'Shopify indicators evaluated',
+    ['indicator']
+)
+
+INDICATOR_HITS = Counter(
+    'topshope_shopify_indicator_hits',
+    'Shopify indicators that scored above zero',
+    ['indicator']
+)
+
+VERIFICATION_TIERS = Counter(
+    'topshope_shopify_verification_tiers',
+    'Shopify verifications by the last tier they needed (probe, homepage, render)',
+    ['source', 'tier']
+)
+
+VERIFICATION_REQUESTS = Histogram(
+    'topshope_shopify_verification_requests',
+    'HTTP requests made per Shopify verification',
+    ['source'],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 12)
+)
+
+VERIFICATION_BYTES = Histogram(
+    'topshope_shopify_verification_bytes',
+    'Bytes downloaded per Shopify verification',
+    ['source'],
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+
+CLASSIFICATION_DURATION = Histogram(
+    'topshope_classification_duration_seconds',
+    'Fashion classification time',
+    ['stage'],
+    buckets=LATENCY_BUCKETS
+)
+
+CRAWL_ERRORS = Counter(
+    'topshope_crawl_errors',
+    'Failed crawler requests',
+    ['source', 'kind', 'domain_class']
+)
+
+RENDER_DURATION = Histogram(
+    'topshope_render_duration_seconds',
+    'Headless browser render time per page',
+    ['outcome'],
+    buckets=LATENCY_BUCKETS
+)
+
+RENDER_CONTEXTS = Gauge(
+    'topshope_render_contexts',
+    'Browser contexts of the render pool',
+    ['state'],
+    multiprocess_mode='livesum'
+)
+
+RENDER_RECYCLES = Counter(
+    'topshope_render_context_recycles',
+    'Browser contexts closed and replaced after RENDER_CONTEXT_MAX_PAGES pages or an error'
+)
+
+# Collectors read at scrape time, added to the multiprocess registry as well
+_live_collectors = []
+
+# (stage, seconds) samples taken inside capture_classification_timings()
+_captured_timings: Optional[List[Tuple[str, float]]] = None
+
+
+def observe_fetch(source: str, target: str, seconds: float, size: int = 0):
+    """Record one crawler request; target is 'homepage' or 'api_probe'"""
+    FETCH_DURATION.labels(source, target).observe(seconds)
+    if size:
+        FETCH_BYTES.labels(source).inc(size)
+
+
+def record_verification(source: str, result: Dict):
+    """Count the tiers, requests and bytes a detection result needed"""
+    if not result.get('tiers'):
+        return
+    VERIFICATION_TIERS.labels(source, result['tiers'][-1]).inc()
+    VERIFICATION_REQUESTS.labels(source).observe(result['requests'])
+    VERIFICATION_BYTES.labels(source).observe(result['bytes'])
+
+
+def observe_classification(stage: str, seconds: float):
+    """Record a classification stage time ('analysis' per page, 'model' per batch)"""
+    if _captured_timings is not None:
+        _captured_timings.append((stage, seconds))
+    else:
+        CLASSIFICATION_DURATION.labels(stage).observe(seconds)
+
+
+@contextmanager
+def capture_classification_timings() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Collect classification timings instead of recording them
+
+    Samples observed in a ProcessPoolExecutor worker never reach the
+    parent's registry, so pool functions return the collected samples and
+    the parent records them with record_classification_timings().
+    """
+    global _captured_timings
+    _captured_timings = samples = []
+    try:
+        yield samples
+    finally:
+        _captured_timings = None
+
+
+def record_classification_timings(samples: Iterable[Tuple[str, float]]):
+    for stage, seconds in samples:
+        CLASSIFICATION_DURATION.labels(stage).observe(seconds)
+
+
+def record_indicators(indicators: Dict[str, float]):
+    """Count indicator evaluations and hits; hit rate = hits / checks"""
+    for name, score in indicators.items():
+        INDICATOR_CHECKS.labels(name).inc()
+        if score > 0:
+            INDICATOR_HITS.labels(name).inc()
+
+
+def record_crawl_error(source: str, domain: str, kind: str):
+    """
+    Count a crawler failure
+
+    kind is 'timeout', 'dns' or 'error'. Domains are bucketed by public
+    suffix (com, co.uk, myshopify.com, ...) to keep label cardinality low.
+    """
+    CRAWL_ERRORS.labels(source, kind, domain_class(domain)).inc()
+
+
+def domain_class(domain: str) -> str:
+    try:
+        return public_suffix(domain) or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+class PoolCollector:
+    """Report connection pool utilisation of an engine at scrape time"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.pool
+        for name, method, documentation in (
+            ('size', 'size', 'Configured pool size'),
+            ('checked_out', 'checkedout', 'Connections currently in use'),
+            ('checked_in', 'checkedin', 'Idle connections in the pool'),
+            ('overflow', 'overflow', 'Connections opened beyond the pool size'),
+        ):
+            # Only QueuePool-style pools expose these counters
+            if hasattr(pool, method):
+                yield GaugeMetricFamily(f'topshope_db_pool_{name}', documentation, value=getattr(pool, method)())
+
+
+def instrument_engine(engine: Engine):
+    """Time every query and expose pool gauges for an engine"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_start_time'].pop()
+        DB_QUERY_DURATION.labels(_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(context):
+        starts = context.connection.info.get('query_start_time') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    collector = PoolCollector(engine)
+    REGISTRY.register(collector)
+    _live_collectors.append(collector)
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return verb if verb in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'COPY') else 'OTHER'
+
+
+class MetricsMiddleware:
+    """Record request latency per route template
+
+    Routes are labelled by their path template (/api/v1/shops/{shop_id}),
+    not the raw path, so label cardinality stays bounded. Unmatched paths
+    are grouped under 'unmatched'.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def _send(message: Message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            HTTP_REQUEST_DURATION.labels(
+                scope['method'], self._route(scope), str(status['code'])
+            ).observe(time.perf_counter() - started)
+
+    def _route(self, scope: Scope) -> str:
+        for route in scope['app'].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return 'unmatched'
+
+
+def _registry() -> CollectorRegistry:
+    """
+    Registry to expose
+
+    With several server processes, set PROMETHEUS_MULTIPROC_DIR so every
+    process writes its samples there and they are aggregated here. Live
+    collectors (pool gauges) report the process serving the scrape.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _live_collectors:
+        registry.register(collector)
+    return registry
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serialize all metrics in the Prometheus text format"""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def serve_metrics(port: Optional[int]):
+    """Expose /metrics of a worker script on port in a background thread; no-op without a port"""
+    if not port:
+        return
+    try:
+        start_http_server(port, registry=_registry())
+    except OSError as e:
+        print(f"Could not serve metrics on port {port}: {e}")
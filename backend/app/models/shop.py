@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, Enum, JSON, ForeignKey
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from app.core.database import Base
@@ -18,6 +19,9 @@ class Shop(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     domain = Column(String(255), unique=True, index=True, nullable=False)
+    # Domain the store actually serves from after following redirects
+    canonical_domain = Column(String(255), index=True, nullable=True)
+    redirect_chain = Column(JSON, nullable=True)
     name = Column(String(255), nullable=True)
     region = Column(Enum(Region), nullable=False)
     
@@ -37,6 +41,26 @@ class Shop(Base):
     seo_score = Column(Float, default=0.0)
     overall_score = Column(Float, default=0.0)
     
+    # Fingerprint of the last analyzed homepage and the results computed on it,
+    # used to skip re-analysis when the page has not changed
+    content_digest = Column(String(64), nullable=True)
+    content_simhash = Column(BigInteger, nullable=True)
+    last_detection_result = Column(JSON, nullable=True)
+    last_classification_result = Column(JSON, nullable=True)
+    
+    # Catalog aggregates from the store's /products.json and /collections.json
+    catalog_product_count = Column(Integer, nullable=True)
+    catalog_collection_count = Column(Integer, nullable=True)
+    catalog_price_p25 = Column(Float, nullable=True)
+    catalog_price_median = Column(Float, nullable=True)
+    catalog_price_p75 = Column(Float, nullable=True)
+    catalog_womenswear_share = Column(Float, nullable=True)
+    catalog_crawled_at = Column(DateTime, nullable=True)
+
+    # Recent fetch latencies ({'ttfb': [...], 'total': [...]}, seconds), from
+    # which the crawler derives this host's timeouts
+    fetch_latency = Column(JSON, nullable=True)
+    
     # Status and metadata
     status = Column(Enum(ShopStatus), default=ShopStatus.ACTIVE)
     last_checked = Column(DateTime, default=func.now())
@@ -48,5 +72,21 @@ class Shop(Base):
     logo_url = Column(String(500), nullable=True)
     screenshot_url = Column(String(500), nullable=True)
     
+    aliases = relationship("ShopAlias", back_populates="shop", cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f"<Shop(domain='{self.domain}', region='{self.region}', is_shopify={self.is_shopify})>"
+
+class ShopAlias(Base):
+    """Alternative domain (www, myshopify.com, redirecting domain) of a shop"""
+    __tablename__ = "shop_aliases"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    domain = Column(String(255), unique=True, index=True, nullable=False)
+    shop_id = Column(Integer, ForeignKey("shops.id", ondelete="CASCADE"), index=True, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    
+    shop = relationship("Shop", back_populates="aliases")
+    
     def __repr__(self):
-        return f"<Shop(domain='{self.domain}', region='{self.region}', is_shopify={self.is_shopify})>" 
\ No newline at end of file
+        return f"<ShopAlias(domain='{self.domain}', shop_id={self.shop_id})>" 
\ No newline at end of file
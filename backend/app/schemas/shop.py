@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -37,6 +37,7 @@ class ShopUpdate(BaseModel):
 
 class Shop(ShopBase):
     id: int
+    canonical_domain: Optional[str] = None
     is_shopify: bool = False
     shopify_verified_at: Optional[datetime] = None
     is_womens_fashion: bool = False
@@ -47,6 +48,13 @@ class Shop(ShopBase):
     social_media_score: float = 0.0
     seo_score: float = 0.0
     overall_score: float = 0.0
+    catalog_product_count: Optional[int] = None
+    catalog_collection_count: Optional[int] = None
+    catalog_price_p25: Optional[float] = None
+    catalog_price_median: Optional[float] = None
+    catalog_price_p75: Optional[float] = None
+    catalog_womenswear_share: Optional[float] = None
+    catalog_crawled_at: Optional[datetime] = None
     status: ShopStatus = ShopStatus.ACTIVE
     last_checked: datetime
     created_at: datetime
@@ -72,4 +80,19 @@ class ShopRanking(BaseModel):
 class RegionRanking(BaseModel):
     region: Region
     rankings: List[ShopRanking]
-    last_updated: datetime 
\ No newline at end of file
+    last_updated: datetime 
+
+
+class HistogramBucket(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+class ShopFacets(BaseModel):
+    total: int
+    regions: Dict[str, int]
+    is_shopify: Dict[str, int]
+    is_womens_fashion: Dict[str, int]
+    score_histograms: Dict[str, List[HistogramBucket]]
+    data_version: int
+    generated_at: datetime
@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import record_classification_timings
+from app.models.shop import Shop, ShopStatus
+from app.services.catalog_crawler import shop_catalog
+from app.services.crawl_pipeline import CrawlPipeline, analyze_page, record_result
+from app.services.page_archive import PageArchive
+from app.services.result_writer import ResultWriter
+from app.services.shopify_detector import new_probe_summary
+
+
+def replay_page(path: str, catalog: Optional[Dict] = None) -> Dict:
+    """
+    Re-run detection and classification on one archived page
+
+    Runs in a pool worker and returns a CrawlPipeline result, plus the
+    page's 'fetched_at' and the 'classification_timings' for the parent to
+    record. Nothing is fetched: the Shopify probe verdict is
+    the one archived with the page, the HTML analysis is redone in full.
+    """
+    page = PageArchive.load(path)
+    fetched = {
+        'domain': page.domain,
+        'content': page.content,
+        'encoding': page.encoding,
+        'status_code': page.status_code,
+        'final_url': page.final_url,
+        'redirect_chain': page.redirect_chain,
+        'probes': page.probes or new_probe_summary(),
+    }
+    analysis = analyze_page(
+        page.domain, page.content, page.encoding, None, None, not fetched['probes']['verified_by'], catalog
+    )
+    return {
+        **CrawlPipeline.build_result(fetched, analysis, None),
+        'fetched_at': page.fetched_at,
+        'classification_timings': analysis['classification_timings'],
+    }
+
+
+def _batches(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ArchiveReplay:
+    """Re-analyze archived homepages and bulk-write the new results
+
+    Applies detector and classifier rule changes to every archived shop
+    without crawling: the newest archived page of each domain is loaded
+    and analyzed in a process pool, and results are written with a
+    ResultWriter, batch by batch. Results are stored as of the page's
+    fetch time, so last_checked does not move.
+    """
+
+    def __init__(self, archive: PageArchive = None, workers: int = None, batch_size: int = None):
+        self.archive = archive or PageArchive()
+        self.workers = workers or settings.CRAWL_PROCESS_WORKERS or os.cpu_count() or 1
+        self.batch_size = batch_size or settings.ARCHIVE_REPLAY_BATCH_SIZE
+
+    def run(self, domains: Optional[List[str]] = None, since: datetime = None) -> Dict[str, int]:
+        """Replay the given domains, or every archived domain (fetched at or after since)"""
+        if domains:
+            paths = (path for domain in domains for path in self.archive.history(domain)[-1:])
+        else:
+            paths = self.archive.iter_latest(since)
+
+        totals = {'replayed': 0, 'changed': 0, 'skipped': 0, 'failed': 0}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool, ResultWriter(flush_interval=0) as writer:
+            for batch in _batches(paths, self.batch_size):
+                by_domain = {PageArchive.domain_of(path): path for path in batch}
+                shops = self._load_shops(list(by_domain))
+                totals['skipped'] += len(by_domain) - len(shops)
+
+                futures = {
+                    pool.submit(replay_page, by_domain[domain], shop_catalog(shop)): shop
+                    for domain, shop in shops.items()
+                }
+                for future in as_completed(futures):
+                    shop = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Replay of {shop.domain} failed: {e}")
+                        totals['failed'] += 1
+                        continue
+                    # Metrics recorded in the pool workers would be lost
+                    record_result('replay', result)
+                    record_classification_timings(result['classification_timings'])
+
+                    verification = result['verification_result']
+                    classification = result['classification_result']
+                    writer.add_detection(shop.id, shop.domain, verification, checked_at=result['fetched_at'])
+                    writer.add_classification(shop.id, classification, checked_at=result['fetched_at'])
+                    totals['replayed'] += 1
+                    totals['changed'] += (
+                        verification['is_shopify'] != shop.is_shopify
+                        or classification['is_womens_fashion'] != shop.is_womens_fashion
+                    )
+                writer.flush()
+        return totals
+
+    @staticmethod
+    def _load_shops(domains: List[str]) -> Dict[str, object]:
+        # Inactive rows (merged aliases) are skipped, as the crawl worker does
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(
+                    Shop.id, Shop.domain, Shop.is_shopify, Shop.is_womens_fashion,
+                    Shop.catalog_product_count, Shop.catalog_collection_count, Shop.catalog_price_p25,
+                    Shop.catalog_price_median, Shop.catalog_price_p75, Shop.catalog_womenswear_share,
+                    Shop.catalog_crawled_at
+                ).where(Shop.domain.in_(domains), Shop.status != ShopStatus.INACTIVE)
+            ).all()
+        finally:
+            db.close()
+        return {row.domain: row for row in rows}
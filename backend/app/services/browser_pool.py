@@ -0,0 +1,250 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+from app.core.config import settings
+from app.core.metrics import RENDER_CONTEXTS, RENDER_DURATION, RENDER_RECYCLES
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_INVISIBLE_RE = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class RenderedPage(NamedTuple):
+    url: str
+    final_url: str
+    status_code: Optional[int]
+    html: str
+
+
+def visible_text_length(html: str) -> int:
+    """Rough length of the text a server-rendered page shows, without parsing it"""
+    text = _TAG_RE.sub(' ', _INVISIBLE_RE.sub(' ', html or ''))
+    return len(_SPACE_RE.sub(' ', text).strip())
+
+
+def needs_rendering(html: str, confidence: Optional[float] = None, threshold: float = 0.5) -> bool:
+    """
+    Whether the HTTP result for html is too inconclusive to stand without rendering
+
+    True for pages that are an empty JavaScript shell (less than
+    RENDER_MIN_TEXT_CHARS of visible text) and for confidences within
+    RENDER_UNCERTAINTY_MARGIN of the decision threshold. Always False
+    unless RENDERING_ENABLED.
+    """
+    if not settings.RENDERING_ENABLED:
+        return False
+    if visible_text_length(html) < settings.RENDER_MIN_TEXT_CHARS:
+        return True
+    return confidence is not None and abs(confidence - threshold) <= settings.RENDER_UNCERTAINTY_MARGIN
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.pages = 0
+
+
+class BrowserPool:
+    """Fixed pool of long-lived headless Chromium contexts
+
+    One browser process hosts size contexts; a render borrows one, so at
+    most size pages render at once and callers beyond that wait up to
+    RENDER_QUEUE_TIMEOUT. Images, fonts and media are never downloaded.
+    Each navigation is bounded by RENDER_PAGE_TIMEOUT, and a context is
+    closed and replaced after RENDER_CONTEXT_MAX_PAGES pages or any
+    failed render, which bounds the memory leaked by long-lived pages.
+    All methods must run on the event loop that called start().
+    """
+
+    def __init__(self, size: int = None, max_pages_per_context: int = None, page_timeout: float = None):
+        self.size = size or settings.RENDER_POOL_SIZE
+        self.max_pages_per_context = max_pages_per_context or settings.RENDER_CONTEXT_MAX_PAGES
+        self.page_timeout = page_timeout or settings.RENDER_PAGE_TIMEOUT
+        self.blocked_resources = set(settings.RENDER_BLOCKED_RESOURCES)
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._stats = {'rendered': 0, 'failed': 0, 'queue_timeouts': 0, 'recycled': 0, 'in_use': 0}
+
+    async def start(self) -> "BrowserPool":
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        await self._launch()
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            await self._idle.put(await self._new_context())
+        RENDER_CONTEXTS.labels('idle').set(self.size)
+        return self
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._playwright = None
+        RENDER_CONTEXTS.labels('idle').set(0)
+        RENDER_CONTEXTS.labels('in_use').set(0)
+
+    async def render(self, url: str) -> Optional[RenderedPage]:
+        """Load url with JavaScript and return the resulting DOM, or None on failure"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+        started = time.perf_counter()
+        try:
+            pooled = await asyncio.wait_for(self._idle.get(), settings.RENDER_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._stats['queue_timeouts'] += 1
+            RENDER_DURATION.labels('queue_timeout').observe(time.perf_counter() - started)
+            return None
+
+        self._set_in_use(1)
+        page = None
+        failed = True
+        try:
+            page = await pooled.context.new_page()
+            page.set_default_timeout(self.page_timeout * 1000)
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=self.page_timeout * 1000)
+            try:
+                # Give client-side rendering a moment; pages that poll never go idle
+                await page.wait_for_load_state('networkidle', timeout=settings.RENDER_IDLE_TIMEOUT * 1000)
+            except PlaywrightTimeout:
+                pass
+            html = await page.content()
+            failed = False
+            self._stats['rendered'] += 1
+            RENDER_DURATION.labels('ok').observe(time.perf_counter() - started)
+            return RenderedPage(url, page.url, response.status if response else None, html)
+        except Exception as e:
+            self._stats['failed'] += 1
+            outcome = 'timeout' if isinstance(e, PlaywrightTimeout) else 'error'
+            RENDER_DURATION.labels(outcome).observe(time.perf_counter() - started)
+            print(f"Rendering {url} failed: {e}")
+            return None
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            pooled.pages += 1
+            if failed or pooled.pages >= self.max_pages_per_context:
+                try:
+                    pooled = await self._recycle(pooled)
+                except Exception as e:
+                    # Keep the slot; the next render on it fails and recycles again
+                    print(f"Could not recycle a render context: {e}")
+            self._set_in_use(-1)
+            await self._idle.put(pooled)
+
+    def stats(self) -> Dict[str, int]:
+        """Render counts since start and current pool occupancy"""
+        return {**self._stats, 'size': self.size}
+
+    async def _launch(self):
+        self._browser = await self._playwright.chromium.launch(
+            headless=True, args=['--disable-dev-shm-usage']
+        )
+
+    async def _new_context(self) -> _PooledContext:
+        context = await self._browser.new_context(user_agent=USER_AGENT)
+        await context.route('**/*', self._route)
+        return _PooledContext(context)
+
+    async def _route(self, route):
+        if route.request.resource_type in self.blocked_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _recycle(self, pooled: _PooledContext) -> _PooledContext:
+        self._stats['recycled'] += 1
+        RENDER_RECYCLES.inc()
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+        if not self._browser.is_connected():
+            # The browser itself died; its other contexts get replaced as they fail
+            print("Restarting render browser")
+            await self._launch()
+        return await self._new_context()
+
+    def _set_in_use(self, delta: int):
+        self._stats['in_use'] += delta
+        RENDER_CONTEXTS.labels('in_use').set(self._stats['in_use'])
+        RENDER_CONTEXTS.labels('idle').set(self.size - self._stats['in_use'])
+
+
+# Process-wide pool, running on its own event loop thread so that both the
+# synchronous services and the async pipeline can share it
+_pool: Optional[BrowserPool] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_unavailable = False
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    """Start the shared pool on first use; None if rendering is unavailable"""
+    global _pool, _loop, _unavailable
+    with _pool_lock:
+        if _pool is not None or _unavailable:
+            return _pool
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name='browser-pool', daemon=True).start()
+        try:
+            pool = asyncio.run_coroutine_threadsafe(BrowserPool().start(), loop).result()
+        except Exception as e:
+            # Playwright or its browsers are not installed
+            print(f"Rendering disabled, could not start the browser pool: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            _unavailable = True
+            return None
+        _pool, _loop = pool, loop
+        return _pool
+
+
+def _render_timeout() -> float:
+    return settings.RENDER_QUEUE_TIMEOUT + settings.RENDER_PAGE_TIMEOUT + settings.RENDER_IDLE_TIMEOUT + 10
+
+
+def render_page(url: str) -> Optional[RenderedPage]:
+    """Render url on the shared pool, blocking the calling thread"""
+    pool = get_browser_pool()
+    if pool is None:
+        return None
+    future = asyncio.run_coroutine_threadsafe(pool.render(url), _loop)
+    try:
+        return future.result(_render_timeout())
+    except Exception as e:
+        future.cancel()
+        print(f"Rendering {url} failed: {e}")
+        return None
+
+
+async def render_page_async(url: str) -> Optional[RenderedPage]:
+    """Render url on the shared pool from any event loop"""
+    pool = await asyncio.get_running_loop().run_in_executor(None, get_browser_pool)
+    if pool is None:
+        return None
+    future = asyncio.run_coroutine_threadsafe(pool.render(url), _loop)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), _render_timeout())
+    except Exception as e:
+        print(f"Rendering {url} failed: {e}")
+        return None
+
+
+def shutdown_browser_pool():
+    """Close the shared pool and its browser"""
+    global _pool, _loop
+    with _pool_lock:
+        if _pool is None:
+            return
+        asyncio.run_coroutine_threadsafe(_pool.close(), _loop).result(30)
+        _loop.call_soon_threadsafe(_loop.stop)
+        _pool = _loop = None
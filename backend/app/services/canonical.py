@@ -0,0 +1,95 @@
+from typing import Dict, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models.shop import Shop, ShopAlias, ShopStatus
+from app.services.seen_domains import SeenDomainStore
+from app.utils.domains import normalize_domain
+
+
+def canonical_domain_for(shop_domain: str, detection_result: Dict) -> str:
+    """Canonical domain of a store: where its homepage ends up after redirects"""
+    return normalize_domain(detection_result.get('final_url') or '') or shop_domain
+
+
+def find_shop_by_domain(db: Session, domain: str, exclude_id: int = None) -> Optional[Shop]:
+    """Resolve a domain to the shop representing it, through aliases first"""
+    alias = db.query(ShopAlias).filter(ShopAlias.domain == domain).first()
+    if alias and alias.shop_id != exclude_id:
+        return alias.shop
+
+    query = db.query(Shop).filter(
+        or_(Shop.domain == domain, Shop.canonical_domain == domain),
+        Shop.status != ShopStatus.INACTIVE
+    )
+    if exclude_id is not None:
+        query = query.filter(Shop.id != exclude_id)
+    return query.order_by(Shop.id).first()
+
+
+def apply_canonical_domain(db: Session, shop: Shop, detection_result: Dict) -> Optional[Shop]:
+    """
+    Record the aliases of a shop from its detection result
+
+    The canonical domain and redirect chain columns themselves are written
+    with the rest of the detection result (see result_writer). If another
+    shop already represents the same store (same canonical or
+    myshopify.com domain), this shop is folded into it: its domain and
+    aliases become aliases of the other shop and it is marked inactive, so
+    it is no longer crawled, scored or ranked on its own.
+
+    Returns:
+        The shop this one was merged into, or None
+    """
+    canonical = canonical_domain_for(shop.domain, detection_result)
+    myshopify = normalize_domain(detection_result.get('myshopify_domain') or '')
+
+    alias_domains = {canonical, myshopify} - {None, shop.domain}
+
+    if canonical == shop.domain:
+        # This row is the real store; fold any row for its myshopify.com domain into it
+        duplicate = find_shop_by_domain(db, myshopify, exclude_id=shop.id) if myshopify else None
+        if duplicate is not None and duplicate.domain == myshopify:
+            _merge(db, duplicate, shop)
+        for domain in alias_domains:
+            _set_alias(db, domain, shop)
+        return None
+
+    owner = None
+    for domain in (canonical, myshopify):
+        if domain:
+            owner = find_shop_by_domain(db, domain, exclude_id=shop.id)
+            if owner is not None:
+                break
+
+    if owner is None:
+        for domain in alias_domains:
+            _set_alias(db, domain, shop)
+        return None
+
+    _merge(db, shop, owner)
+    for domain in alias_domains:
+        _set_alias(db, domain, owner)
+    return owner
+
+
+def _merge(db: Session, duplicate: Shop, owner: Shop):
+    """Make duplicate's domain and aliases point to owner and retire it"""
+    db.query(ShopAlias).filter(ShopAlias.shop_id == duplicate.id).update(
+        {ShopAlias.shop_id: owner.id}, synchronize_session=False
+    )
+    _set_alias(db, duplicate.domain, owner)
+    duplicate.status = ShopStatus.INACTIVE
+
+
+def _set_alias(db: Session, domain: str, shop: Shop):
+    if domain == shop.domain:
+        return
+    alias = db.query(ShopAlias).filter(ShopAlias.domain == domain).first()
+    if alias is None:
+        db.add(ShopAlias(domain=domain, shop_id=shop.id))
+        # The session does not autoflush, make the alias visible to later lookups
+        db.flush()
+        # A rolled-back alias only costs a false positive, checked against the database
+        SeenDomainStore.record([domain])
+    else:
+        alias.shop_id = shop.id
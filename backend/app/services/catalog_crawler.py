@@ -0,0 +1,308 @@
+import asyncio
+import math
+import re
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import httpx
+import ijson
+from sqlalchemy import or_, select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import observe_fetch, record_crawl_error
+from app.models.shop import Shop, ShopStatus
+from app.services.fashion_classifier import apply_catalog
+from app.services.result_writer import CATALOG_COLUMNS, ResultWriter
+from app.utils.dns_cache import cached_dns_transport
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Whole words in a product's type, tags or title that mark it as womenswear,
+# and words that rule it out (a "men's shirt" is not, a "women's shirt" is)
+WOMENSWEAR_RE = re.compile(
+    r"\b(women|womens|women's|woman|ladies|lady|dress|dresses|skirt|skirts|blouse|blouses|"
+    r"lingerie|bra|bras|maternity|jumpsuit|jumpsuits|gown|gowns|handbag|handbags|heels|bikini)\b"
+)
+EXCLUDED_RE = re.compile(
+    r"\b(men|mens|men's|man|boys|boy|kids|kid|baby|babies|toddler|unisex)\b"
+)
+
+
+class PriceSketch:
+    """Streaming price percentiles in bounded memory
+
+    Prices are counted in logarithmic buckets whose width is set by the
+    relative accuracy, so any percentile is within that relative error of
+    the exact value, and memory depends on the price range rather than on
+    the number of products (a few hundred buckets at 1%).
+    """
+
+    def __init__(self, accuracy: float = None):
+        accuracy = accuracy or settings.CATALOG_PRICE_ACCURACY
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = self.max = None
+
+    def add(self, value: float):
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate q-th percentile (0-100), None when empty"""
+        if not self.count:
+            return None
+        rank = q / 100 * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        estimate = None
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                break
+        if estimate is None:
+            return self.max
+        return min(max(estimate, self.min), self.max)
+
+
+class CatalogStats:
+    """Catalog aggregates updated one product or collection at a time"""
+
+    def __init__(self):
+        self.product_count = 0
+        self.womenswear_count = 0
+        self.collection_count = 0
+        self.prices = PriceSketch()
+
+    def add_product(self, product: Dict):
+        self.product_count += 1
+        if is_womenswear(product):
+            self.womenswear_count += 1
+        # A product is listed at its cheapest variant
+        prices = [_price(variant.get('price')) for variant in product.get('variants') or []]
+        prices = [price for price in prices if price is not None]
+        if prices:
+            self.prices.add(min(prices))
+
+    def add_collection(self, collection: Dict):
+        self.collection_count += 1
+
+    def summary(self) -> Dict[str, any]:
+        def _rounded(value):
+            return round(value, 2) if value is not None else None
+
+        return {
+            'product_count': self.product_count,
+            'collection_count': self.collection_count,
+            'price_p25': _rounded(self.prices.percentile(25)),
+            'price_median': _rounded(self.prices.percentile(50)),
+            'price_p75': _rounded(self.prices.percentile(75)),
+            'womenswear_share': (
+                round(self.womenswear_count / self.product_count, 4) if self.product_count else None
+            ),
+        }
+
+
+def is_womenswear(product: Dict) -> bool:
+    """Whether a products.json entry is tagged, typed or titled as womenswear"""
+    tags = product.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    text = ' '.join([str(product.get('product_type') or ''), str(product.get('title') or ''), *map(str, tags)])
+    text = text.lower()
+    return bool(WOMENSWEAR_RE.search(text)) and not EXCLUDED_RE.search(text)
+
+
+def _price(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def shop_catalog(shop) -> Optional[Dict[str, any]]:
+    """Catalog summary stored on a Shop (or a row with its catalog columns), None if never crawled"""
+    if getattr(shop, 'catalog_crawled_at', None) is None:
+        return None
+    return {key: getattr(shop, column) for key, column in CATALOG_COLUMNS.items()}
+
+
+class _AsyncBody:
+    """File-like view of a streamed httpx response for ijson's async parser"""
+
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes the type with read(0) and accepts short reads; b'' ends the document
+        if size == 0:
+            return b''
+        async for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b''
+
+
+class CatalogCrawler:
+    """Crawl Shopify storefront catalogs into CatalogStats
+
+    Pages through /products.json and /collections.json with a streaming
+    JSON parser, so only the product being parsed is held in memory and
+    catalog size does not affect memory use. Pages of one store are fetched
+    one after another (SCRAPING_DELAY apart); up to CATALOG_CONCURRENCY
+    stores are crawled at once.
+    """
+
+    def __init__(self, concurrency: int = None, page_size: int = None, max_pages: int = None):
+        self.concurrency = concurrency or settings.CATALOG_CONCURRENCY
+        self.page_size = page_size or settings.CATALOG_PAGE_SIZE
+        self.max_pages = max_pages or settings.CATALOG_MAX_PAGES
+
+    async def run(self, domains: Iterable[str]) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield (domain, summary) per domain in completion order; failed crawls carry 'error'"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _crawl(client: httpx.AsyncClient, domain: str) -> Tuple[str, Dict]:
+            async with semaphore:
+                return domain, await self.crawl(client, domain)
+
+        async with httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            follow_redirects=True,
+            transport=cached_dns_transport(limits=httpx.Limits(max_connections=self.concurrency * 2)),
+            timeout=httpx.Timeout(settings.REQUEST_TIMEOUT)
+        ) as client:
+            tasks = [asyncio.create_task(_crawl(client, domain)) for domain in domains]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    yield await task
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def crawl(self, client: httpx.AsyncClient, domain: str) -> Dict[str, any]:
+        """Aggregate one store's catalog; {'error': ...} if its products cannot be read"""
+        url = domain if domain.startswith(('http://', 'https://')) else f"https://{domain}"
+        stats = CatalogStats()
+        progress = {'pages': 0, 'bytes': 0}
+        try:
+            await self._stream_pages(client, url, '/products.json', 'products.item', stats.add_product, progress)
+        except Exception as e:
+            # Besides HTTP and JSON errors, malformed entries (a product or variant that is
+            # not an object) fail only this store, not the whole batch
+            record_crawl_error('catalog', domain, 'timeout' if isinstance(e, httpx.TimeoutException) else 'error')
+            return {'error': str(e) or type(e).__name__}
+        try:
+            await self._stream_pages(client, url, '/collections.json', 'collections.item', stats.add_collection, progress)
+        except Exception:
+            # Collections are optional; keep the count read so far
+            pass
+        return {**stats.summary(), **progress}
+
+    async def _stream_pages(
+        self, client: httpx.AsyncClient, url: str, endpoint: str, prefix: str, add, progress: Dict[str, int]
+    ):
+        """
+        Feed every item of a paginated endpoint to add, one at a time
+
+        Stops at the first short page, after max_pages, or when a store
+        ignores the page parameter and repeats a page. Pages fetched and
+        bytes downloaded are added to progress as they complete.
+        """
+        previous_first = None
+        for page in range(1, self.max_pages + 1):
+            if page > 1:
+                await asyncio.sleep(settings.SCRAPING_DELAY)
+            started = time.perf_counter()
+            async with client.stream(
+                'GET', f"{url.rstrip('/')}{endpoint}", params={'limit': self.page_size, 'page': page}
+            ) as response:
+                response.raise_for_status()
+
+                items = 0
+                first = None
+                async for item in ijson.items_async(_AsyncBody(response), prefix):
+                    if items == 0:
+                        first = item.get('id') if isinstance(item, dict) else None
+                        if first is not None and first == previous_first:
+                            break
+                    add(item)
+                    items += 1
+            progress['pages'] += 1
+            progress['bytes'] += response.num_bytes_downloaded
+            observe_fetch('catalog', 'catalog_page', time.perf_counter() - started, response.num_bytes_downloaded)
+
+            if items < self.page_size:
+                break
+            previous_first = first
+
+
+async def refresh_catalogs(
+    domains: Optional[List[str]] = None,
+    stale_days: Optional[float] = None,
+    crawler: CatalogCrawler = None
+) -> Dict[str, int]:
+    """
+    Crawl and store the catalogs of active Shopify shops
+
+    Crawls the given domains, or every shop whose catalog is older than
+    stale_days (or was never crawled). Each shop's aggregates are stored
+    together with its classification re-blended with the new womenswear
+    share (see fashion_classifier.apply_catalog). Shops are read and
+    written in batches of CATALOG_BATCH_SIZE.
+    """
+    crawler = crawler or CatalogCrawler()
+    statement = select(Shop.id, Shop.domain, Shop.last_classification_result).where(
+        Shop.is_shopify.is_(True), Shop.status == ShopStatus.ACTIVE
+    )
+    if domains:
+        statement = statement.where(Shop.domain.in_(domains))
+    elif stale_days is not None:
+        cutoff = datetime.utcnow() - timedelta(days=stale_days)
+        statement = statement.where(or_(Shop.catalog_crawled_at.is_(None), Shop.catalog_crawled_at < cutoff))
+
+    totals = {'crawled': 0, 'failed': 0}
+    last_id = 0
+    writer = ResultWriter(flush_interval=0)
+    try:
+        while True:
+            # Keyset pagination: rows written by the previous batch may no longer be stale
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    statement.where(Shop.id > last_id).order_by(Shop.id).limit(settings.CATALOG_BATCH_SIZE)
+                ).all()
+            finally:
+                db.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            shops = {row.domain: row for row in rows}
+            async for domain, catalog in crawler.run(list(shops)):
+                if 'error' in catalog:
+                    print(f"Catalog crawl of {domain} failed: {catalog['error']}")
+                    totals['failed'] += 1
+                    continue
+                shop = shops[domain]
+                classification = None
+                if shop.last_classification_result and 'error' not in shop.last_classification_result:
+                    classification = apply_catalog(shop.last_classification_result, catalog)
+                writer.add_catalog(shop.id, catalog, classification)
+                totals['crawled'] += 1
+            writer.flush()
+    finally:
+        writer.close()
+    return totals
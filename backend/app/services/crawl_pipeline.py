@@ -0,0 +1,460 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import httpx
+from app.core.config import settings
+from app.core.metrics import (
+    capture_classification_timings, observe_fetch, record_classification_timings, record_crawl_error,
+    record_indicators, record_verification
+)
+from app.services.browser_pool import needs_rendering, render_page_async
+from app.services.fashion_classifier import FashionClassifier
+from app.services.page_archive import PageArchive
+from app.services.shopify_detector import PROBE_ENDPOINTS, ShopifyDetector, new_probe_summary, record_probe
+from app.utils.content_hash import fingerprint, is_unchanged
+from app.utils.dns_cache import cached_dns_transport, dns_cache
+from app.utils.host_latency import HostBudget, host_latency
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Per-process service instances, created lazily inside pool workers
+_detector: Optional[ShopifyDetector] = None
+_classifier: Optional[FashionClassifier] = None
+
+
+def analyze_page(
+    domain: str,
+    content: bytes,
+    encoding: Optional[str],
+    previous_detection: Optional[Dict] = None,
+    previous_classification: Optional[Dict] = None,
+    detect: bool = True,
+    catalog: Optional[Dict] = None
+) -> Dict:
+    """
+    Parse a fetched homepage and run detection and classification on it
+
+    Runs in a pool worker: it takes raw bytes and returns a compact,
+    picklable dict so only small payloads cross the process boundary.
+    Analyses whose previous result was computed on the same content are
+    skipped ('page' is None, classification is marked unchanged), and so
+    is detection when detect is False (a probe already verified the shop).
+    A stored catalog summary is blended into the classification.
+    """
+    return analyze_pages([
+        (domain, content, encoding, previous_detection, previous_classification, detect, catalog)
+    ])[0]
+
+
+def analyze_pages(pages: List[Tuple]) -> List[Dict]:
+    """
+    analyze_page() for a chunk of pages, given as tuples of its arguments
+
+    The pages are classified with one classify_batch() call, so in model
+    mode the model runs over the whole chunk instead of one page at a time.
+    Classification timings of the chunk are returned with its first page
+    ('classification_timings') for the parent to record.
+    """
+    global _detector, _classifier
+    if _detector is None:
+        _detector = ShopifyDetector()
+        # Rendering happens in the parent process, on the shared browser pool
+        _classifier = FashionClassifier(render=False)
+
+    htmls = []
+    analyses = []
+    for domain, content, encoding, previous_detection, _, detect, _ in pages:
+        html = content.decode(encoding or 'utf-8', errors='replace')
+        page_fingerprint = fingerprint(html)
+
+        page = None
+        if detect and not is_unchanged(page_fingerprint, previous_detection):
+            page = _detector.analyze_html(html)
+
+        htmls.append(html)
+        analyses.append({
+            'page': page,
+            'fingerprint': page_fingerprint,
+            # Probes other than /meta.json do not name the permanent domain
+            'myshopify_domain': page['myshopify_domain'] if page else ShopifyDetector.find_myshopify_domain(html),
+        })
+
+    with capture_classification_timings() as timings:
+        classifications = _classifier.classify_batch(
+            [(page[0], html) for page, html in zip(pages, htmls)],
+            [page[4] for page in pages],
+            catalogs=[page[6] for page in pages]
+        )
+    for analysis, classification in zip(analyses, classifications):
+        classification.pop('analysis', None)
+        analysis['classification'] = classification
+        analysis['classification_timings'] = []
+    if analyses:
+        analyses[0]['classification_timings'] = timings
+    return analyses
+
+
+def record_result(source: str, result: Dict):
+    """Record the indicator and verification metrics of a build_result() result"""
+    verification = result['verification_result']
+    if not verification.get('unchanged'):
+        record_indicators(verification['indicators'])
+    record_verification(source, verification)
+
+
+class CrawlPipeline:
+    """Two-stage crawl: async network fetches feeding a process pool
+
+    Homepages and the Shopify storefront probes are fetched concurrently on
+    the event loop; shops a probe verifies skip HTML detection. Parsing, detection and classification run in a ProcessPoolExecutor
+    so they scale with cores instead of contending for the GIL. Each parse
+    task hands the pool every page already waiting, up to parse_batch_size
+    (FASHION_MODEL_BATCH_SIZE in model mode), so the classifier model runs
+    on batches once parsing is the bottleneck. The stages
+    are connected by a bounded queue: when parsing falls behind, fetchers
+    block instead of piling pages up in memory. Fetched homepages are saved
+    to the PageArchive (ARCHIVE_ENABLED) for offline replay.
+
+    Each domain's requests run under a budget from its host's recent
+    latency (see HostLatency): adaptive connect and read timeouts, and one
+    deadline for the homepage and probes together. A domain that runs out
+    of an adaptive budget is reported as deferred rather than failed, for
+    the caller to retry later with a larger one.
+    """
+
+    def __init__(
+        self, workers: int = None, fetch_concurrency: int = None, queue_size: int = None, archive: PageArchive = None,
+        parse_batch_size: int = None
+    ):
+        self.workers = workers or settings.CRAWL_PROCESS_WORKERS or os.cpu_count() or 1
+        self.fetch_concurrency = fetch_concurrency or settings.CRAWL_FETCH_CONCURRENCY
+        # Keyword classification gains nothing from batching; keep pages flowing one by one
+        self.parse_batch_size = parse_batch_size or (
+            settings.FASHION_MODEL_BATCH_SIZE if settings.FASHION_CLASSIFIER_MODE == 'model' else 1
+        )
+        self.queue_size = queue_size or self.workers * 2 * self.parse_batch_size
+        self.archive = archive or (PageArchive() if settings.ARCHIVE_ENABLED else None)
+
+    async def run(
+        self,
+        domains: Iterable[str],
+        previous_results: Optional[Dict[str, Tuple[Optional[Dict], Optional[Dict]]]] = None,
+        catalogs: Optional[Dict[str, Dict]] = None,
+        latencies: Optional[Dict[str, Dict]] = None,
+        attempts: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Crawl and analyze domains
+
+        Args:
+            domains: Domains to crawl
+            previous_results: Optional {domain: (last detection result,
+                last classification result)}; unchanged pages reuse them
+            catalogs: Optional {domain: catalog summary} of crawled store
+                catalogs, blended into classification
+            latencies: Optional {domain: stored latency samples} (see
+                HostLatency.samples) for hosts this process has not fetched
+            attempts: Optional {domain: attempt number}; retries get
+                larger timeout budgets
+
+        Yields:
+            {'domain', 'verification_result', 'classification_result'} dicts
+            in completion order. The result dicts have the same shape as
+            ShopifyDetector.detect_shopify and FashionClassifier.classify_fashion.
+            Fetched domains add 'fetch_latency' (the host's samples to store);
+            failed ones whose budget was adaptive are marked 'deferred'.
+        """
+        domains_queue: asyncio.Queue = asyncio.Queue()
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        done = object()
+
+        for domain in domains:
+            host_latency.seed(domain, (latencies or {}).get(domain))
+            domains_queue.put_nowait(domain)
+        for _ in range(self.fetch_concurrency):
+            domains_queue.put_nowait(done)
+
+        loop = asyncio.get_running_loop()
+        # A domain's homepage and probes are in flight together; waiting for a
+        # pooled connection would eat into its deadline
+        limits = httpx.Limits(max_connections=self.fetch_concurrency * (len(PROBE_ENDPOINTS) + 1))
+        timeout = httpx.Timeout(settings.REQUEST_TIMEOUT)
+
+        async with httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            follow_redirects=True,
+            transport=cached_dns_transport(limits=limits),
+            timeout=timeout
+        ) as client:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+
+                async def _fetch_stage():
+                    while True:
+                        domain = await domains_queue.get()
+                        if domain is done:
+                            break
+                        fetched = await self._fetch(client, domain, (attempts or {}).get(domain, 1))
+                        if 'error' in fetched:
+                            await results.put(self._error_result(domain, fetched))
+                        else:
+                            await pages.put(fetched)
+
+                async def _close_pages():
+                    # Parsers exit once every fetcher has finished
+                    await asyncio.gather(*fetchers, return_exceptions=True)
+                    for _ in range(self.workers):
+                        await pages.put(done)
+
+                async def _parse_stage():
+                    try:
+                        finished = False
+                        while not finished:
+                            chunk = [await pages.get()]
+                            # Take the pages already waiting, without holding any back for a full batch
+                            while len(chunk) < self.parse_batch_size and chunk[-1] is not done and not pages.empty():
+                                chunk.append(pages.get_nowait())
+                            if chunk[-1] is done:
+                                chunk.pop()
+                                finished = True
+                            if not chunk:
+                                break
+
+                            previous = []
+                            for fetched in chunk:
+                                if self.archive is not None:
+                                    # zstd and file writes release the GIL; run them off the event loop
+                                    await loop.run_in_executor(None, self._archive_page, fetched)
+                                previous.append((previous_results or {}).get(fetched['domain'], (None, None)))
+                                fetched['catalog'] = (catalogs or {}).get(fetched['domain'])
+                            analyses = await loop.run_in_executor(pool, analyze_pages, [
+                                (
+                                    fetched['domain'], fetched['content'], fetched['encoding'], *previous_pair,
+                                    not fetched['probes']['verified_by'], fetched['catalog']
+                                )
+                                for fetched, previous_pair in zip(chunk, previous)
+                            ])
+                            for fetched, previous_pair, analysis in zip(chunk, previous, analyses):
+                                record_classification_timings(analysis['classification_timings'])
+                                analysis = await self._render_if_inconclusive(pool, fetched, analysis)
+                                result = self.build_result(fetched, analysis, previous_pair[0])
+                                record_result('pipeline', result)
+                                result['fetch_latency'] = host_latency.samples(fetched['domain'])
+                                await results.put(result)
+                    finally:
+                        await results.put(done)
+
+                fetchers = [asyncio.create_task(_fetch_stage()) for _ in range(self.fetch_concurrency)]
+                parsers = [asyncio.create_task(_parse_stage()) for _ in range(self.workers)]
+                closer = asyncio.create_task(_close_pages())
+
+                remaining = len(parsers)
+                try:
+                    while remaining:
+                        item = await results.get()
+                        if item is done:
+                            remaining -= 1
+                            continue
+                        yield item
+                finally:
+                    for task in [*fetchers, *parsers, closer]:
+                        task.cancel()
+                    await asyncio.gather(*fetchers, *parsers, closer, return_exceptions=True)
+
+    async def _render_if_inconclusive(self, pool: ProcessPoolExecutor, fetched: Dict, analysis: Dict) -> Dict:
+        """Re-analyze the rendered DOM of JS-only or borderline pages (RENDERING_ENABLED)"""
+        if not settings.RENDERING_ENABLED or analysis['page'] is None:
+            return analysis
+        indicators = {**analysis['page']['indicators'], 'shopify_api': fetched['probes']['shopify_api']}
+        confidence, _ = ShopifyDetector.score_indicators(indicators)
+        html = fetched['content'].decode(fetched['encoding'] or 'utf-8', errors='replace')
+        if not needs_rendering(html, confidence):
+            return analysis
+
+        rendered = await render_page_async(fetched['final_url'])
+        if rendered is None:
+            return analysis
+        rendered_analysis = await asyncio.get_running_loop().run_in_executor(
+            pool, analyze_page, fetched['domain'], rendered.html.encode('utf-8'), 'utf-8',
+            None, None, True, fetched['catalog']
+        )
+        record_classification_timings(rendered_analysis['classification_timings'])
+        # Fingerprints stay those of the fetched page, which is what the next crawl compares
+        rendered_analysis['fingerprint'] = analysis['fingerprint']
+        rendered_analysis['classification'].update({
+            'content_digest': analysis['fingerprint'][0],
+            'content_simhash': analysis['fingerprint'][1],
+            'rendered': True,
+        })
+        rendered_analysis['page']['rendered'] = True
+        return rendered_analysis
+
+    async def _fetch(self, client: httpx.AsyncClient, domain: str, attempt: int = 1) -> Dict:
+        url = domain if domain.startswith(('http://', 'https://')) else f"https://{domain}"
+
+        if dns_cache.is_known_dead(url):
+            record_crawl_error('pipeline', domain, 'dns')
+            return {'domain': domain, 'error': 'Domain does not resolve (NXDOMAIN)', 'status_code': None}
+
+        budget = host_latency.budget(url, attempt)
+        try:
+            return await asyncio.wait_for(self._fetch_within(client, domain, url, budget), budget.deadline)
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            host_latency.observe_timeout(url)
+            record_crawl_error('pipeline', domain, 'timeout')
+            return {
+                'domain': domain,
+                'error': str(e) or f"Ran out of its {budget.deadline:.1f}s budget",
+                'status_code': None,
+                'deferred': budget.adaptive,
+            }
+        except httpx.HTTPError as e:
+            record_crawl_error('pipeline', domain, 'error')
+            status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+            return {'domain': domain, 'error': str(e), 'status_code': status_code}
+
+    async def _fetch_within(self, client: httpx.AsyncClient, domain: str, url: str, budget: HostBudget) -> Dict:
+        """Fetch the homepage and probes with the budget's timeouts; the caller enforces its deadline"""
+        # The probes do not depend on the homepage, run them alongside it
+        probe = asyncio.create_task(self._probe_storefront(client, url, budget))
+        try:
+            started = time.perf_counter()
+            async with client.stream(
+                'GET', url, timeout=httpx.Timeout(budget.read, connect=budget.connect)
+            ) as response:
+                headers_at = time.perf_counter()
+                await response.aread()
+            elapsed = time.perf_counter() - started
+            host_latency.observe(url, headers_at - started, elapsed)
+            observe_fetch('pipeline', 'homepage', elapsed, len(response.content))
+            response.raise_for_status()
+
+            return {
+                'domain': domain,
+                'content': response.content,
+                'encoding': response.encoding,
+                'status_code': response.status_code,
+                'final_url': str(response.url),
+                'redirect_chain': [str(r.url) for r in response.history] + [str(response.url)],
+                'probes': await probe,
+            }
+        finally:
+            probe.cancel()
+
+    async def _probe_storefront(self, client: httpx.AsyncClient, url: str, budget: HostBudget) -> Dict:
+        """Fetch the PROBE_ENDPOINTS concurrently, cancelling the rest once one is decisive"""
+        probes = new_probe_summary()
+        timeout = httpx.Timeout(min(settings.PROBE_TIMEOUT, budget.read), connect=budget.connect)
+        tasks = {
+            asyncio.create_task(self._fetch_probe(client, f"{url.rstrip('/')}{endpoint}", timeout)): endpoint
+            for endpoint in PROBE_ENDPOINTS
+        }
+        pending = set(tasks)
+        try:
+            while pending and not probes['verified_by']:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    record_probe(probes, tasks[task], *task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+        return probes
+
+    async def _fetch_probe(
+        self, client: httpx.AsyncClient, url: str, timeout: httpx.Timeout
+    ) -> Tuple[Optional[httpx.Response], bytes]:
+        """GET one probe, reading at most PROBE_MAX_BYTES of the body"""
+        started = time.perf_counter()
+        chunks = []
+        size = 0
+        try:
+            async with client.stream('GET', url, timeout=timeout) as response:
+                # Probe bodies are cut off, so only the time to headers says anything about the host
+                host_latency.observe(url, time.perf_counter() - started)
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= settings.PROBE_MAX_BYTES:
+                        break
+        except httpx.HTTPError:
+            response = None
+        body = b''.join(chunks)[:settings.PROBE_MAX_BYTES]
+        observe_fetch('pipeline', 'api_probe', time.perf_counter() - started, len(body))
+        return response, body
+
+    def _archive_page(self, fetched: Dict):
+        try:
+            self.archive.store(
+                fetched['domain'], fetched['content'], fetched['encoding'], fetched['status_code'],
+                fetched['final_url'], fetched['redirect_chain'], fetched['probes']
+            )
+        except OSError as e:
+            print(f"Could not archive {fetched['domain']}: {e}")
+
+    @staticmethod
+    def build_result(fetched: Dict, analysis: Dict, previous_detection: Optional[Dict]) -> Dict:
+        """
+        Combine a fetched page and its analyze_page() output into a pipeline result
+
+        Records no metrics, so it can run in a pool worker; the process
+        that receives the result calls record_result().
+        """
+        probes = fetched['probes']
+        cost = {
+            'tiers': ['probe', 'homepage'],
+            'requests': probes['requests'] + 1,
+            'bytes': probes['bytes'] + len(fetched['content']),
+        }
+        if probes['verified_by']:
+            # The homepage was only fetched for classification; its fingerprint is still current
+            verification = {
+                **ShopifyDetector.probe_result(probes),
+                'myshopify_domain': probes['myshopify_domain'] or analysis['myshopify_domain'],
+                'content_digest': analysis['fingerprint'][0],
+                'content_simhash': analysis['fingerprint'][1],
+            }
+        elif analysis['page'] is None:
+            verification = {**previous_detection, **cost, 'unchanged': True}
+        else:
+            indicators = {**analysis['page']['indicators'], 'shopify_api': probes['shopify_api']}
+            confidence, is_shopify = ShopifyDetector.score_indicators(indicators)
+            verification = {
+                'is_shopify': is_shopify,
+                'confidence': confidence,
+                'indicators': indicators,
+                'status_code': fetched['status_code'],
+                'final_url': fetched['final_url'],
+                'redirect_chain': fetched['redirect_chain'],
+                'myshopify_domain': analysis['page']['myshopify_domain'],
+                'content_digest': analysis['fingerprint'][0],
+                'content_simhash': analysis['fingerprint'][1],
+                **cost,
+            }
+            if analysis['page'].get('rendered'):
+                verification['rendered'] = True
+                verification['tiers'].append('render')
+                verification['requests'] += 1
+        return {
+            'domain': fetched['domain'],
+            'verification_result': verification,
+            'classification_result': analysis['classification'],
+        }
+
+    def _error_result(self, domain: str, fetched: Dict) -> Dict:
+        return {
+            'domain': domain,
+            'deferred': fetched.get('deferred', False),
+            'verification_result': {
+                'is_shopify': False,
+                'confidence': 0.0,
+                'error': fetched['error'],
+                'status_code': fetched['status_code'],
+            },
+            'classification_result': {
+                'is_womens_fashion': False,
+                'confidence': 0.0,
+                'error': 'Could not fetch content',
+            },
+        }
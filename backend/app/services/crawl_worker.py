@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import select
+from app.core.cache import bump_data_version
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.shop import Shop, ShopStatus
+from app.services.canonical import apply_canonical_domain
+from app.services.catalog_crawler import shop_catalog
+from app.services.crawl_pipeline import CrawlPipeline
+from app.services.result_writer import ResultWriter
+from app.services.work_queue import Lease, WorkQueue
+
+
+class _Heartbeat:
+    """Renew a lease from a background thread until its batch is acknowledged"""
+
+    def __init__(self, queue: WorkQueue, lease: Lease, interval: float):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval
+        self.held: Set[str] = set(lease.items)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval) and self.held:
+            try:
+                renewed = self.queue.heartbeat(self.lease, self.held)
+            except Exception as e:
+                print(f"Crawl lease heartbeat failed: {e}")
+                continue
+            lost = self.held - renewed
+            if lost:
+                # Expired and reclaimed: another worker may crawl these again
+                print(f"Lost the lease on {len(lost)} domains")
+                self.held = renewed
+
+
+class CrawlWorker:
+    """Crawl domains leased from the distributed WorkQueue
+
+    Each batch of leased domains runs through the CrawlPipeline with the
+    shops' previous results. Results are written with a ResultWriter, and
+    domains are acknowledged only after their rows are flushed, so a
+    crash at any point leaves the unacknowledged domains to be reclaimed
+    when their leases expire. Domains that are not shops, or whose shop is
+    inactive (merged into another), are dropped. As with a single
+    verification, shops a crawl shows to be aliases of another shop are
+    merged into it (see canonical.apply_canonical_domain).
+    Domains the pipeline defers (cut off by an adaptive timeout budget) are
+    released for a retry, which gets a larger budget, and so are domains
+    whose fetch failed, instead of storing an error over a valid store's
+    results; CRAWL_MAX_ATTEMPTS bounds the retries.
+    """
+
+    def __init__(self, queue: WorkQueue = None, pipeline: CrawlPipeline = None, batch_size: int = None):
+        self.queue = queue or WorkQueue()
+        self.pipeline = pipeline or CrawlPipeline()
+        self.batch_size = batch_size or settings.CRAWL_WORKER_BATCH_SIZE
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    async def run(self, max_batches: Optional[int] = None, exit_when_empty: bool = False) -> Dict[str, int]:
+        """Lease and crawl batches until stopped (or the queue is empty)"""
+        totals = {"batches": 0, "crawled": 0, "dropped": 0, "released": 0, "deferred": 0, "merged": 0}
+        while not self._stop.is_set() and (max_batches is None or totals["batches"] < max_batches):
+            lease = await asyncio.to_thread(self.queue.lease, self.batch_size)
+            if lease is None:
+                if exit_when_empty:
+                    break
+                try:
+                    await asyncio.wait_for(self._stop.wait(), settings.CRAWL_WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            stats = await self.process(lease)
+            totals["batches"] += 1
+            for key, value in stats.items():
+                totals[key] += value
+        return totals
+
+    async def process(self, lease: Lease) -> Dict[str, int]:
+        """Crawl one leased batch, then acknowledge or release every item"""
+        # Database and Redis calls run in threads, the event loop keeps fetching
+        shops = await asyncio.to_thread(self._load_shops, lease.items)
+        unknown = [item for item in lease.items if item not in shops]
+        if unknown:
+            await asyncio.to_thread(self.queue.ack, lease, unknown)
+
+        previous = {
+            domain: (row.last_detection_result, row.last_classification_result)
+            for domain, row in shops.items()
+        }
+        catalogs = {domain: shop_catalog(row) for domain, row in shops.items() if row.catalog_crawled_at}
+        latencies = {domain: row.fetch_latency for domain, row in shops.items() if row.fetch_latency}
+        crawled = []
+        # {shop id: detection result} for shops whose aliases may have changed
+        detections = {}
+        deferred = 0
+        merged = 0
+        with _Heartbeat(self.queue, lease, settings.CRAWL_HEARTBEAT_INTERVAL):
+            try:
+                results = []
+                async for result in self.pipeline.run(list(shops), previous, catalogs, latencies, lease.attempts):
+                    if result.get("deferred"):
+                        deferred += 1
+                    # A failed fetch says nothing about the shop; retry it instead of storing the error
+                    elif "error" not in result["verification_result"]:
+                        results.append(result)
+                crawled, detections = await asyncio.to_thread(self._store_results, shops, results)
+            except Exception as e:
+                print(f"Crawl batch on shard {lease.shard} failed: {e}")
+
+            # The results are stored by now, a failed merge must not send them back for a retry
+            try:
+                merged = await asyncio.to_thread(self._apply_canonical_domains, detections)
+            except Exception as e:
+                print(f"Merging aliases of crawl batch on shard {lease.shard} failed: {e}")
+
+            await asyncio.to_thread(self.queue.ack, lease, crawled)
+            # Domains without a stored result go back for a retry
+            done = set(crawled)
+            failed = [domain for domain in shops if domain not in done]
+            released = await asyncio.to_thread(self.queue.release, lease, failed) if failed else 0
+        return {
+            "crawled": len(crawled), "dropped": len(unknown), "released": released, "deferred": deferred,
+            "merged": merged
+        }
+
+    @staticmethod
+    def _load_shops(domains: List[str]) -> Dict[str, object]:
+        """Active shops among the leased domains, by domain"""
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(
+                    Shop.id, Shop.domain, Shop.last_detection_result, Shop.last_classification_result,
+                    Shop.catalog_product_count, Shop.catalog_collection_count, Shop.catalog_price_p25,
+                    Shop.catalog_price_median, Shop.catalog_price_p75, Shop.catalog_womenswear_share,
+                    Shop.catalog_crawled_at, Shop.fetch_latency
+                ).where(Shop.domain.in_(domains), Shop.status != ShopStatus.INACTIVE)
+            ).all()
+        finally:
+            db.close()
+        return {row.domain: row for row in rows}
+
+    @staticmethod
+    def _store_results(shops: Dict[str, object], results: List[Dict]) -> Tuple[List[str], Dict[int, Dict]]:
+        """Write crawl results; returns the stored domains and the detections to merge aliases for"""
+        crawled = []
+        detections = {}
+        with ResultWriter(flush_interval=0) as writer:
+            for result in results:
+                shop = shops[result["domain"]]
+                writer.add_detection(shop.id, shop.domain, result["verification_result"])
+                writer.add_classification(shop.id, result["classification_result"])
+                if result.get("fetch_latency"):
+                    writer.add_latency(shop.id, result["fetch_latency"])
+                if not result["verification_result"].get("unchanged"):
+                    detections[shop.id] = result["verification_result"]
+                crawled.append(result["domain"])
+            writer.flush()
+        return crawled, detections
+
+    @staticmethod
+    def _apply_canonical_domains(detections: Dict[int, Dict]) -> int:
+        """Record aliases for freshly detected shops and merge duplicates; returns shops merged away"""
+        if not detections:
+            return 0
+        db = SessionLocal()
+        try:
+            merged = 0
+            for shop in db.query(Shop).filter(Shop.id.in_(detections)).order_by(Shop.id):
+                # Folded into another shop earlier in this batch
+                if shop.status == ShopStatus.INACTIVE:
+                    continue
+                if apply_canonical_domain(db, shop, detections[shop.id]) is not None:
+                    merged += 1
+            db.commit()
+        finally:
+            db.close()
+        if merged:
+            bump_data_version()
+        return merged
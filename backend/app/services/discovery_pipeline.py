@@ -0,0 +1,169 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.core.cache import bump_data_version
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.shop import Region, Shop
+from app.services.canonical import apply_canonical_domain, find_shop_by_domain
+from app.services.domain_discovery import DomainDiscovery
+from app.services.result_writer import detection_values
+from app.services.seen_domains import SeenDomainStore
+from app.services.shopify_detector import ShopifyDetector
+from app.utils.dns_cache import dns_cache
+
+
+class DiscoveryPipeline:
+    """Stream discovered domains straight into Shopify verification
+
+    Discovery sources, DNS pre-resolution and verification all run
+    concurrently: a candidate is verified as soon as it is found instead of
+    waiting for the whole discovery pass to finish. When a SeenDomainStore is
+    given, domains already stored as shops are skipped.
+    """
+
+    # Bloom positives are confirmed against the database in batches of this size
+    SEEN_CHECK_BATCH_SIZE = 50
+
+    def __init__(
+        self,
+        discovery: Optional[DomainDiscovery] = None,
+        seen: Optional[SeenDomainStore] = None,
+        concurrency: int = None
+    ):
+        self.discovery = discovery or DomainDiscovery()
+        self.seen = seen
+        self.concurrency = concurrency or settings.DISCOVERY_VERIFY_CONCURRENCY
+
+    async def run(self, region: str, limit: int = 50) -> AsyncIterator[Dict]:
+        """
+        Discover and verify domains for a region
+
+        Yields:
+            Domain dictionaries with a 'verification_result' entry, in
+            completion order. Domains that do not resolve are dropped.
+        """
+        candidates: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def _flush(pending: List[Dict]):
+            known = await asyncio.to_thread(
+                self.seen.known_in_db, [domain_info['domain'] for domain_info in pending]
+            )
+            for domain_info in pending:
+                if domain_info['domain'] not in known:
+                    await candidates.put(domain_info)
+            pending.clear()
+
+        async def _produce():
+            # Candidates the Bloom filter may have seen, awaiting an exact check
+            pending: List[Dict] = []
+            try:
+                if self.seen is not None and self.seen.bloom is None:
+                    # A Redis read, or a scan of the shops table without a snapshot; keep it off the loop
+                    await asyncio.to_thread(self.seen.load)
+                async for domain_info in self.discovery.stream_domains(region, limit):
+                    if self.seen is None or not self.seen.maybe_seen(domain_info['domain']):
+                        await candidates.put(domain_info)
+                        continue
+                    pending.append(domain_info)
+                    if len(pending) >= self.SEEN_CHECK_BATCH_SIZE:
+                        await _flush(pending)
+                if pending:
+                    await _flush(pending)
+            finally:
+                for _ in range(self.concurrency):
+                    await candidates.put(done)
+
+        async def _verify():
+            # One detector per worker, requests sessions are not shared across threads
+            detector = ShopifyDetector()
+            try:
+                while True:
+                    domain_info = await candidates.get()
+                    if domain_info is done:
+                        break
+
+                    resolved = await dns_cache.resolve(domain_info['domain'])
+                    if resolved is not None and resolved.negative:
+                        continue
+
+                    result = await asyncio.to_thread(detector.detect_shopify, domain_info['domain'])
+                    await results.put({**domain_info, 'verification_result': result})
+            finally:
+                await results.put(done)
+
+        producer = asyncio.create_task(_produce())
+        workers = [asyncio.create_task(_verify()) for _ in range(self.concurrency)]
+        remaining = len(workers)
+
+        try:
+            while remaining:
+                item = await results.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for task in [producer, *workers]:
+                task.cancel()
+            await asyncio.gather(producer, *workers, return_exceptions=True)
+
+
+async def discover_shops(region: str, limit: int = 50, pipeline: DiscoveryPipeline = None) -> Dict[str, int]:
+    """
+    Discover domains for a region and store the verified Shopify stores as shops
+
+    Each store is committed as soon as it is verified, with its detection
+    result, and folded into an existing shop when it is an alias of one.
+    Domains already stored are skipped before verification through the
+    persisted SeenDomainStore, which is saved with the new shops afterwards.
+    Database and Redis calls run in threads, off the event loop.
+    """
+    # The store is used from verification threads, so it gets its own session
+    seen_db = SessionLocal()
+    pipeline = pipeline or DiscoveryPipeline(seen=SeenDomainStore(seen_db))
+    totals = {'verified': 0, 'stored': 0}
+    db = SessionLocal()
+    try:
+        async for domain_info in pipeline.run(region, limit):
+            totals['verified'] += 1
+            result = domain_info['verification_result']
+            if not result.get('is_shopify') or 'error' in result:
+                continue
+            # One store at a time, so the session is never used by two threads at once
+            if not await asyncio.to_thread(_store_shop, db, region, domain_info):
+                continue
+            if pipeline.seen is not None:
+                pipeline.seen.add(domain_info['domain'])
+            totals['stored'] += 1
+        if pipeline.seen is not None:
+            await asyncio.to_thread(pipeline.seen.save)
+    finally:
+        db.close()
+        seen_db.close()
+
+    if totals['stored']:
+        await asyncio.to_thread(bump_data_version)
+    return totals
+
+
+def _store_shop(db: Session, region: str, domain_info: Dict) -> bool:
+    """Store a verified domain as a new shop; False if it is already stored"""
+    domain = domain_info['domain']
+    result = domain_info['verification_result']
+    if find_shop_by_domain(db, domain) is not None:
+        return False
+
+    shop = Shop(
+        domain=domain,
+        name=domain_info.get('name'),
+        region=Region(region),
+        **detection_values(domain, result)
+    )
+    db.add(shop)
+    db.flush()
+    apply_canonical_domain(db, shop, result)
+    db.commit()
+    return True
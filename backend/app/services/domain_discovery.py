@@ -1,7 +1,9 @@
+import asyncio
 import requests
-from typing import List, Dict
-import time
+from typing import AsyncIterator, List, Dict
 from app.core.config import settings
+from app.utils.dns_cache import dns_cache
+from app.utils.domains import normalize_domain
 
 class DomainDiscovery:
     """Discover potential Shopify domains"""
@@ -12,7 +14,7 @@ class DomainDiscovery:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
-    def discover_domains(self, region: str, limit: int = 50) -> List[Dict]:
+    async def discover_domains(self, region: str, limit: int = 50) -> List[Dict]:
         """
         Discover potential domains for a given region
         
@@ -23,25 +25,62 @@ class DomainDiscovery:
         Returns:
             List of domain dictionaries
         """
-        domains = []
+        domains = [domain_info async for domain_info in self.stream_domains(region, limit)]
         
-        # Method 1: Google Shopping search
-        google_domains = self._search_google_shopping(region, limit // 2)
-        domains.extend(google_domains)
+        # Drop domains that no longer resolve
+        return await self._drop_unresolvable(domains)
+    
+    async def stream_domains(self, region: str, limit: int = 50) -> AsyncIterator[Dict]:
+        """
+        Run all discovery sources concurrently and stream unique candidates
+        
+        Candidates are deduplicated as they arrive, so consumers can start
+        verifying the first domains while the sources are still searching.
+        """
+        sources = [
+            # Method 1: Google Shopping search
+            self._search_google_shopping(region, limit // 2),
+            # Method 2: Known Shopify directories
+            self._search_shopify_directories(region, limit // 2),
+            # Method 3: Social media discovery
+            self._search_social_media(region, limit // 4),
+        ]
+        
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(limit, 1))
+        done = object()
         
-        # Method 2: Known Shopify directories
-        directory_domains = self._search_shopify_directories(region, limit // 2)
-        domains.extend(directory_domains)
+        async def _drain(source: AsyncIterator[Dict]):
+            try:
+                async for domain_info in source:
+                    await queue.put(domain_info)
+            except Exception as e:
+                print(f"Error in discovery source: {e}")
+            finally:
+                await queue.put(done)
         
-        # Method 3: Social media discovery
-        social_domains = self._search_social_media(region, limit // 4)
-        domains.extend(social_domains)
+        tasks = [asyncio.create_task(_drain(source)) for source in sources]
+        seen = set()
+        remaining = len(tasks)
+        emitted = 0
         
-        # Remove duplicates and limit results
-        unique_domains = self._deduplicate_domains(domains)
-        return unique_domains[:limit]
+        try:
+            while remaining and emitted < limit:
+                item = await queue.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                
+                key = self._domain_key(item)
+                if key and key not in seen:
+                    seen.add(key)
+                    emitted += 1
+                    yield {**item, 'domain': key}
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
-    def _search_google_shopping(self, region: str, limit: int) -> List[Dict]:
+    async def _search_google_shopping(self, region: str, limit: int) -> AsyncIterator[Dict]:
         """Search Google Shopping for fashion stores"""
         fashion_keywords = [
             "women's fashion online store",
@@ -51,8 +90,11 @@ class DomainDiscovery:
             "women's clothing store"
         ]
         
-        domains = []
-        for keyword in fashion_keywords:
+        for i, keyword in enumerate(fashion_keywords):
+            # Be respectful between requests to the same host
+            if i:
+                await asyncio.sleep(settings.SCRAPING_DELAY)
+            
             try:
                 # Note: In production, you'd use Google Shopping API
                 # For MVP, we'll use a simplified approach
@@ -69,17 +111,14 @@ class DomainDiscovery:
                 # For MVP, we'll return some known domains
                 # In production, you'd parse the search results
                 sample_domains = self._get_sample_domains(region)
-                domains.extend(sample_domains[:limit // len(fashion_keywords)])
-                
-                time.sleep(settings.SCRAPING_DELAY)
+                for domain_info in sample_domains[:limit // len(fashion_keywords)]:
+                    yield domain_info
                 
             except Exception as e:
                 print(f"Error searching Google Shopping: {e}")
                 continue
-        
-        return domains
     
-    def _search_shopify_directories(self, region: str, limit: int) -> List[Dict]:
+    async def _search_shopify_directories(self, region: str, limit: int) -> AsyncIterator[Dict]:
         """Search known Shopify directories"""
         # Known Shopify store directories
         directories = [
@@ -87,27 +126,31 @@ class DomainDiscovery:
             "https://www.myip.ms/browse/sites/1/ownerID/376714/ownerID_A/1",
         ]
         
-        domains = []
-        for directory in directories:
-            try:
-                # For MVP, return sample domains
-                # In production, you'd scrape these directories
-                sample_domains = self._get_sample_domains(region)
-                domains.extend(sample_domains[:limit // len(directories)])
-                
-                time.sleep(settings.SCRAPING_DELAY)
-                
-            except Exception as e:
-                print(f"Error searching directory {directory}: {e}")
-                continue
+        async def _search_directory(directory: str) -> List[Dict]:
+            # For MVP, return sample domains
+            # In production, you'd scrape these directories
+            return self._get_sample_domains(region)[:limit // len(directories)]
         
-        return domains
+        # Directories live on different hosts, so they are searched in parallel
+        searches = [asyncio.ensure_future(_search_directory(directory)) for directory in directories]
+        try:
+            for search in asyncio.as_completed(searches):
+                try:
+                    for domain_info in await search:
+                        yield domain_info
+                except Exception as e:
+                    print(f"Error searching directory: {e}")
+                    continue
+        finally:
+            for search in searches:
+                search.cancel()
     
-    def _search_social_media(self, region: str, limit: int) -> List[Dict]:
+    async def _search_social_media(self, region: str, limit: int) -> AsyncIterator[Dict]:
         """Search social media for fashion stores"""
         # For MVP, return sample domains
         # In production, you'd use social media APIs
-        return self._get_sample_domains(region)[:limit]
+        for domain_info in self._get_sample_domains(region)[:limit]:
+            yield domain_info
     
     def _get_sample_domains(self, region: str) -> List[Dict]:
         """Get sample domains for MVP testing"""
@@ -151,19 +194,29 @@ class DomainDiscovery:
                 {"domain": "mytheresa.com", "name": "Mytheresa", "region": region},
             ]
     
+    def _domain_key(self, domain_info: Dict) -> str:
+        """Normalized domain used to detect duplicate candidates"""
+        return normalize_domain(domain_info.get('domain', '')) or ''
+    
     def _deduplicate_domains(self, domains: List[Dict]) -> List[Dict]:
         """Remove duplicate domains"""
         seen = set()
         unique_domains = []
         
         for domain_info in domains:
-            domain = domain_info.get('domain', '').lower()
+            domain = self._domain_key(domain_info)
             if domain and domain not in seen:
                 seen.add(domain)
-                unique_domains.append(domain_info)
+                unique_domains.append({**domain_info, 'domain': domain})
         
         return unique_domains
     
+    async def _drop_unresolvable(self, domains: List[Dict]) -> List[Dict]:
+        """Pre-resolve all candidates in parallel and drop NXDOMAIN domains"""
+        names = [domain_info['domain'] for domain_info in domains]
+        live = set(await dns_cache.prefilter(names))
+        return [domain_info for domain_info in domains if domain_info['domain'] in live]
+    
     def get_domain_info(self, domain: str) -> Dict:
         """Get additional information about a domain"""
         try:
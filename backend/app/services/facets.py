@@ -0,0 +1,95 @@
+from typing import Dict, List, Optional
+from sqlalchemy import Integer, cast, func, select, tuple_
+from sqlalchemy.orm import Session
+from app.models.shop import Region, Shop
+
+# Histogram buckets of width 1 over the 0-10 score range; 10 falls in the last one
+SCORE_BUCKETS = 10
+SCORE_COLUMNS = ("overall_score", "social_media_score", "seo_score")
+
+
+def _dimensions():
+    """(facet name, grouped expression) pairs"""
+    dimensions = [
+        ("region", Shop.region),
+        ("is_shopify", Shop.is_shopify),
+        ("is_womens_fashion", Shop.is_womens_fashion),
+    ]
+    for name in SCORE_COLUMNS:
+        # Casting to integer rounds on PostgreSQL, so floor first; clamped when read back
+        bucket = cast(func.floor(func.coalesce(getattr(Shop, name), 0.0)), Integer)
+        dimensions.append((name, bucket.label(f"{name}_bucket")))
+    return dimensions
+
+
+def compute_facets(
+    db: Session,
+    region: Optional[Region] = None,
+    is_shopify: Optional[bool] = None,
+    is_womens_fashion: Optional[bool] = None,
+) -> Dict:
+    """
+    Count shops per region, Shopify flag and fashion flag, and bucket scores
+
+    On PostgreSQL every facet comes from one GROUP BY GROUPING SETS query, a
+    single pass over the (filtered) table; GROUPING() tells the sets apart.
+    Other databases run one GROUP BY per facet.
+    """
+    conditions = []
+    if region is not None:
+        conditions.append(Shop.region == region)
+    if is_shopify is not None:
+        conditions.append(Shop.is_shopify == is_shopify)
+    if is_womens_fashion is not None:
+        conditions.append(Shop.is_womens_fashion == is_womens_fashion)
+
+    dimensions = _dimensions()
+    counts = {name: {} for name, _ in dimensions}
+    total = 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        expressions = [expression for _, expression in dimensions]
+        statement = (
+            select(
+                *expressions,
+                *[func.grouping(expression) for expression in expressions],
+                func.count(),
+            )
+            .where(*conditions)
+            .group_by(func.grouping_sets(*expressions, tuple_()))
+        )
+        n = len(dimensions)
+        for row in db.execute(statement):
+            grouped = [i for i in range(n) if row[n + i] == 0]
+            if grouped:
+                name = dimensions[grouped[0]][0]
+                counts[name][row[grouped[0]]] = row[-1]
+            else:
+                total = row[-1]
+    else:
+        for name, expression in dimensions:
+            statement = select(expression, func.count()).where(*conditions).group_by(expression)
+            counts[name] = dict(db.execute(statement).all())
+        total = db.execute(select(func.count()).select_from(Shop).where(*conditions)).scalar()
+
+    return {
+        "total": total,
+        "regions": {region.value: counts["region"].get(region, 0) for region in Region},
+        "is_shopify": _flag_counts(counts["is_shopify"]),
+        "is_womens_fashion": _flag_counts(counts["is_womens_fashion"]),
+        "score_histograms": {name: _histogram(counts[name]) for name in SCORE_COLUMNS},
+    }
+
+
+def _flag_counts(counts: Dict) -> Dict[str, int]:
+    return {"true": counts.get(True, 0), "false": counts.get(False, 0)}
+
+
+def _histogram(counts: Dict[int, int]) -> List[Dict]:
+    buckets = [0] * SCORE_BUCKETS
+    for bucket, count in counts.items():
+        buckets[min(max(int(bucket), 0), SCORE_BUCKETS - 1)] += count
+    return [
+        {"lower": float(i), "upper": float(i + 1), "count": count}
+        for i, count in enumerate(buckets)
+    ]
@@ -1,12 +1,91 @@
 import re
-from typing import Dict, List
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from bs4 import BeautifulSoup
 import requests
+from app.core.config import settings
+from app.core.metrics import observe_classification, observe_fetch, record_crawl_error
+from app.services.browser_pool import needs_rendering, render_page
+from app.utils.content_hash import fingerprint, is_unchanged
+from app.utils.dns_cache import dns_cache
+from app.utils.tracing import StageTimer
+
+# Candidate labels for the zero-shot model; the first one is the positive class
+MODEL_LABELS = [
+    "women's clothing and fashion",
+    "men's clothing",
+    "children's clothing and toys",
+    "beauty and cosmetics",
+    "electronics",
+    "home and furniture",
+    "sports equipment",
+    "other products",
+]
+
+# Keyword-heuristic confidence above which a site counts as women's fashion
+KEYWORD_THRESHOLD = 0.6
+
+
+def apply_catalog(result: Dict, catalog: Optional[Dict]) -> Dict:
+    """
+    Blend a store's catalog into a classification result
+    
+    The womenswear share of the catalog (see catalog_crawler) weighs
+    CATALOG_CLASSIFICATION_WEIGHT in the confidence, the homepage the rest.
+    The homepage confidence is kept as 'page_confidence', so blending an
+    already blended result with a newer catalog gives the same answer as
+    blending the original. Results with errors, unchanged results and
+    catalogs under CATALOG_MIN_PRODUCTS products are returned as is.
+    """
+    if (
+        not catalog or 'error' in result or result.get('unchanged')
+        or catalog.get('womenswear_share') is None
+        or (catalog.get('product_count') or 0) < settings.CATALOG_MIN_PRODUCTS
+    ):
+        return result
+    
+    page_confidence = result.get('page_confidence', result['confidence'])
+    weight = settings.CATALOG_CLASSIFICATION_WEIGHT
+    confidence = (1 - weight) * page_confidence + weight * catalog['womenswear_share']
+    threshold = settings.FASHION_MODEL_THRESHOLD if result.get('method') == 'model' else KEYWORD_THRESHOLD
+    return {
+        **result,
+        'is_womens_fashion': confidence > threshold,
+        'confidence': confidence,
+        'page_confidence': page_confidence,
+        'catalog_womenswear_share': catalog['womenswear_share'],
+        'catalog_product_count': catalog['product_count'],
+    }
+
+@lru_cache(maxsize=1)
+def load_fashion_model(model_name: str, quantize: bool):
+    """
+    Load the zero-shot classification pipeline once per process
+    
+    Linear layers are dynamically quantized to int8, which roughly halves
+    CPU inference time for transformer encoders.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+    
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    if quantize:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer, device=-1)
 
 class FashionClassifier:
     """Classify if a website sells women's fashion"""
     
-    def __init__(self):
+    def __init__(self, mode: str = None, render: bool = True):
+        # "keyword" uses the heuristic below, "model" a transformer with keyword fallback
+        self.mode = mode or settings.FASHION_CLASSIFIER_MODE
+        # Whether JS-only pages may be rendered (RENDERING_ENABLED); off where the caller renders
+        self.render = render
+        
         # Keywords for women's fashion
         self.womens_fashion_keywords = [
             # Clothing types
@@ -51,61 +130,193 @@ class FashionClassifier:
             'books', 'music', 'movies', 'games'
         ]
     
-    def classify_fashion(self, domain: str, html_content: str = None) -> Dict[str, any]:
+    def classify_fashion(
+        self,
+        domain: str,
+        html_content: str = None,
+        previous_result: Optional[Dict] = None,
+        trace: bool = False,
+        catalog: Optional[Dict] = None
+    ) -> Dict[str, any]:
         """
         Classify if a website sells women's fashion
         
         Args:
             domain: Website domain
             html_content: HTML content if already fetched
+            previous_result: Last classification result for this domain;
+                returned again (with 'unchanged': True) if the page has not changed
+            trace: Add per-stage timings in milliseconds under 'timings'
+            catalog: The store's catalog summary, if crawled; blended into
+                the confidence (see apply_catalog)
             
         Returns:
             Dict with classification results
         """
-        if not html_content:
-            html_content = self._fetch_content(domain)
-        
-        if not html_content:
-            return {
-                'is_womens_fashion': False,
-                'confidence': 0.0,
-                'error': 'Could not fetch content'
-            }
+        return self.classify_batch([(domain, html_content)], [previous_result], trace, [catalog])[0]
+    
+    def classify_batch(
+        self,
+        pages: List[Tuple[str, Optional[str]]],
+        previous_results: Optional[List[Optional[Dict]]] = None,
+        trace: bool = False,
+        catalogs: Optional[List[Optional[Dict]]] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Classify several websites at once
         
-        # Parse HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        In model mode all page texts go through the model in batches of
+        FASHION_MODEL_BATCH_SIZE; if the model cannot be used, the keyword
+        heuristic is applied instead.
         
-        # Extract text content
-        text_content = self._extract_text(soup)
+        Args:
+            pages: (domain, html_content) pairs, html_content may be None
+            previous_results: Last classification result per page, if any
+            trace: Add per-stage timings to each result and log them; the
+                model stage is the time of the whole batch
+            catalogs: Catalog summary per page, if any (see apply_catalog)
+            
+        Returns:
+            Classification result dicts, in input order
+        """
+        results: List[Optional[Dict]] = [None] * len(pages)
+        timers: List[Optional[StageTimer]] = [None] * len(pages)
+        parsed = []
         
-        # Analyze content
-        analysis = self._analyze_content(text_content, soup)
+        for i, (domain, html_content) in enumerate(pages):
+            timer = timers[i] = StageTimer(enabled=trace)
+            if not html_content:
+                with timer.stage('fetch'):
+                    html_content = self._fetch_content(domain)
+            
+            if not html_content:
+                results[i] = {
+                    'is_womens_fashion': False,
+                    'confidence': 0.0,
+                    'error': 'Could not fetch content'
+                }
+                continue
+            
+            # Reuse the previous result if the page did not change
+            with timer.stage('fingerprint'):
+                page_fingerprint = fingerprint(html_content)
+            previous_result = previous_results[i] if previous_results else None
+            if is_unchanged(page_fingerprint, previous_result):
+                results[i] = {**previous_result, 'unchanged': True}
+                continue
+            
+            # JS-only storefronts: classify the rendered DOM, not the empty shell
+            rendered = False
+            if self.render and needs_rendering(html_content):
+                url = domain if domain.startswith(('http://', 'https://')) else f"https://{domain}"
+                with timer.stage('render'):
+                    page = render_page(url)
+                if page is not None:
+                    html_content = page.html
+                    rendered = True
+            
+            started = time.perf_counter()
+            
+            # Parse HTML
+            with timer.stage('parse'):
+                soup = BeautifulSoup(html_content, 'html.parser')
+            
+            # Extract text content
+            with timer.stage('extract_text'):
+                text_content = self._extract_text(soup)
+            
+            # Analyze content
+            with timer.stage('analyze'):
+                analysis = self._analyze_content(text_content, soup)
+            observe_classification('analysis', time.perf_counter() - started)
+            parsed.append((i, text_content, analysis, page_fingerprint, rendered))
         
-        # Calculate confidence
-        confidence = self._calculate_confidence(analysis)
-        is_womens_fashion = confidence > 0.6
+        model_scores = None
+        model_error = None
+        if self.mode == 'model' and parsed:
+            started = time.perf_counter()
+            try:
+                model_scores = self._model_scores([text_content for _, text_content, _, _, _ in parsed])
+            except Exception as e:
+                model_error = str(e)
+            model_seconds = time.perf_counter() - started
+            observe_classification('model', model_seconds)
+            for i, _, _, _, _ in parsed:
+                timers[i].record('model', model_seconds)
         
-        return {
-            'is_womens_fashion': is_womens_fashion,
-            'confidence': confidence,
-            'analysis': analysis,
-            'keywords_found': analysis['keywords_found'],
-            'exclusion_keywords_found': analysis['exclusion_keywords_found']
-        }
+        for j, (i, _, analysis, page_fingerprint, rendered) in enumerate(parsed):
+            if model_scores is not None:
+                confidence = model_scores[j]
+                is_womens_fashion = confidence > settings.FASHION_MODEL_THRESHOLD
+            else:
+                # Calculate confidence
+                confidence = self._calculate_confidence(analysis)
+                is_womens_fashion = confidence > KEYWORD_THRESHOLD
+            
+            results[i] = {
+                'is_womens_fashion': is_womens_fashion,
+                'confidence': confidence,
+                'analysis': analysis,
+                'keywords_found': analysis['keywords_found'],
+                'exclusion_keywords_found': analysis['exclusion_keywords_found'],
+                'method': 'model' if model_scores is not None else 'keyword',
+                'content_digest': page_fingerprint[0],
+                'content_simhash': page_fingerprint[1]
+            }
+            if rendered:
+                results[i]['rendered'] = True
+            if model_error:
+                results[i]['model_error'] = model_error
+            if catalogs:
+                results[i] = apply_catalog(results[i], catalogs[i])
+        
+        for i, (domain, _) in enumerate(pages):
+            # Timings stored with a previous result are not this run's
+            results[i].pop('timings', None)
+            if trace:
+                results[i]['timings'] = timers[i].finish('classify_fashion', domain)
+        
+        return results
+    
+    def _model_scores(self, texts: List[str]) -> List[float]:
+        """Probability of the women's fashion label for each page text"""
+        classifier = load_fashion_model(settings.FASHION_MODEL_NAME, settings.FASHION_MODEL_QUANTIZE)
+        outputs = classifier(
+            [text[:settings.FASHION_MODEL_MAX_CHARS] for text in texts],
+            candidate_labels=MODEL_LABELS,
+            batch_size=settings.FASHION_MODEL_BATCH_SIZE
+        )
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+        
+        return [
+            float(output['scores'][output['labels'].index(MODEL_LABELS[0])])
+            for output in outputs
+        ]
     
     def _fetch_content(self, domain: str) -> str:
         """Fetch HTML content from domain"""
         if not domain.startswith(('http://', 'https://')):
             domain = f"https://{domain}"
         
+        if dns_cache.is_known_dead(domain):
+            record_crawl_error('classifier', domain, 'dns')
+            return None
+        
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
+            started = time.perf_counter()
             response = requests.get(domain, headers=headers, timeout=30)
+            observe_fetch('classifier', 'homepage', time.perf_counter() - started, len(response.content))
             response.raise_for_status()
             return response.text
+        except requests.Timeout:
+            record_crawl_error('classifier', domain, 'timeout')
+            return None
         except:
+            record_crawl_error('classifier', domain, 'error')
             return None
     
     def _extract_text(self, soup: BeautifulSoup) -> str:
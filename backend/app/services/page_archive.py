@@ -0,0 +1,184 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import quote, unquote
+import zstandard
+from app.core.config import settings
+
+# File names are fetch times, so they sort chronologically
+_TIME_FORMAT = '%Y%m%dT%H%M%S.%fZ'
+_SUFFIX = '.zst'
+
+_local = threading.local()
+
+
+class ArchivedPage(NamedTuple):
+    domain: str
+    fetched_at: datetime
+    content: bytes
+    encoding: Optional[str]
+    status_code: Optional[int]
+    final_url: Optional[str]
+    redirect_chain: List[str]
+    probes: Optional[Dict]
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    # zstd contexts are not thread-safe; one per thread is reused across pages
+    if getattr(_local, 'compressor', None) is None:
+        _local.compressor = zstandard.ZstdCompressor(level=settings.ARCHIVE_COMPRESSION_LEVEL)
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.compressor
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    _compressor()
+    return _local.decompressor
+
+
+class PageArchive:
+    """Fetched homepages stored as zstd blobs, keyed by domain and fetch time
+
+    Each fetch is one file, {root}/{bucket}/{domain}/{fetch time}.zst,
+    holding a JSON header (status, final URL, redirect chain, encoding and
+    the Shopify probe summary) followed by the raw body, compressed as one
+    zstd frame. Buckets (crc32 of the domain) keep directories small.
+    Files are written under a temporary name and renamed, so readers never
+    see partial blobs. prune() applies the retention policy; the newest
+    ARCHIVE_KEEP_LATEST pages of a domain are kept regardless of age so
+    every archived shop can still be replayed.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or settings.ARCHIVE_DIR
+        # A relative path would depend on the working directory of whichever process writes
+        if not os.path.isabs(self.root):
+            raise ValueError(f"ARCHIVE_DIR must be an absolute path, got {self.root!r}")
+
+    def domain_dir(self, domain: str) -> str:
+        bucket = f"{zlib.crc32(domain.encode()) % 256:02x}"
+        return os.path.join(self.root, bucket, quote(domain, safe='.-_'))
+
+    @staticmethod
+    def domain_of(path: str) -> str:
+        """Domain a page path belongs to"""
+        return unquote(os.path.basename(os.path.dirname(path)))
+
+    def store(
+        self,
+        domain: str,
+        content: bytes,
+        encoding: Optional[str] = None,
+        status_code: Optional[int] = None,
+        final_url: Optional[str] = None,
+        redirect_chain: Optional[List[str]] = None,
+        probes: Optional[Dict] = None,
+        fetched_at: datetime = None
+    ) -> str:
+        """Archive one fetched page, returning its path"""
+        fetched_at = fetched_at or datetime.utcnow()
+        header = json.dumps({
+            'domain': domain,
+            'fetched_at': fetched_at.isoformat(),
+            'encoding': encoding,
+            'status_code': status_code,
+            'final_url': final_url,
+            'redirect_chain': redirect_chain or [],
+            'probes': probes,
+        }).encode('utf-8')
+        blob = _compressor().compress(struct.pack('>I', len(header)) + header + content)
+
+        directory = self.domain_dir(domain)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, fetched_at.strftime(_TIME_FORMAT) + _SUFFIX)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(blob)
+        os.replace(temporary, path)
+        return path
+
+    @staticmethod
+    def load(path: str) -> ArchivedPage:
+        with open(path, 'rb') as f:
+            data = _decompressor().decompress(f.read())
+        (header_size,) = struct.unpack('>I', data[:4])
+        header = json.loads(data[4:4 + header_size])
+        return ArchivedPage(
+            domain=header['domain'],
+            fetched_at=datetime.fromisoformat(header['fetched_at']),
+            content=data[4 + header_size:],
+            encoding=header['encoding'],
+            status_code=header['status_code'],
+            final_url=header['final_url'],
+            redirect_chain=header['redirect_chain'],
+            probes=header['probes'],
+        )
+
+    def history(self, domain: str) -> List[str]:
+        """Archived page paths of a domain, oldest first"""
+        return self._pages(self.domain_dir(domain))
+
+    def latest(self, domain: str) -> Optional[ArchivedPage]:
+        pages = self.history(domain)
+        return self.load(pages[-1]) if pages else None
+
+    def iter_latest(self, since: datetime = None) -> Iterator[str]:
+        """Path of the newest page of every archived domain (fetched at or after since)"""
+        cutoff = since.strftime(_TIME_FORMAT) + _SUFFIX if since else None
+        for directory in self._domain_dirs():
+            pages = self._pages(directory)
+            if pages and (cutoff is None or os.path.basename(pages[-1]) >= cutoff):
+                yield pages[-1]
+
+    def prune(self, retention_days: float = None, keep_latest: int = None) -> int:
+        """Delete pages older than retention_days, except each domain's newest keep_latest"""
+        retention_days = settings.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+        keep_latest = settings.ARCHIVE_KEEP_LATEST if keep_latest is None else keep_latest
+        cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime(_TIME_FORMAT) + _SUFFIX
+
+        removed = 0
+        for directory in list(self._domain_dirs()):
+            pages = self._pages(directory)
+            expendable = pages[:-keep_latest] if keep_latest else pages
+            expired = [path for path in expendable if os.path.basename(path) < cutoff]
+            for path in expired:
+                os.remove(path)
+            removed += len(expired)
+            if expired and len(expired) == len(pages):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    # A page is being written to it
+                    pass
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Archived domains, pages and bytes on disk"""
+        totals = {'domains': 0, 'pages': 0, 'bytes': 0}
+        for directory in self._domain_dirs():
+            pages = self._pages(directory)
+            totals['domains'] += bool(pages)
+            totals['pages'] += len(pages)
+            totals['bytes'] += sum(os.path.getsize(path) for path in pages)
+        return totals
+
+    def _domain_dirs(self) -> Iterator[str]:
+        if not os.path.isdir(self.root):
+            return
+        for bucket in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    if entry.is_dir():
+                        yield entry.path
+
+    @staticmethod
+    def _pages(directory: str) -> List[str]:
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith(_SUFFIX))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(directory, name) for name in names]
@@ -0,0 +1,203 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import cast, column, update, values
+from sqlalchemy.orm import Session
+from app.core.cache import bump_data_version
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.shop import Shop
+from app.services.canonical import canonical_domain_for
+
+_shops = Shop.__table__
+
+# Shop columns holding the keys of a catalog summary (catalog_crawler.CatalogStats)
+CATALOG_COLUMNS = {
+    'product_count': 'catalog_product_count',
+    'collection_count': 'catalog_collection_count',
+    'price_p25': 'catalog_price_p25',
+    'price_median': 'catalog_price_median',
+    'price_p75': 'catalog_price_p75',
+    'womenswear_share': 'catalog_womenswear_share',
+}
+
+
+def detection_values(shop_domain: str, result: Dict, checked_at: datetime = None) -> Dict[str, Any]:
+    """Column values to store for a ShopifyDetector result"""
+    checked_at = checked_at or datetime.utcnow()
+    row = {'last_checked': checked_at}
+
+    # An unchanged homepage keeps the previous results, only last_checked moves
+    if result.get('unchanged'):
+        return row
+
+    row['is_shopify'] = result['is_shopify']
+    row['shopify_verified_at'] = checked_at
+    if 'error' not in result:
+        row['last_detection_result'] = _without_timings(result)
+        # Probe-verified results have no homepage fingerprint; keep the stored one
+        if result['content_digest'] is not None:
+            row['content_digest'] = result['content_digest']
+            row['content_simhash'] = result['content_simhash']
+        row['canonical_domain'] = canonical_domain_for(shop_domain, result)
+        row['redirect_chain'] = result.get('redirect_chain')
+    return row
+
+
+def classification_values(result: Dict, checked_at: datetime = None) -> Dict[str, Any]:
+    """Column values to store for a FashionClassifier result"""
+    checked_at = checked_at or datetime.utcnow()
+    row = {'last_checked': checked_at}
+
+    if result.get('unchanged'):
+        return row
+
+    row['is_womens_fashion'] = result['is_womens_fashion']
+    row['category_confidence'] = result['confidence']
+    row['category_verified_at'] = checked_at
+    if 'error' not in result:
+        row['last_classification_result'] = _without_timings(result)
+        row['content_digest'] = result['content_digest']
+        row['content_simhash'] = result['content_simhash']
+    return row
+
+
+def catalog_values(catalog: Dict, classification: Optional[Dict] = None, crawled_at: datetime = None) -> Dict[str, Any]:
+    """Column values to store for a catalog summary and the classification re-blended with it"""
+    row = {column: catalog[key] for key, column in CATALOG_COLUMNS.items()}
+    row['catalog_crawled_at'] = crawled_at or datetime.utcnow()
+    if classification is not None:
+        row['is_womens_fashion'] = classification['is_womens_fashion']
+        row['category_confidence'] = classification['confidence']
+        row['last_classification_result'] = _without_timings(classification)
+    return row
+
+
+def _without_timings(result: Dict) -> Dict:
+    # Stage timings describe one run and are not worth persisting
+    return {key: value for key, value in result.items() if key != 'timings'}
+
+
+class ResultWriter:
+    """Buffer per-shop column updates and write them in batches
+
+    Updates for the same shop are merged. A flush groups rows by the set of
+    columns they touch and writes each group with one
+    UPDATE shops ... FROM (VALUES ...) statement on PostgreSQL (executemany
+    elsewhere), instead of one transaction per row.
+
+    With a session, flushes run inside it and the caller commits (API
+    path). Without one, every flush uses its own session and commits, and
+    a background thread flushes at least every flush_interval seconds
+    (worker path); call close() when done.
+    """
+
+    def __init__(self, db: Optional[Session] = None, batch_size: int = None, flush_interval: float = None):
+        self.db = db
+        self.batch_size = batch_size or settings.RESULT_WRITER_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.RESULT_WRITER_FLUSH_INTERVAL
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if self.db is None and self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._thread.start()
+
+    def add(self, shop_id: int, row: Dict[str, Any]):
+        """Queue column values for a shop, flushing when the batch is full"""
+        with self._lock:
+            self._rows.setdefault(shop_id, {}).update(row)
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self.flush()
+
+    def add_detection(self, shop_id: int, shop_domain: str, result: Dict, checked_at: datetime = None):
+        self.add(shop_id, detection_values(shop_domain, result, checked_at))
+
+    def add_classification(self, shop_id: int, result: Dict, checked_at: datetime = None):
+        self.add(shop_id, classification_values(result, checked_at))
+
+    def add_catalog(self, shop_id: int, catalog: Dict, classification: Optional[Dict] = None,
+                    crawled_at: datetime = None):
+        self.add(shop_id, catalog_values(catalog, classification, crawled_at))
+
+    def add_latency(self, shop_id: int, samples: Dict):
+        self.add(shop_id, {'fetch_latency': samples})
+
+    def flush(self) -> int:
+        """Write all buffered rows, returning the number of shops updated"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, {}
+                self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+
+            if self.db is not None:
+                self._write(self.db, rows)
+                return len(rows)
+
+            db = SessionLocal()
+            try:
+                self._write(db, rows)
+                db.commit()
+                bump_data_version()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            return len(rows)
+
+    def close(self):
+        """Stop the background flusher and write what is left"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval / 2):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error flushing crawl results: {e}")
+
+    def _write(self, db: Session, rows: Dict[int, Dict[str, Any]]):
+        groups: Dict[Tuple[str, ...], list] = {}
+        for shop_id, row in rows.items():
+            groups.setdefault(tuple(sorted(row)), []).append({'id': shop_id, **row})
+
+        postgres = db.get_bind().dialect.name == 'postgresql'
+        for columns, group in groups.items():
+            for start in range(0, len(group), self.batch_size):
+                chunk = group[start:start + self.batch_size]
+                if postgres:
+                    self._update_from_values(db, columns, chunk)
+                else:
+                    db.execute(update(Shop), chunk)
+
+    def _update_from_values(self, db: Session, columns: Tuple[str, ...], chunk: list):
+        names = ('id',) + columns
+        data = values(
+            *(column(name, _shops.c[name].type) for name in names),
+            name='v'
+        ).data([tuple(row[name] for name in names) for row in chunk])
+
+        db.execute(
+            update(_shops)
+            .where(_shops.c.id == data.c.id)
+            .values({name: cast(data.c[name], _shops.c[name].type) for name in columns})
+        )
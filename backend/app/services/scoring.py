@@ -0,0 +1,180 @@
+import time
+from typing import Dict, Union
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, select, text, type_coerce, update
+from sqlalchemy.orm import Session
+from app.core.cache import bump_data_version
+from app.core.config import settings
+from app.models.shop import Shop, ShopStatus
+
+# Shop columns a weighting config may use
+METRICS = ("traffic_rank", "monthly_visits", "social_media_score", "seo_score", "catalog_product_count")
+
+# Metric weights used to compute overall_score, selected by name through
+# settings.SCORING_WEIGHTS or passed directly to ScoringEngine
+WEIGHT_PRESETS: Dict[str, Dict[str, float]] = {
+    "default": {
+        "traffic_rank": 0.25,
+        "monthly_visits": 0.25,
+        "social_media_score": 0.2,
+        "seo_score": 0.2,
+    },
+    # For when most shops have had their catalog crawled (crawl_catalogs.py)
+    "catalog": {
+        "traffic_rank": 0.25,
+        "monthly_visits": 0.25,
+        "social_media_score": 0.2,
+        "seo_score": 0.2,
+        "catalog_product_count": 0.1,
+    },
+    "traffic": {
+        "traffic_rank": 0.4,
+        "monthly_visits": 0.4,
+        "social_media_score": 0.1,
+        "seo_score": 0.1,
+    },
+    "engagement": {
+        "traffic_rank": 0.15,
+        "monthly_visits": 0.15,
+        "social_media_score": 0.5,
+        "seo_score": 0.2,
+    },
+}
+
+# Metrics where a lower raw value is better
+LOWER_IS_BETTER = {"traffic_rank"}
+
+# Metrics with heavy-tailed distributions, compared on a log scale
+LOG_SCALED = {"traffic_rank", "monthly_visits", "catalog_product_count"}
+
+# Metrics only some shops have measured yet; the others get the middle rank instead of 0
+NEUTRAL_WHEN_MISSING = {"catalog_product_count"}
+
+# overall_score is reported on the same 0-10 scale as the seeded data
+SCORE_SCALE = 10.0
+
+
+class ScoringEngine:
+    """Compute overall_score for all active shops in one vectorized pass
+
+    Metrics are loaded column-wise in batches, converted to percentile ranks
+    within each region, combined with a weighting config and written back
+    with bulk UPDATE statements.
+    """
+
+    def __init__(self, db: Session, weights: Union[str, Dict[str, float]] = None, batch_size: int = None):
+        self.db = db
+        self.weights = self._resolve_weights(weights or settings.SCORING_WEIGHTS)
+        self.batch_size = batch_size or settings.SCORING_BATCH_SIZE
+
+    def _resolve_weights(self, weights: Union[str, Dict[str, float]]) -> Dict[str, float]:
+        if isinstance(weights, str):
+            if weights not in WEIGHT_PRESETS:
+                raise ValueError(f"Unknown scoring weights preset: {weights}")
+            weights = WEIGHT_PRESETS[weights]
+
+        unknown = set(weights) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown scoring metrics: {', '.join(sorted(unknown))}")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("Scoring weights must sum to a positive value")
+        return {metric: weight / total for metric, weight in weights.items()}
+
+    def rescore(self) -> Dict:
+        """Recompute and store overall_score for all active shops"""
+        started = time.perf_counter()
+        frame = self.load_metrics()
+        loaded = time.perf_counter()
+
+        scores = self.compute_scores(frame)
+        computed = time.perf_counter()
+
+        updated = self.write_scores(frame["id"].to_numpy(), scores)
+        self.db.commit()
+        bump_data_version()
+        finished = time.perf_counter()
+
+        return {
+            "shops_scored": len(frame),
+            "shops_updated": updated,
+            "load_seconds": round(loaded - started, 3),
+            "compute_seconds": round(computed - loaded, 3),
+            "write_seconds": round(finished - computed, 3),
+        }
+
+    def load_metrics(self) -> pd.DataFrame:
+        """Load the scoring inputs of all active shops as a DataFrame"""
+        metrics = list(METRICS)
+        # Regions are only used as group keys, read them raw to skip Enum conversion
+        columns = [Shop.id, type_coerce(Shop.region, String)] + [getattr(Shop, metric) for metric in metrics]
+        result = self.db.execute(
+            select(*columns)
+            .where(Shop.status == ShopStatus.ACTIVE)
+            .execution_options(yield_per=self.batch_size)
+        )
+
+        frames = [
+            pd.DataFrame.from_records(list(partition), columns=["id", "region"] + metrics)
+            for partition in result.partitions()
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["id", "region"] + metrics)
+
+        frame = pd.concat(frames, ignore_index=True)
+        frame["region"] = frame["region"].astype("category")
+        for metric in metrics:
+            frame[metric] = pd.to_numeric(frame[metric], errors="coerce").astype("float64")
+        return frame
+
+    def compute_scores(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Compute overall scores for a metrics frame
+
+        Each metric is turned into a percentile rank within the shop's region
+        (missing values score 0, or 0.5 for NEUTRAL_WHEN_MISSING metrics) and
+        the ranks are combined with the weights.
+        """
+        if frame.empty:
+            return np.empty(0, dtype=np.float64)
+
+        total = np.zeros(len(frame), dtype=np.float64)
+        groups = frame["region"]
+        for metric, weight in self.weights.items():
+            values = frame[metric]
+            if metric in LOG_SCALED:
+                values = np.log1p(values.clip(lower=0))
+            ranks = values.groupby(groups, observed=True).rank(
+                method="average", pct=True, ascending=metric not in LOWER_IS_BETTER
+            )
+            missing = 0.5 if metric in NEUTRAL_WHEN_MISSING else 0.0
+            total += weight * ranks.fillna(missing).to_numpy()
+
+        return np.round(total * SCORE_SCALE, 4)
+
+    def write_scores(self, ids: np.ndarray, scores: np.ndarray) -> int:
+        """Bulk-write scores, skipping rows whose score did not change"""
+        updated = 0
+        for start in range(0, len(ids), self.batch_size):
+            chunk_ids = ids[start:start + self.batch_size].tolist()
+            chunk_scores = scores[start:start + self.batch_size].tolist()
+
+            if self.db.get_bind().dialect.name == "postgresql":
+                result = self.db.execute(
+                    text(
+                        "UPDATE shops SET overall_score = v.score, updated_at = now() "
+                        "FROM (SELECT unnest(CAST(:ids AS integer[])) AS id, "
+                        "unnest(CAST(:scores AS double precision[])) AS score) AS v "
+                        "WHERE shops.id = v.id AND shops.overall_score IS DISTINCT FROM v.score"
+                    ),
+                    {"ids": chunk_ids, "scores": chunk_scores}
+                )
+                updated += result.rowcount
+            else:
+                self.db.execute(
+                    update(Shop),
+                    [{"id": shop_id, "overall_score": score} for shop_id, score in zip(chunk_ids, chunk_scores)]
+                )
+                updated += len(chunk_ids)
+        return updated
@@ -0,0 +1,101 @@
+from typing import List, Tuple
+from sqlalchemy import Float, cast, func, literal_column, or_, select, text, union
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Query, Session
+from app.core.config import settings
+from app.models.shop import Shop
+
+# Name, description and the words of the domain (luna-rose.com -> luna rose com).
+# Must match the indexed expression exactly for the planner to use the index.
+SEARCH_VECTOR_SQL = (
+    "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '') "
+    "|| ' ' || translate(domain, '.-', '  '))"
+)
+
+# PostgreSQL search indexes, created outside create_all because they need
+# expressions, GIN and (for fuzzy domain matches) the pg_trgm extension
+SEARCH_INDEXES: List[Tuple[str, str]] = [
+    ("ix_shops_search_vector", f"CREATE INDEX IF NOT EXISTS ix_shops_search_vector ON shops USING gin ({SEARCH_VECTOR_SQL})"),
+    ("ix_shops_domain_prefix", "CREATE INDEX IF NOT EXISTS ix_shops_domain_prefix ON shops (domain text_pattern_ops)"),
+    ("ix_shops_domain_trgm", "CREATE INDEX IF NOT EXISTS ix_shops_domain_trgm ON shops USING gin (domain gin_trgm_ops)"),
+]
+
+_trigram_available = {}
+
+
+def ensure_search_indexes(engine: Engine):
+    """
+    Create the full-text and trigram indexes if they do not exist yet
+
+    Each statement runs in its own transaction, so a missing pg_trgm
+    extension only disables fuzzy domain matching. No-op on other databases.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    statements = [("pg_trgm", "CREATE EXTENSION IF NOT EXISTS pg_trgm")] + SEARCH_INDEXES
+    for name, statement in statements:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(statement))
+        except DBAPIError as e:
+            print(f"Could not create {name}, search will fall back to slower matching: {e.orig}")
+    _trigram_available.clear()
+
+
+def drop_search_indexes(connection: Connection):
+    """Drop the search indexes, e.g. before a bulk load; recreate with ensure_search_indexes"""
+    if connection.dialect.name == "postgresql":
+        for name, _ in SEARCH_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def has_trigram(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.url not in _trigram_available:
+        _trigram_available[bind.url] = bool(db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).scalar())
+    return _trigram_available[bind.url]
+
+
+def search_shops(db: Session, query: Query, q: str) -> Query:
+    """
+    Restrict a shop query to matches for q, ordered by relevance
+
+    On PostgreSQL, name, description and domain words are matched with full-text search
+    (websearch syntax: quoted phrases, OR, -exclusions) and the domain with
+    trigram similarity and substring match, or by prefix where pg_trgm is
+    not installed. Relevance is blended with overall_score by
+    SEARCH_SCORE_WEIGHT. Other databases fall back to case-insensitive
+    substring matching ordered by overall_score.
+    """
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    if db.get_bind().dialect.name != "postgresql":
+        return query.filter(or_(
+            Shop.name.ilike(pattern, escape="\\"),
+            Shop.description.ilike(pattern, escape="\\"),
+            Shop.domain.ilike(pattern, escape="\\"),
+        )).order_by(Shop.overall_score.desc(), Shop.id)
+
+    vector = literal_column(SEARCH_VECTOR_SQL)
+    tsquery = func.websearch_to_tsquery("english", q)
+    text_match = vector.op("@@")(tsquery)
+    relevance = func.ts_rank_cd(vector, tsquery)
+
+    if has_trigram(db):
+        # ILIKE and % both use the trigram index
+        domain_match = or_(Shop.domain.ilike(pattern, escape="\\"), Shop.domain.op("%")(q))
+        relevance = relevance + func.similarity(Shop.domain, q)
+    else:
+        # A substring match would scan the table; prefixes use ix_shops_domain_prefix
+        domain_match = Shop.domain.startswith(q.strip().lower(), autoescape=True)
+
+    # A union rather than OR, so each branch can use its own index
+    matches = union(select(Shop.id).where(text_match), select(Shop.id).where(domain_match))
+
+    weight = settings.SEARCH_SCORE_WEIGHT
+    score = (1 - weight) * cast(relevance, Float) + weight * func.coalesce(Shop.overall_score, 0.0) / 10
+    return query.filter(Shop.id.in_(matches)).order_by(score.desc(), Shop.id)
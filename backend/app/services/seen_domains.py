@@ -0,0 +1,135 @@
+from typing import Iterable, List, Set
+import redis
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models.shop import Shop, ShopAlias
+from app.utils.bloom import BloomFilter
+
+# Domains checked against the shops table per query
+EXACT_CHECK_BATCH_SIZE = 1000
+
+
+class SeenDomainStore:
+    """Persistent, memory-bounded set of domains already stored as shops or aliases
+
+    A Bloom filter answers "definitely new" without touching the database.
+    Only Bloom positives are confirmed against the unique index on
+    shops.domain and shop_aliases.domain, in batches, so false positives never drop a new domain.
+    The filter is persisted to Redis and rebuilt from the shops table when
+    no snapshot exists. Shops and aliases created elsewhere (API, crawls)
+    are queued with record() and folded into the filter on the next load(),
+    so creating a shop never has to load the filter itself.
+    """
+
+    def __init__(self, db: Session, capacity: int = None, error_rate: float = None):
+        self.db = db
+        self.capacity = capacity or settings.SEEN_SET_CAPACITY
+        self.error_rate = error_rate or settings.SEEN_SET_ERROR_RATE
+        self.bloom = None
+        # Queued domains folded into the filter, dropped from the queue by save()
+        self._applied = 0
+
+    def load(self) -> "SeenDomainStore":
+        """Load the persisted filter, or warm it from the shops table"""
+        try:
+            data = get_redis().get(settings.SEEN_SET_REDIS_KEY)
+            if data:
+                self.bloom = BloomFilter.from_bytes(data)
+        except (redis.RedisError, ValueError) as e:
+            print(f"Could not load seen-domain filter: {e}")
+
+        if self.bloom is None:
+            self.bloom = BloomFilter(self.capacity, self.error_rate)
+            for column in (Shop.domain, ShopAlias.domain):
+                for domain in self.db.execute(
+                    select(column).execution_options(yield_per=10000)
+                ).scalars():
+                    self.bloom.add(domain)
+
+        # Read after the rebuild scan, so a domain is either in the scan or still queued
+        try:
+            pending = get_redis().lrange(settings.SEEN_SET_PENDING_KEY, 0, -1)
+        except redis.RedisError as e:
+            print(f"Could not read queued seen domains: {e}")
+            pending = []
+        for domain in pending:
+            self.bloom.add(domain.decode())
+        self._applied = len(pending)
+        return self
+
+    def save(self):
+        """Persist the filter so later runs skip the warm-up scan"""
+        if self.bloom is None:
+            return
+        try:
+            pipe = get_redis().pipeline()
+            pipe.set(settings.SEEN_SET_REDIS_KEY, self.bloom.to_bytes(), ex=settings.SEEN_SET_SNAPSHOT_TTL)
+            # Domains queued after load() stay queued for the next one
+            pipe.ltrim(settings.SEEN_SET_PENDING_KEY, self._applied, -1)
+            pipe.execute()
+            self._applied = 0
+        except redis.RedisError as e:
+            print(f"Could not persist seen-domain filter: {e}")
+
+    @staticmethod
+    def record(domains: Iterable[str]):
+        """Queue domains just stored as shops or aliases for the next load()"""
+        domains = [domain for domain in domains if domain]
+        if not domains:
+            return
+        try:
+            pipe = get_redis().pipeline()
+            pipe.rpush(settings.SEEN_SET_PENDING_KEY, *domains)
+            # Outlives any snapshot taken before these domains, after that the rebuild has them
+            pipe.expire(settings.SEEN_SET_PENDING_KEY, settings.SEEN_SET_SNAPSHOT_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Could not queue seen domains: {e}")
+
+    @staticmethod
+    def invalidate():
+        """Drop the persisted filter, e.g. after a bulk load; the next load() rebuilds it"""
+        try:
+            get_redis().delete(settings.SEEN_SET_REDIS_KEY, settings.SEEN_SET_PENDING_KEY)
+        except redis.RedisError as e:
+            print(f"Could not drop seen-domain filter: {e}")
+
+    def add(self, domain: str):
+        """Record a domain that has just been stored as a shop"""
+        self._ensure_loaded()
+        self.bloom.add(domain)
+
+    def maybe_seen(self, domain: str) -> bool:
+        """Bloom-only check: False means the domain is definitely new"""
+        self._ensure_loaded()
+        return domain in self.bloom
+
+    def filter_new(self, domains: Iterable[str]) -> List[str]:
+        """
+        Return the normalized domains that are not stored as shops yet
+
+        Bloom negatives are returned without a query; positives are
+        confirmed with one batched lookup per EXACT_CHECK_BATCH_SIZE domains.
+        """
+        self._ensure_loaded()
+        domains = list(domains)
+        maybe_known = [domain for domain in domains if domain in self.bloom]
+        known = self.known_in_db(maybe_known)
+        return [domain for domain in domains if domain not in known]
+
+    def known_in_db(self, domains: List[str]) -> Set[str]:
+        """Exact membership check against the shop and alias unique indexes"""
+        known = set()
+        for i in range(0, len(domains), EXACT_CHECK_BATCH_SIZE):
+            batch = domains[i:i + EXACT_CHECK_BATCH_SIZE]
+            for column in (Shop.domain, ShopAlias.domain):
+                known.update(self.db.execute(
+                    select(column).where(column.in_(batch))
+                ).scalars())
+        return known
+
+    def _ensure_loaded(self):
+        if self.bloom is None:
+            self.load()
@@ -1,9 +1,121 @@
 import requests
 from bs4 import BeautifulSoup
+import json
 import re
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
 import time
 from app.core.config import settings
+from app.core.metrics import observe_fetch, record_crawl_error, record_indicators, record_verification
+from app.services.browser_pool import needs_rendering, render_page
+from app.utils.content_hash import fingerprint, is_unchanged
+from app.utils.dns_cache import dns_cache
+from app.utils.host_latency import HostBudget, host_latency
+from app.utils.tracing import StageTimer
+
+# Storefronts embed their permanent domain, e.g. Shopify.shop = "foo.myshopify.com"
+MYSHOPIFY_DOMAIN_RE = re.compile(
+    r'Shopify\.shop\s*=\s*["\']([a-z0-9][a-z0-9-]*\.myshopify\.com)["\']', re.IGNORECASE
+)
+
+# Small JSON endpoints every Shopify storefront serves. They are fetched
+# concurrently before the homepage; one answering like a Shopify storefront
+# settles the detection without downloading the homepage.
+PROBE_ENDPOINTS = [
+    '/products.json?limit=1',
+    '/meta.json',
+    '/cart.js'
+]
+
+# Headers Shopify's edge adds to every storefront response
+SHOPIFY_HEADERS = ('x-shopid', 'x-shopify-stage', 'x-sorting-hat-shopid')
+
+# These status codes suggest Shopify endpoints
+API_STATUS_CODES = (200, 401, 403)
+
+
+def probe_verdict(endpoint: str, status_code: int, headers, body: bytes) -> Tuple[bool, Optional[str]]:
+    """
+    Whether one probe response proves the site is a Shopify storefront
+
+    Shopify's edge headers are decisive on any response; otherwise the body
+    must be the JSON only a Shopify storefront returns for that endpoint.
+    Errors, catch-all HTML pages and truncated bodies are not decisive.
+
+    Returns:
+        (decisive, myshopify_domain); the domain comes from /meta.json
+    """
+    decisive = (
+        any(name in headers for name in SHOPIFY_HEADERS)
+        or 'shopify' in headers.get('powered-by', '').lower()
+    )
+    if status_code != 200:
+        return decisive, None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return decisive, None
+    if not isinstance(data, dict):
+        return decisive, None
+
+    path = endpoint.split('?', 1)[0]
+    if path == '/meta.json':
+        myshopify_domain = str(data.get('myshopify_domain') or '').lower()
+        if myshopify_domain.endswith('.myshopify.com'):
+            return True, myshopify_domain
+    elif path == '/products.json':
+        products = data.get('products')
+        if products and isinstance(products, list) and all(
+            isinstance(product, dict) and 'handle' in product and 'variants' in product
+            for product in products
+        ):
+            return True, None
+    elif path == '/cart.js':
+        if {'token', 'items', 'item_count'} <= data.keys():
+            return True, None
+    return decisive, None
+
+
+def storefront_url(url: str, endpoint: str) -> str:
+    """The storefront root a probe URL (possibly redirected) belongs to"""
+    parts = urlsplit(url)
+    path = parts.path
+    endpoint_path = endpoint.split('?', 1)[0]
+    if path.endswith(endpoint_path):
+        path = path[:-len(endpoint_path)]
+    return f"{parts.scheme}://{parts.netloc}{path.rstrip('/')}/"
+
+
+def new_probe_summary() -> Dict[str, any]:
+    """Empty summary for record_probe; all probes are sent at once, so all count as requests"""
+    return {'verified_by': None, 'shopify_api': 0.0, 'requests': len(PROBE_ENDPOINTS), 'bytes': 0}
+
+
+def record_probe(probes: Dict[str, any], endpoint: str, response, body: bytes):
+    """
+    Fold one probe response into a summary from new_probe_summary
+
+    response is a requests or httpx response, or None if the request
+    failed. The first decisive response sets 'verified_by' and the
+    storefront's status code, final URL, redirect chain and permanent
+    myshopify.com domain; any API_STATUS_CODES response sets 'shopify_api'.
+    """
+    probes['bytes'] += len(body)
+    if response is None or probes['verified_by']:
+        return
+    if response.status_code in API_STATUS_CODES:
+        probes['shopify_api'] = 1.0
+    decisive, myshopify_domain = probe_verdict(endpoint, response.status_code, response.headers, body)
+    if decisive:
+        final_url = storefront_url(str(response.url), endpoint)
+        probes.update({
+            'verified_by': endpoint.split('?', 1)[0],
+            'status_code': response.status_code,
+            'final_url': final_url,
+            'redirect_chain': [storefront_url(str(r.url), endpoint) for r in response.history] + [final_url],
+            'myshopify_domain': myshopify_domain,
+        })
 
 class ShopifyDetector:
     """Detect if a website is built with Shopify"""
@@ -14,51 +126,142 @@ class ShopifyDetector:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
     
-    def detect_shopify(self, domain: str) -> Dict[str, any]:
+    def detect_shopify(
+        self, domain: str, previous_result: Optional[Dict] = None, trace: bool = False
+    ) -> Dict[str, any]:
         """
         Detect if a domain is a Shopify store
         
+        Args:
+            domain: Website domain
+            previous_result: Last detection result for this domain; returned
+                again (with 'unchanged': True) if the homepage has not changed
+            trace: Add per-stage timings in milliseconds under 'timings'
+                (fetch, parse, each indicator, each API probe) and log them
+        
         Returns:
-            Dict with detection results
+            Dict with detection results. 'tiers' lists the tiers that ran
+            (probe, homepage, render), 'requests' and 'bytes' what they
+            fetched over HTTP; 'verified_by' names the probe endpoint when
+            a probe alone settled it.
         """
+        timer = StageTimer(enabled=trace)
+        result = self._detect(domain, previous_result, timer)
+        
+        # Timings stored with a previous result are not this run's
+        result.pop('timings', None)
+        if trace:
+            result['timings'] = timer.finish('detect_shopify', domain)
+        return result
+    
+    def _detect(self, domain: str, previous_result: Optional[Dict], timer: StageTimer) -> Dict[str, any]:
         if not domain.startswith(('http://', 'https://')):
             domain = f"https://{domain}"
         
+        # Skip hosts already known not to exist
+        if dns_cache.is_known_dead(domain):
+            record_crawl_error('detector', domain, 'dns')
+            return {
+                'is_shopify': False,
+                'confidence': 0.0,
+                'error': 'Domain does not resolve (NXDOMAIN)',
+                'status_code': None
+            }
+        
         try:
             # Add delay to be respectful
             time.sleep(settings.SCRAPING_DELAY)
             
+            # One deadline covers the probes and the homepage. There is no retry
+            # later here (API and discovery checks), so the budget is the ceiling
+            budget = host_latency.ceiling()
+            deadline = time.monotonic() + budget.deadline
+            
+            # Tier 1: the storefront JSON probes, usually conclusive on their own
+            probes = self._probe_storefront(domain, timer, budget, deadline)
+            if probes['verified_by']:
+                result = self.probe_result(probes)
+                record_indicators(result['indicators'])
+                record_verification('detector', result)
+                return result
+            
+            # Tier 2: the homepage and its HTML indicators
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"No response within {budget.deadline:.1f}s")
+            started = time.perf_counter()
             response = self.session.get(
                 domain, 
-                timeout=settings.REQUEST_TIMEOUT,
+                timeout=(budget.connect, min(budget.read, remaining)),
                 allow_redirects=True
             )
+            elapsed = time.perf_counter() - started
+            host_latency.observe(domain, response.elapsed.total_seconds(), elapsed)
+            observe_fetch('detector', 'homepage', elapsed, len(response.content))
+            # requests reports time to response headers (DNS, connect, TLS and
+            # server time); the rest is the body download
+            timer.record('fetch.headers', response.elapsed.total_seconds())
+            timer.record('fetch.body', max(elapsed - response.elapsed.total_seconds(), 0.0))
             response.raise_for_status()
+            cost = {
+                'tiers': ['probe', 'homepage'],
+                'requests': probes['requests'] + 1,
+                'bytes': probes['bytes'] + len(response.content),
+            }
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Skip the analysis if the page did not change
+            with timer.stage('fingerprint'):
+                digest, page_simhash = fingerprint(response.text)
+            if is_unchanged((digest, page_simhash), previous_result):
+                return {**previous_result, **cost, 'unchanged': True}
+            
+            page = self.analyze_html(response.text, timer)
             
             # Check multiple indicators
             indicators = {
-                'shopify_js': self._check_shopify_js(soup),
-                'shopify_meta': self._check_shopify_meta(soup),
-                'shopify_links': self._check_shopify_links(soup),
-                'shopify_content': self._check_shopify_content(soup),
-                'shopify_api': self._check_shopify_api(domain),
+                **page['indicators'],
+                'shopify_api': probes['shopify_api'],
             }
             
             # Calculate confidence score
-            confidence = sum(indicators.values()) / len(indicators)
-            is_shopify = confidence > 0.5
+            confidence, is_shopify = self.score_indicators(indicators)
             
-            return {
+            # Tier 3: JS-only storefronts and borderline scores, re-check the rendered DOM
+            rendered = False
+            if needs_rendering(response.text, confidence):
+                with timer.stage('render'):
+                    rendered_page = render_page(response.url)
+                cost['requests'] += 1
+                if rendered_page is not None:
+                    page = self.analyze_html(rendered_page.html, timer)
+                    indicators = {**page['indicators'], 'shopify_api': indicators['shopify_api']}
+                    confidence, is_shopify = self.score_indicators(indicators)
+                    cost['tiers'].append('render')
+                    rendered = True
+            
+            record_indicators(indicators)
+            
+            result = {
                 'is_shopify': is_shopify,
                 'confidence': confidence,
                 'indicators': indicators,
                 'status_code': response.status_code,
-                'final_url': response.url
+                'final_url': response.url,
+                'redirect_chain': [r.url for r in response.history] + [response.url],
+                'myshopify_domain': page['myshopify_domain'],
+                'content_digest': digest,
+                'content_simhash': page_simhash,
+                **cost
             }
+            if rendered:
+                result['rendered'] = True
+            record_verification('detector', result)
+            return result
             
         except requests.RequestException as e:
+            if isinstance(e, requests.Timeout):
+                host_latency.observe_timeout(domain)
+            record_crawl_error('detector', domain, 'timeout' if isinstance(e, requests.Timeout) else 'error')
             return {
                 'is_shopify': False,
                 'confidence': 0.0,
@@ -66,6 +269,66 @@ class ShopifyDetector:
                 'status_code': getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
             }
     
+    @staticmethod
+    def probe_result(probes: Dict[str, any]) -> Dict[str, any]:
+        """Detection result for a storefront a probe verified; no homepage was analyzed"""
+        return {
+            'is_shopify': True,
+            'confidence': 1.0,
+            'indicators': {'shopify_api': 1.0},
+            'verified_by': probes['verified_by'],
+            'status_code': probes['status_code'],
+            'final_url': probes['final_url'],
+            'redirect_chain': probes['redirect_chain'],
+            'myshopify_domain': probes['myshopify_domain'],
+            'content_digest': None,
+            'content_simhash': None,
+            'tiers': ['probe'],
+            'requests': probes['requests'],
+            'bytes': probes['bytes']
+        }
+    
+    def analyze_html(self, html: str, timer: Optional[StageTimer] = None) -> Dict[str, any]:
+        """
+        Run the HTML-only indicators on a fetched page
+        
+        This is the CPU-bound part of detection and needs no network access,
+        so it can run in a separate process.
+        """
+        timer = timer or StageTimer(enabled=False)
+        with timer.stage('parse'):
+            soup = BeautifulSoup(html, 'html.parser')
+        
+        indicators = {}
+        for name, check in (
+            ('shopify_js', self._check_shopify_js),
+            ('shopify_meta', self._check_shopify_meta),
+            ('shopify_links', self._check_shopify_links),
+            ('shopify_content', self._check_shopify_content),
+        ):
+            with timer.stage(f'indicator.{name}'):
+                indicators[name] = check(soup)
+        
+        with timer.stage('indicator.myshopify_domain'):
+            myshopify_domain = self.find_myshopify_domain(html)
+        
+        return {
+            'indicators': indicators,
+            'myshopify_domain': myshopify_domain
+        }
+    
+    @staticmethod
+    def score_indicators(indicators: Dict[str, float]) -> Tuple[float, bool]:
+        """Combine indicator scores into (confidence, is_shopify)"""
+        confidence = sum(indicators.values()) / len(indicators)
+        return confidence, confidence > 0.5
+    
+    @staticmethod
+    def find_myshopify_domain(html: str) -> Optional[str]:
+        """Extract the store's permanent *.myshopify.com domain from the page"""
+        match = MYSHOPIFY_DOMAIN_RE.search(html)
+        return match.group(1).lower() if match else None
+    
     def _check_shopify_js(self, soup: BeautifulSoup) -> float:
         """Check for Shopify JavaScript files"""
         js_sources = soup.find_all('script', src=True)
@@ -142,24 +405,67 @@ class ShopifyDetector:
         
         return 0.0
     
-    def _check_shopify_api(self, domain: str) -> float:
-        """Check for Shopify API endpoints"""
-        api_endpoints = [
-            '/admin',
-            '/admin/api',
-            '/apps',
-            '/cart.js',
-            '/products.json',
-            '/collections.json'
-        ]
-        
-        for endpoint in api_endpoints:
-            try:
-                url = f"{domain.rstrip('/')}{endpoint}"
-                response = self.session.head(url, timeout=5)
-                if response.status_code in [200, 401, 403]:  # These status codes suggest Shopify endpoints
-                    return 1.0
-            except:
-                continue
+    def _probe_storefront(
+        self,
+        domain: str,
+        timer: Optional[StageTimer] = None,
+        budget: HostBudget = None,
+        deadline: float = None
+    ) -> Dict[str, any]:
+        """
+        Fetch the PROBE_ENDPOINTS concurrently, stopping at the first decisive one
         
-        return 0.0 
\ No newline at end of file
+        Returns the summary built by record_probe. Probes still in flight
+        when one is decisive, or at the deadline (time.monotonic()), finish
+        in the background and are not waited for.
+        """
+        timer = timer or StageTimer(enabled=False)
+        budget = budget or host_latency.ceiling()
+        timeout = (budget.connect, min(settings.PROBE_TIMEOUT, budget.read))
+        wait = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+        probes = new_probe_summary()
+        executor = ThreadPoolExecutor(max_workers=len(PROBE_ENDPOINTS))
+        try:
+            futures = {
+                executor.submit(self._fetch_probe, f"{domain.rstrip('/')}{endpoint}", timeout): endpoint
+                for endpoint in PROBE_ENDPOINTS
+            }
+            for future in as_completed(futures, timeout=wait):
+                endpoint = futures[future]
+                response, body, elapsed = future.result()
+                timer.record(f'probe.{endpoint}', elapsed)
+                record_probe(probes, endpoint, response, body)
+                if probes['verified_by']:
+                    break
+        except FuturesTimeout:
+            # Out of time; the homepage check that follows fails on the same deadline
+            pass
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return probes
+    
+    def _fetch_probe(
+        self, url: str, timeout: Tuple[float, float] = None
+    ) -> Tuple[Optional[requests.Response], bytes, float]:
+        """GET one probe, reading at most PROBE_MAX_BYTES of the body"""
+        started = time.perf_counter()
+        chunks = []
+        size = 0
+        # Probes run in parallel threads and requests sessions are not thread-safe, so each gets its own
+        session = requests.Session()
+        session.headers.update(self.session.headers)
+        try:
+            with session, session.get(url, timeout=timeout or settings.PROBE_TIMEOUT, stream=True) as response:
+                # Probe bodies are cut off, so only the time to headers says anything about the host
+                host_latency.observe(url, response.elapsed.total_seconds())
+                for chunk in response.iter_content(chunk_size=8192):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= settings.PROBE_MAX_BYTES:
+                        break
+        except requests.RequestException:
+            response = None
+        body = b''.join(chunks)[:settings.PROBE_MAX_BYTES]
+        elapsed = time.perf_counter() - started
+        observe_fetch('detector', 'api_probe', elapsed, len(body))
+        return response, body, elapsed
@@ -0,0 +1,288 @@
+import random
+import uuid
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+import redis
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.utils.domains import normalize_domain
+
+# All scripts take the time from the Redis server, so lease expiry does not
+# depend on the clocks of the crawl nodes.
+_NOW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+"""
+
+# KEYS: ready, leases, hosts. ARGV: politeness key prefix, delay, (item, host) pairs...
+# Skips leased items; otherwise schedules no earlier than the host's politeness window.
+_ENQUEUE_SCRIPT = _NOW + """
+local added = 0
+for i = 3, #ARGV, 2 do
+    local item, host = ARGV[i], ARGV[i + 1]
+    if not redis.call('ZSCORE', KEYS[2], item) then
+        local at = now + tonumber(ARGV[2])
+        local wait = redis.call('PTTL', ARGV[1] .. host)
+        if wait > 0 then
+            at = math.max(at, now + wait / 1000)
+        end
+        redis.call('HSET', KEYS[3], item, host)
+        added = added + redis.call('ZADD', KEYS[1], 'NX', at, item)
+    end
+end
+return added
+"""
+
+# KEYS: ready, leases, owners, attempts, dead, hosts.
+# ARGV: token, visibility timeout, count, max attempts, politeness key prefix, politeness ms.
+# Reclaims expired leases, then leases up to count due items, with their attempt numbers.
+# An item whose host is inside its politeness window is pushed back to the window's end.
+_LEASE_SCRIPT = _NOW + """
+local reclaimed = 0
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, 1000)
+for _, item in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], item)
+    redis.call('HDEL', KEYS[3], item)
+    if tonumber(redis.call('HGET', KEYS[4], item) or '0') >= tonumber(ARGV[4]) then
+        redis.call('HDEL', KEYS[4], item)
+        redis.call('HDEL', KEYS[6], item)
+        redis.call('ZADD', KEYS[5], now, item)
+    else
+        redis.call('ZADD', KEYS[1], now, item)
+        reclaimed = reclaimed + 1
+    end
+end
+
+local polite = tonumber(ARGV[6]) > 0
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, tonumber(ARGV[3]))
+local items = {}
+local attempts = {}
+for _, item in ipairs(due) do
+    local host = redis.call('HGET', KEYS[6], item) or item
+    local wait = polite and redis.call('PTTL', ARGV[5] .. host) or -2
+    if wait > 0 then
+        redis.call('ZADD', KEYS[1], now + wait / 1000, item)
+    else
+        redis.call('ZREM', KEYS[1], item)
+        redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), item)
+        redis.call('HSET', KEYS[3], item, ARGV[1])
+        table.insert(items, item)
+        table.insert(attempts, redis.call('HINCRBY', KEYS[4], item, 1))
+        if polite then
+            redis.call('SET', ARGV[5] .. host, '1', 'PX', ARGV[6])
+        end
+    end
+end
+return {reclaimed, items, attempts}
+"""
+
+# KEYS: leases, owners. ARGV: token, visibility timeout, items...
+# Extends the leases still held by token, returning those items.
+_HEARTBEAT_SCRIPT = _NOW + """
+local renewed = {}
+for i = 3, #ARGV do
+    if redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[1] then
+        redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[2]), ARGV[i])
+        table.insert(renewed, ARGV[i])
+    end
+end
+return renewed
+"""
+
+# KEYS: leases, owners, attempts, hosts. ARGV: token, items...
+_ACK_SCRIPT = """
+local acked = 0
+for i = 2, #ARGV do
+    if redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[1] then
+        redis.call('ZREM', KEYS[1], ARGV[i])
+        redis.call('HDEL', KEYS[2], ARGV[i])
+        redis.call('HDEL', KEYS[3], ARGV[i])
+        redis.call('HDEL', KEYS[4], ARGV[i])
+        acked = acked + 1
+    end
+end
+return acked
+"""
+
+# KEYS: ready, leases, owners, attempts, dead, hosts. ARGV: token, delay, max attempts, items...
+# Gives items back for a later retry, or dead-letters them after max attempts.
+_RELEASE_SCRIPT = _NOW + """
+local released = 0
+for i = 4, #ARGV do
+    local item = ARGV[i]
+    if redis.call('HGET', KEYS[3], item) == ARGV[1] then
+        redis.call('ZREM', KEYS[2], item)
+        redis.call('HDEL', KEYS[3], item)
+        if tonumber(redis.call('HGET', KEYS[4], item) or '0') >= tonumber(ARGV[3]) then
+            redis.call('HDEL', KEYS[4], item)
+            redis.call('HDEL', KEYS[6], item)
+            redis.call('ZADD', KEYS[5], now, item)
+        else
+            redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), item)
+            released = released + 1
+        end
+    end
+end
+return released
+"""
+
+
+class Lease:
+    """Items leased from one shard under one token"""
+
+    def __init__(self, shard: int, token: str, items: List[str], attempts: Optional[Dict[str, int]] = None):
+        self.shard = shard
+        self.token = token
+        self.items = items
+        # Times each item has been leased, this lease included
+        self.attempts = attempts or {}
+
+    def __repr__(self):
+        return f"<Lease(shard={self.shard}, items={len(self.items)})>"
+
+
+class WorkQueue:
+    """Redis-backed queue of crawl domains, sharded by host, with leases
+
+    Items are domains as stored in the shops table. Each is normalized to
+    its host key (the registered domain) and hashed to one of
+    CRAWL_QUEUE_SHARDS shards, so all work for a host goes through the same
+    shard. A shard keeps a sorted set of ready items scored by the time they
+    become due, a sorted set of leased items scored by lease expiry and the
+    host key of each item. Taking items moves them atomically from ready to
+    leased (a Lua script per operation), and a host is never leased again
+    within CRAWL_HOST_MIN_INTERVAL of its last lease, even when several
+    shops (www.shop.com, store.shop.com) share it.
+    Workers renew their leases with heartbeats; leases that expire (crashed
+    or stalled worker) are put back on the ready set by the next lease
+    call on that shard, and dead-lettered after CRAWL_MAX_ATTEMPTS.
+    Adding workers adds throughput without coordination: each lease call
+    starts at a random shard.
+    """
+
+    def __init__(self, client: redis.Redis = None, namespace: str = None, shards: int = None):
+        self.client = client or get_redis()
+        self.namespace = namespace or settings.CRAWL_QUEUE_NAMESPACE
+        self.shards = shards or settings.CRAWL_QUEUE_SHARDS
+        self._enqueue = self.client.register_script(_ENQUEUE_SCRIPT)
+        self._lease = self.client.register_script(_LEASE_SCRIPT)
+        self._heartbeat = self.client.register_script(_HEARTBEAT_SCRIPT)
+        self._ack = self.client.register_script(_ACK_SCRIPT)
+        self._release = self.client.register_script(_RELEASE_SCRIPT)
+
+    @staticmethod
+    def host_key(item: str) -> str:
+        """Host an item is sharded and rate-limited by"""
+        return normalize_domain(item) or item.lower()
+
+    def shard_of(self, item: str) -> int:
+        return self._host_shard(self.host_key(item))
+
+    def _host_shard(self, host: str) -> int:
+        return zlib.crc32(host.encode()) % self.shards
+
+    def _key(self, shard: int, name: str) -> str:
+        # The hash tag keeps a shard's keys in one Redis Cluster slot
+        return f"{self.namespace}:{{{shard}}}:{name}"
+
+    def _shard_keys(self, shard: int, *names: str) -> List[str]:
+        return [self._key(shard, name) for name in names]
+
+    def enqueue(self, domains: Iterable[str], delay: float = 0.0) -> int:
+        """
+        Add domains to the queue, due after delay seconds
+
+        Domains already queued or leased are skipped. Returns the number of
+        domains added.
+        """
+        # {shard: {item: host key}}
+        by_shard: Dict[int, Dict[str, str]] = {}
+        for domain in domains:
+            item = domain.strip()
+            if item:
+                host = self.host_key(item)
+                by_shard.setdefault(self._host_shard(host), {})[item] = host
+
+        added = 0
+        for shard, items in by_shard.items():
+            added += self._enqueue(
+                keys=self._shard_keys(shard, "ready", "leases", "hosts"),
+                args=[
+                    self._key(shard, "polite:"), delay,
+                    *(arg for item in sorted(items) for arg in (item, items[item])),
+                ],
+            )
+        return added
+
+    def lease(self, count: int, visibility_timeout: float = None) -> Optional[Lease]:
+        """
+        Lease up to count due items from the first shard that has any
+
+        The items stay invisible to other workers for visibility_timeout
+        seconds unless renewed with heartbeat(). Returns None if no shard
+        has due items.
+        """
+        visibility_timeout = visibility_timeout or settings.CRAWL_LEASE_TIMEOUT
+        token = uuid.uuid4().hex
+        start = random.randrange(self.shards)
+        for offset in range(self.shards):
+            shard = (start + offset) % self.shards
+            reclaimed, items, attempts = self._lease(
+                keys=self._shard_keys(shard, "ready", "leases", "owners", "attempts", "dead", "hosts"),
+                args=[
+                    token, visibility_timeout, count, settings.CRAWL_MAX_ATTEMPTS,
+                    self._key(shard, "polite:"), int(settings.CRAWL_HOST_MIN_INTERVAL * 1000),
+                ],
+            )
+            if reclaimed:
+                print(f"Reclaimed {reclaimed} expired leases on crawl shard {shard}")
+            if items:
+                items = [item.decode() for item in items]
+                return Lease(shard, token, items, dict(zip(items, map(int, attempts))))
+        return None
+
+    def heartbeat(self, lease: Lease, items: Iterable[str] = None, visibility_timeout: float = None) -> Set[str]:
+        """Extend the lease on items (default: all); returns the items still held"""
+        items = list(lease.items if items is None else items)
+        if not items:
+            return set()
+        renewed = self._heartbeat(
+            keys=self._shard_keys(lease.shard, "leases", "owners"),
+            args=[lease.token, visibility_timeout or settings.CRAWL_LEASE_TIMEOUT, *items],
+        )
+        return {item.decode() for item in renewed}
+
+    def ack(self, lease: Lease, items: Iterable[str] = None) -> int:
+        """Mark leased items as done; items whose lease was lost are ignored"""
+        items = list(lease.items if items is None else items)
+        if not items:
+            return 0
+        return self._ack(
+            keys=self._shard_keys(lease.shard, "leases", "owners", "attempts", "hosts"),
+            args=[lease.token, *items],
+        )
+
+    def release(self, lease: Lease, items: Iterable[str] = None, delay: float = None) -> int:
+        """Give leased items back for a retry after delay seconds"""
+        items = list(lease.items if items is None else items)
+        if not items:
+            return 0
+        delay = settings.CRAWL_RETRY_DELAY if delay is None else delay
+        return self._release(
+            keys=self._shard_keys(lease.shard, "ready", "leases", "owners", "attempts", "dead", "hosts"),
+            args=[lease.token, delay, settings.CRAWL_MAX_ATTEMPTS, *items],
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Queued, leased and dead-lettered item counts over all shards"""
+        pipe = self.client.pipeline(transaction=False)
+        for shard in range(self.shards):
+            pipe.zcard(self._key(shard, "ready"))
+            pipe.zcard(self._key(shard, "leases"))
+            pipe.zcard(self._key(shard, "dead"))
+        counts = pipe.execute()
+        return {
+            "ready": sum(counts[0::3]),
+            "leased": sum(counts[1::3]),
+            "dead": sum(counts[2::3]),
+        }
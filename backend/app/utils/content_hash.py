@@ -0,0 +1,89 @@
+import hashlib
+import re
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+# Per-request noise that changes on every fetch of an otherwise static page
+_NOISE_PATTERNS = [
+    re.compile(r'<!--.*?-->', re.DOTALL),
+    re.compile(r'\s(?:nonce|integrity)="[^"]*"', re.IGNORECASE),
+    re.compile(r'(?:csrf|authenticity)[\w-]*"?\s*(?:content|value)?\s*[=:]\s*"[^"]*"', re.IGNORECASE),
+    re.compile(r'\b[0-9a-f]{16,}\b', re.IGNORECASE),  # request ids, cache busters
+    re.compile(r'\b\d{10,13}\b'),  # unix timestamps
+]
+_WHITESPACE = re.compile(r'\s+')
+_TOKEN = re.compile(r'\w+')
+
+SHINGLE_SIZE = 3
+
+
+def normalize_html(html: str) -> str:
+    """Strip per-request noise and collapse whitespace before hashing"""
+    for pattern in _NOISE_PATTERNS:
+        html = pattern.sub('', html)
+    return _WHITESPACE.sub(' ', html).strip().lower()
+
+
+def content_digest(normalized: str) -> str:
+    """Exact digest of normalized page content"""
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def simhash(normalized: str) -> int:
+    """64-bit simhash over word shingles; similar pages differ in few bits"""
+    tokens = _TOKEN.findall(normalized)
+    if len(tokens) < SHINGLE_SIZE:
+        tokens = tokens or ['']
+        shingles = [' '.join(tokens)]
+    else:
+        shingles = [' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+    hashes = np.frombuffer(
+        b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles),
+        dtype='<u8'
+    )
+    # One row of 64 bits per shingle, least significant bit first
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+
+    value = 0
+    for position in np.flatnonzero(votes > 0):
+        value |= 1 << int(position)
+    return to_signed64(value)
+
+
+def to_signed64(value: int) -> int:
+    """Map an unsigned 64-bit value into BIGINT range"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+def fingerprint(html: str) -> Tuple[str, int]:
+    """Return (content_digest, simhash) for a fetched page"""
+    normalized = normalize_html(html)
+    return content_digest(normalized), simhash(normalized)
+
+
+def is_unchanged(page_fingerprint: Tuple[str, int], previous_result: Optional[Dict]) -> bool:
+    """
+    Check whether a page matches the content a previous result was computed on
+
+    Pages are unchanged when their digests are identical, or when their
+    simhashes differ by at most CONTENT_SIMHASH_THRESHOLD bits.
+    """
+    if not previous_result or 'error' in previous_result:
+        return False
+
+    digest, page_simhash = page_fingerprint
+    if previous_result.get('content_digest') == digest:
+        return True
+
+    previous_simhash = previous_result.get('content_simhash')
+    return (
+        previous_simhash is not None
+        and hamming_distance(page_simhash, previous_simhash) <= settings.CONTENT_SIMHASH_THRESHOLD
+    )
@@ -0,0 +1,227 @@
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import httpcore
+import httpx
+from app.core.config import settings
+from app.utils.domains import host_of
+
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+except ImportError:  # dnspython is optional, fall back to the system resolver
+    dns = None
+
+
+class DNSResult(NamedTuple):
+    host: str
+    addresses: Tuple[str, ...]
+    expires_at: float
+    # True when the name does not exist (NXDOMAIN / no address records)
+    negative: bool = False
+
+
+class DNSCache:
+    """In-process async DNS cache honouring record TTLs
+
+    Positive answers are kept for the TTL reported by the resolver (clamped to
+    DNS_MIN_TTL..DNS_MAX_TTL), NXDOMAIN answers for DNS_NEGATIVE_TTL. Transient
+    failures (timeouts, SERVFAIL) are never cached. Concurrent lookups of the
+    same host on one event loop share a single query.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.DNS_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, DNSResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._resolver = None
+
+    def get(self, domain: str) -> Optional[DNSResult]:
+        """Return the cached result for a domain, or None if absent/expired"""
+        host = host_of(domain)
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[host]
+                return None
+            self._entries.move_to_end(host)
+            return entry
+
+    def is_known_dead(self, domain: str) -> bool:
+        """Check, without resolving, whether a domain is cached as NXDOMAIN"""
+        entry = self.get(domain)
+        return entry is not None and entry.negative
+
+    async def resolve(self, domain: str) -> Optional[DNSResult]:
+        """
+        Resolve a domain through the cache
+
+        Returns:
+            DNSResult, or None if the lookup failed transiently
+        """
+        host = host_of(domain)
+        if not host:
+            return None
+
+        cached = self.get(host)
+        if cached is not None:
+            return cached
+
+        key = (id(asyncio.get_running_loop()), host)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._lookup(host))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        result = await asyncio.shield(future)
+        if result is not None:
+            self._store(result)
+        return result
+
+    async def prefilter(self, domains: Iterable[str], concurrency: int = None) -> List[str]:
+        """
+        Pre-resolve a batch of domains in parallel
+
+        Returns:
+            The domains that are not known to be dead, in input order.
+            Domains whose lookup failed transiently are kept.
+        """
+        domains = list(domains)
+        semaphore = asyncio.Semaphore(concurrency or settings.DNS_RESOLVE_CONCURRENCY)
+
+        async def _resolve(domain: str) -> Optional[DNSResult]:
+            async with semaphore:
+                return await self.resolve(domain)
+
+        results = await asyncio.gather(*(_resolve(domain) for domain in domains))
+        return [
+            domain for domain, result in zip(domains, results)
+            if result is None or not result.negative
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, result: DNSResult):
+        with self._lock:
+            self._entries[result.host] = result
+            self._entries.move_to_end(result.host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _lookup(self, host: str) -> Optional[DNSResult]:
+        if dns is not None:
+            return await self._lookup_dnspython(host)
+        return await self._lookup_system(host)
+
+    async def _lookup_dnspython(self, host: str) -> Optional[DNSResult]:
+        if self._resolver is None:
+            self._resolver = dns.asyncresolver.Resolver()
+
+        for rdtype in ('A', 'AAAA'):
+            try:
+                answer = await self._resolver.resolve(host, rdtype, lifetime=settings.DNS_TIMEOUT)
+            except dns.resolver.NXDOMAIN:
+                return self._negative(host)
+            except dns.resolver.NoAnswer:
+                continue
+            except (dns.exception.Timeout, dns.resolver.NoNameservers):
+                return None
+            except dns.exception.DNSException:
+                return None
+
+            addresses = tuple(rdata.to_text() for rdata in answer)
+            return self._positive(host, addresses, answer.rrset.ttl)
+
+        # The name exists but has no address records
+        return self._negative(host)
+
+    async def _lookup_system(self, host: str) -> Optional[DNSResult]:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, None, type=socket.SOCK_STREAM),
+                timeout=settings.DNS_TIMEOUT
+            )
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+                return self._negative(host)
+            return None
+        except (asyncio.TimeoutError, OSError):
+            return None
+
+        addresses = tuple(dict.fromkeys(info[4][0] for info in infos))
+        return self._positive(host, addresses, settings.DNS_DEFAULT_TTL)
+
+    def _positive(self, host: str, addresses: Tuple[str, ...], ttl: int) -> DNSResult:
+        ttl = max(settings.DNS_MIN_TTL, min(ttl, settings.DNS_MAX_TTL))
+        return DNSResult(host, addresses, time.monotonic() + ttl)
+
+    def _negative(self, host: str) -> DNSResult:
+        return DNSResult(host, (), time.monotonic() + settings.DNS_NEGATIVE_TTL, negative=True)
+
+
+class CachedDNSBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that connects to addresses from a DNSCache
+
+    Host names are resolved through the cache, so repeated connections to a
+    host reuse its cached addresses until their TTL expires. TLS still uses
+    the host name for SNI and certificate checks. Names without a cached
+    address (failed lookups, or NXDOMAIN answers that /etc/hosts may still
+    cover) fall back to the wrapped backend's own resolution; callers skip
+    known-dead domains with is_known_dead() beforehand.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, cache: DNSCache):
+        self.backend = backend
+        self.cache = cache
+
+    async def connect_tcp(
+        self, host: str, port: int, timeout: Optional[float] = None, local_address: Optional[str] = None,
+        socket_options=None
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            ipaddress.ip_address(host)
+            result = None
+        except ValueError:
+            result = await self.cache.resolve(host)
+
+        if result is None or not result.addresses:
+            return await self.backend.connect_tcp(host, port, timeout, local_address, socket_options)
+
+        error = None
+        for address in result.addresses:
+            try:
+                return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self.backend.sleep(seconds)
+
+
+def cached_dns_transport(cache: DNSCache = None, **kwargs) -> httpx.AsyncHTTPTransport:
+    """httpx transport (same arguments as AsyncHTTPTransport) resolving hosts through the DNS cache"""
+    transport = httpx.AsyncHTTPTransport(**kwargs)
+    # httpx does not expose the backend; wrap the one its connection pool was built with
+    pool = transport._pool
+    pool._network_backend = CachedDNSBackend(pool._network_backend, cache or dns_cache)
+    return transport
+
+
+# Process-wide cache shared by the crawler services
+dns_cache = DNSCache()
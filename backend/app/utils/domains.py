@@ -0,0 +1,108 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import idna
+except ImportError:
+    idna = None
+
+# tldextract (and the requests stack under it) is loaded on first use, not at import
+_extract = None
+_extract_loaded = False
+
+# Second-level labels commonly used under country code TLDs (co.uk, com.au...)
+_COMMON_SECOND_LEVEL = {'co', 'com', 'net', 'org', 'gov', 'ac', 'edu', 'ltd', 'plc'}
+
+# A DNS host label: letters, digits and hyphens (LDH), no leading or trailing hyphen
+_LABEL_RE = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')
+
+
+def host_of(domain: str) -> str:
+    """Extract the bare host name from a domain or URL"""
+    domain = domain.strip()
+    if '://' not in domain:
+        domain = f"//{domain}"
+    try:
+        return (urlsplit(domain).hostname or '').rstrip('.').lower()
+    except ValueError:
+        return ''
+
+
+def to_ascii(host: str) -> str:
+    """Convert an internationalized host name to its IDNA (punycode) form"""
+    if host.isascii():
+        return host
+    try:
+        if idna is not None:
+            return idna.encode(host, uts46=True).decode('ascii')
+        return host.encode('idna').decode('ascii')
+    except (UnicodeError, ValueError):
+        return ''
+
+
+def _extractor():
+    global _extract, _extract_loaded
+    if not _extract_loaded:
+        try:
+            import tldextract
+            # Use the bundled public suffix snapshot, never fetch it at runtime.
+            # Private suffixes are included so that foo.myshopify.com stays a store.
+            _extract = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True)
+        except ImportError:
+            _extract = None
+        _extract_loaded = True
+    return _extract
+
+
+def split_registered_domain(host: str) -> Tuple[str, str]:
+    """Split a host into (registered domain, public suffix)"""
+    extract = _extractor()
+    if extract is not None:
+        parts = extract(host)
+        if parts.domain and parts.suffix:
+            return f"{parts.domain}.{parts.suffix}", parts.suffix
+        return host, parts.suffix
+
+    labels = host.split('.')
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _COMMON_SECOND_LEVEL:
+        return '.'.join(labels[-3:]), '.'.join(labels[-2:])
+    if len(labels) >= 2:
+        return '.'.join(labels[-2:]), labels[-1]
+    return host, ''
+
+
+def is_valid_host(host: str) -> bool:
+    """Whether an ASCII host name is made of valid LDH labels"""
+    return 0 < len(host) <= 253 and all(_LABEL_RE.match(label) for label in host.split('.'))
+
+
+def normalize_domain(raw: str) -> Optional[str]:
+    """
+    Normalize a domain or URL to the registered domain used as shop key
+
+    Strips scheme, path, port and a leading www, converts IDN hosts to
+    punycode and reduces the host to its public-suffix-aware registered
+    domain, e.g. "https://www.Shop.co.uk/" -> "shop.co.uk".
+
+    Returns:
+        The normalized domain, or None if the input is not a valid host
+        (labels must be LDH or IDNA-encodable, e.g. "h&m.com" is rejected)
+    """
+    if not raw:
+        return None
+
+    host = to_ascii(host_of(raw))
+    if '.' not in host or not is_valid_host(host):
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+
+    registered, _ = split_registered_domain(host)
+    return registered or None
+
+
+def public_suffix(raw: str) -> str:
+    """Return the public suffix (e.g. "co.uk", "myshopify.com") of a domain"""
+    host = to_ascii(host_of(raw))
+    return split_registered_domain(host)[1] if host else ''
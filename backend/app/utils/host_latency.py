@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, NamedTuple, Optional
+from app.core.config import settings
+from app.utils.domains import host_of
+
+
+class HostBudget(NamedTuple):
+    connect: float
+    read: float
+    # Total seconds for all of a domain's requests (homepage and probes)
+    deadline: float
+    # False when the budget is the configured maximum, so a cut-off is final
+    adaptive: bool
+
+
+class _HostSamples:
+    def __init__(self, size: int):
+        self.ttfb: Deque[float] = deque(maxlen=size)
+        self.total: Deque[float] = deque(maxlen=size)
+        self.timeouts = 0
+
+
+def percentile(values, q: float) -> Optional[float]:
+    """Nearest-rank q-th percentile (0-100) of values, None when empty"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class HostLatency:
+    """In-process fetch latency per host, and the timeouts derived from it
+
+    Keeps the last HOST_LATENCY_SAMPLES times to response headers (ttfb:
+    DNS, connect, TLS and server time) and to the full response per host,
+    plus the last FLEET_LATENCY_SAMPLES over all hosts. A host's budget is
+    ADAPTIVE_TIMEOUT_MULTIPLIER times its ADAPTIVE_TIMEOUT_PERCENTILE
+    latency: connect and read timeouts from ttfb, the per-domain deadline
+    from full responses. Hosts with fewer than HOST_LATENCY_MIN_SAMPLES
+    samples get the fleet-wide budget instead, and the configured maximum
+    (REQUEST_TIMEOUT, CRAWL_DOMAIN_DEADLINE) until the fleet has
+    FLEET_LATENCY_MIN_SAMPLES. Budgets grow by ADAPTIVE_TIMEOUT_BACKOFF
+    per retry (or consecutive timeout), so a slow but valid store is only
+    cut off early until its next attempt. Samples can be persisted and
+    seeded back (Shop.fetch_latency), since a host is rarely crawled twice
+    by the same process.
+    """
+
+    def __init__(self, max_hosts: int = None):
+        self.max_hosts = max_hosts or settings.HOST_LATENCY_MAX_HOSTS
+        self._hosts: "OrderedDict[str, _HostSamples]" = OrderedDict()
+        self._fleet_ttfb: Deque[float] = deque(maxlen=settings.FLEET_LATENCY_SAMPLES)
+        self._fleet_total: Deque[float] = deque(maxlen=settings.FLEET_LATENCY_SAMPLES)
+        self._fleet_percentiles = None
+        self._fleet_stale = 0
+        self._lock = threading.Lock()
+
+    def seed(self, url: str, samples: Optional[Dict[str, List[float]]]):
+        """Restore a host's persisted samples (see samples()) unless newer ones are held"""
+        if not samples:
+            return
+        with self._lock:
+            if host_of(url) in self._hosts:
+                return
+            entry = self._entry(host_of(url))
+            entry.ttfb.extend(samples.get('ttfb') or [])
+            entry.total.extend(samples.get('total') or [])
+
+    def observe(self, url: str, ttfb: float, total: Optional[float] = None):
+        """Record a completed request; total is None for requests whose body was not timed"""
+        with self._lock:
+            entry = self._entry(host_of(url))
+            entry.timeouts = 0
+            entry.ttfb.append(ttfb)
+            self._fleet_ttfb.append(ttfb)
+            if total is not None:
+                entry.total.append(total)
+                self._fleet_total.append(total)
+            self._fleet_stale += 1
+
+    def observe_timeout(self, url: str):
+        """Record that a host ran out of its budget"""
+        with self._lock:
+            self._entry(host_of(url)).timeouts += 1
+
+    def samples(self, url: str) -> Optional[Dict[str, List[float]]]:
+        """A host's recent samples, rounded to the millisecond, for persisting"""
+        with self._lock:
+            entry = self._hosts.get(host_of(url))
+            if entry is None or not entry.ttfb:
+                return None
+            return {
+                'ttfb': [round(value, 3) for value in entry.ttfb],
+                'total': [round(value, 3) for value in entry.total],
+            }
+
+    @staticmethod
+    def ceiling() -> HostBudget:
+        """The configured maximum budget, for hosts (or callers) without a retry later"""
+        return HostBudget(
+            min(settings.CRAWL_CONNECT_TIMEOUT, settings.REQUEST_TIMEOUT),
+            settings.REQUEST_TIMEOUT, settings.CRAWL_DOMAIN_DEADLINE, False
+        )
+
+    def budget(self, url: str, attempt: int = 1) -> HostBudget:
+        """Timeouts for the next fetch of url's host; attempt counts from 1"""
+        with self._lock:
+            entry = self._hosts.get(host_of(url))
+            if entry is not None and len(entry.total) >= settings.HOST_LATENCY_MIN_SAMPLES:
+                ttfb = percentile(entry.ttfb, settings.ADAPTIVE_TIMEOUT_PERCENTILE)
+                total = percentile(entry.total, settings.ADAPTIVE_TIMEOUT_PERCENTILE)
+            elif len(self._fleet_total) >= settings.FLEET_LATENCY_MIN_SAMPLES:
+                ttfb, total = self._fleet()
+            else:
+                return self.ceiling()
+            retries = max(attempt - 1, entry.timeouts if entry is not None else 0)
+
+        scale = settings.ADAPTIVE_TIMEOUT_MULTIPLIER * settings.ADAPTIVE_TIMEOUT_BACKOFF ** retries
+
+        def _bounded(seconds: float, ceiling: float) -> float:
+            return min(max(seconds * scale, settings.ADAPTIVE_TIMEOUT_MIN), ceiling)
+
+        read = _bounded(ttfb, settings.REQUEST_TIMEOUT)
+        deadline = max(_bounded(total, settings.CRAWL_DOMAIN_DEADLINE), min(read, settings.CRAWL_DOMAIN_DEADLINE))
+        return HostBudget(
+            min(read, settings.CRAWL_CONNECT_TIMEOUT), read, deadline, deadline < settings.CRAWL_DOMAIN_DEADLINE
+        )
+
+    def clear(self):
+        with self._lock:
+            self._hosts.clear()
+            self._fleet_ttfb.clear()
+            self._fleet_total.clear()
+            self._fleet_percentiles = None
+
+    def _entry(self, host: str) -> _HostSamples:
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = _HostSamples(settings.HOST_LATENCY_SAMPLES)
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return entry
+
+    def _fleet(self):
+        # Sorting the fleet window on every budget would dominate; refresh it as samples arrive
+        if self._fleet_percentiles is None or self._fleet_stale >= settings.FLEET_LATENCY_SAMPLES // 20:
+            self._fleet_percentiles = (
+                percentile(self._fleet_ttfb, settings.ADAPTIVE_TIMEOUT_PERCENTILE),
+                percentile(self._fleet_total, settings.ADAPTIVE_TIMEOUT_PERCENTILE),
+            )
+            self._fleet_stale = 0
+        return self._fleet_percentiles
+
+
+# Process-wide tracker shared by the crawler services
+host_latency = HostLatency()
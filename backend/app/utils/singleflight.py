@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+import redis
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+# Deletes the lock only if it is still held by the given token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent executions of the same operation
+
+    Within a process, callers with the same key wait on the first caller's
+    call. Across workers, a Redis lock elects one leader; the others poll
+    for the result it publishes under the lock's token. Results must be
+    JSON-serializable. If Redis is unavailable, only in-process
+    coalescing applies.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers of key
+
+        Returns:
+            (result, shared) where shared is True if the result was produced
+            by another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self._do_distributed(key, fn)
+            return call.result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _do_distributed(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        lock_key = f"singleflight:{self.namespace}:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT_TIMEOUT
+
+        try:
+            client = get_redis()
+            while True:
+                if client.set(lock_key, token, nx=True, ex=settings.SINGLEFLIGHT_LOCK_TTL):
+                    break
+
+                holder = client.get(lock_key)
+                if holder is not None:
+                    result = self._wait_for_result(client, lock_key, holder, deadline)
+                    if result is not None:
+                        return result, True
+                if time.monotonic() >= deadline:
+                    # Give up waiting on a stuck leader and run the operation here
+                    return fn(), False
+        except redis.RedisError as e:
+            print(f"Single-flight lock unavailable, running {key} locally: {e}")
+            return fn(), False
+
+        try:
+            result = fn()
+            try:
+                client.set(
+                    f"{lock_key}:result:{token}",
+                    json.dumps(result, default=str),
+                    ex=settings.SINGLEFLIGHT_RESULT_TTL
+                )
+            except (TypeError, ValueError):
+                pass  # not serializable, followers will run the operation themselves
+            return result, False
+        finally:
+            try:
+                client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            except redis.RedisError:
+                pass
+
+    def _wait_for_result(self, client: redis.Redis, lock_key: str, holder: bytes, deadline: float) -> Any:
+        """Poll for the leader's result; None if the leader went away without one"""
+        result_key = f"{lock_key}:result:{holder.decode()}"
+        while time.monotonic() < deadline:
+            payload = client.get(result_key)
+            if payload is not None:
+                return json.loads(payload)
+            if client.get(lock_key) != holder:
+                # Leader released the lock; the result may have landed just before
+                payload = client.get(result_key)
+                return json.loads(payload) if payload is not None else None
+            time.sleep(settings.SINGLEFLIGHT_POLL_INTERVAL)
+        return None
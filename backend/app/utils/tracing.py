@@ -0,0 +1,48 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+logger = logging.getLogger("topshope.trace")
+
+
+class StageTimer:
+    """Record how long named stages of an operation take
+
+    Timings are taken with time.perf_counter and reported in milliseconds.
+    A disabled timer records nothing, so callers can time stages
+    unconditionally and only pay for it when tracing was requested.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        """Add a duration measured elsewhere; repeated stages accumulate"""
+        if self.enabled:
+            self.timings[name] = round(self.timings.get(name, 0.0) + seconds * 1000, 3)
+
+    def finish(self, operation: str, domain: str) -> Dict[str, float]:
+        """Add the total, log the breakdown as one JSON line and return it"""
+        self.record('total', time.perf_counter() - self._started)
+        logger.info(json.dumps({
+            'event': 'stage_timings',
+            'operation': operation,
+            'domain': domain,
+            'timings_ms': self.timings,
+        }))
+        return self.timings
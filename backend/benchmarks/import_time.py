@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the API
+Imports main in fresh interpreters with -X importtime, reports the slowest
+modules and fails (exit 1) when startup pulls in a dependency that should
+only load on first use. Startup time depends on the machine, so it is only
+checked against a baseline report from the same machine, or an explicit
+budget.
+
+    python benchmarks/import_time.py --output imports.json
+    python benchmarks/import_time.py --compare imports.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Crawl, ML and browser stacks, imported lazily by the code that needs them
+LAZY_MODULES = [
+    "bs4", "requests", "tldextract", "dns", "ijson", "numpy", "pandas", "sklearn",
+    "transformers", "torch", "cv2", "playwright", "selenium",
+]
+
+
+def profile_import(module: str = "main") -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from a fresh interpreter"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.setdefault(name.strip(), int(cumulative))
+    return timings
+
+
+def top_level_packages(timings: Dict[str, int], limit: int) -> List[Dict]:
+    """Slowest top-level packages by cumulative import time"""
+    packages = {name: us for name, us in timings.items() if "." not in name}
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"module": name, "ms": round(us / 1000, 1)} for name, us in slowest]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API import time")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time; the median is reported")
+    parser.add_argument("--budget-ms", type=float, help="Exit 1 if the median import time exceeds this")
+    parser.add_argument("--compare", help="Baseline report (from --output) to compare the median against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Exit 1 if the median regresses by more than this fraction of the baseline")
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to list")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    totals = [timings[args.module] / 1000 for timings in runs]
+    median_ms = statistics.median(totals)
+    eager = sorted(
+        module for module in LAZY_MODULES
+        if any(name == module or name.startswith(f"{module}.") for name in runs[0])
+    )
+
+    report = {
+        "module": args.module,
+        "median_ms": round(median_ms, 1),
+        "runs_ms": [round(total, 1) for total in totals],
+        "budget_ms": args.budget_ms,
+        "slowest": top_level_packages(runs[0], args.top),
+        "eager_lazy_modules": eager,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    failed = False
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"import {args.module} took {median_ms:.0f}ms, budget is {args.budget_ms:.0f}ms", file=sys.stderr)
+        failed = True
+    if args.compare:
+        with open(args.compare) as f:
+            baseline_ms = json.load(f)["median_ms"]
+        change = median_ms / baseline_ms - 1
+        print(f"import {args.module}: {baseline_ms:.0f} -> {median_ms:.0f}ms ({change:+.1%})", file=sys.stderr)
+        if change > args.max_regression:
+            failed = True
+    if eager:
+        print(f"Imported at startup, should be lazy: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
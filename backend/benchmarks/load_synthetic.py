@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset loader
+Bulk-loads a large synthetic shop catalog for load testing.
+
+    python benchmarks/load_synthetic.py --rows 1000000 --truncate
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_db import seed
+
+
+def load_synthetic(rows: int, seed_value: int = 42, truncate: bool = False) -> int:
+    """Load synthetic shops, without fixtures, until the table holds rows shops"""
+    return seed(fixtures=[], rows=rows, truncate=truncate, seed_value=seed_value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic shop catalog")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Total number of shops to reach")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="Empty the shops table first")
+    args = parser.parse_args()
+
+    load_synthetic(args.rows, seed_value=args.seed, truncate=args.truncate)
+
+
+if __name__ == "__main__":
+    main()
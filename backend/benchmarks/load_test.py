@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Concurrent load driver for the REST API
+Replays a weighted mix of list, detail and rankings requests against a
+running server and reports latency percentiles and throughput as JSON.
+
+    python benchmarks/load_test.py --base-url http://localhost:8000 --concurrency 64 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from benchmarks.run_benchmarks import summarize
+
+REGIONS = ["north_america", "europe", "middle_east"]
+
+# Relative frequency of each scenario in the request mix
+DEFAULT_MIX = "list=5,list_filtered=3,get=6,rankings=4"
+
+
+def build_request(scenario: str, rng: random.Random, max_id: int, prefix: str) -> str:
+    if scenario == "list":
+        return f"{prefix}/shops/?page={rng.randint(1, 50)}&size=20"
+    if scenario == "list_filtered":
+        return (
+            f"{prefix}/shops/?region={rng.choice(REGIONS)}&is_shopify=true"
+            f"&is_womens_fashion={rng.choice(['true', 'false'])}&page={rng.randint(1, 20)}&size=50"
+        )
+    if scenario == "get":
+        return f"{prefix}/shops/{rng.randint(1, max_id)}"
+    if scenario == "rankings":
+        return f"{prefix}/shops/rankings/{rng.choice(REGIONS)}?limit={rng.choice([10, 25, 50])}"
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def parse_mix(mix: str) -> Tuple[List[str], List[float]]:
+    scenarios, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        scenarios.append(name.strip())
+        weights.append(float(weight or 1))
+    return scenarios, weights
+
+
+async def run_load(base_url: str, concurrency: int, duration: float, mix: str,
+                   max_id: int = None, prefix: str = "/api/v1", seed: int = 1) -> Dict:
+    scenarios, weights = parse_mix(mix)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        if max_id is None:
+            response = await client.get(f"{prefix}/shops/?size=1")
+            response.raise_for_status()
+            max_id = max(response.json()["total"], 1)
+
+        deadline = time.perf_counter() + duration
+
+        async def _worker(worker_id: int):
+            rng = random.Random(seed * 1000 + worker_id)
+            while time.perf_counter() < deadline:
+                scenario = rng.choices(scenarios, weights)[0]
+                path = build_request(scenario, rng, max_id, prefix)
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    # A random id may have been deleted; 404 is a valid answer
+                    ok = response.status_code < 400 or (scenario == "get" and response.status_code == 404)
+                except httpx.HTTPError:
+                    ok = False
+                latencies[scenario].append(time.perf_counter() - started)
+                if not ok:
+                    errors[scenario] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    report = {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(all_latencies),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1),
+        "errors": sum(errors.values()),
+        "overall": summarize(all_latencies) if all_latencies else {},
+        "scenarios": {},
+    }
+    for scenario, values in latencies.items():
+        report["scenarios"][scenario] = {
+            **summarize(values),
+            "throughput_rps": round(len(values) / elapsed, 1),
+            "errors": errors[scenario],
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the shops API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted scenarios, e.g. list=5,get=6,rankings=4")
+    parser.add_argument("--max-id", type=int, help="Highest shop id for detail requests (default: total shops)")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args.base_url, args.concurrency, args.duration, args.mix, args.max_id))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Replay server for the benchmark corpus
+Serves the recorded storefronts in corpus/ over local HTTP so crawler
+benchmarks need no network access. Each site lives under /site/<name>/.
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def load_corpus(corpus_dir: str = CORPUS_DIR) -> Dict[str, Dict]:
+    """Load the manifest with each site's body read into memory"""
+    with open(os.path.join(corpus_dir, "manifest.json")) as f:
+        sites = json.load(f)
+
+    for site in sites.values():
+        if "file" in site:
+            with open(os.path.join(corpus_dir, site["file"]), "rb") as f:
+                site["body"] = f.read()
+        else:
+            site["body"] = site.get("body", "").encode("utf-8")
+    return sites
+
+
+class ReplayServer:
+    """Threaded HTTP server replaying the corpus with simulated latency
+
+    Every request sleeps latency + uniform(0, jitter) seconds before it is
+    answered. Use as a context manager; url_for(name) gives a site's base URL.
+    """
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR, latency: float = 0.0, jitter: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.sites = load_corpus(corpus_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/site/{name}"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._reply(send_body=True)
+
+            def do_HEAD(self):
+                self._reply(send_body=False)
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, send_body: bool):
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.uniform(0, server.jitter))
+
+                status, headers, body = self._resolve()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value.replace("{base}", server.base_url))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def _resolve(self):
+                # /site/<name>/<path>
+                parts = self.path.split("?", 1)[0].split("/", 3)
+                site = server.sites.get(parts[2]) if len(parts) > 2 and parts[1] == "site" else None
+                if site is None:
+                    return 404, {}, b""
+
+                path = "/" + parts[3] if len(parts) > 3 else "/"
+                if path.rstrip("/") == "":
+                    return site["status"], site.get("headers", {}), site["body"]
+
+                # An endpoint is a status code, or {"status", "headers", "json"} for a real payload
+                endpoint = site.get("endpoints", {}).get(path.rstrip("/"), 404)
+                if isinstance(endpoint, dict):
+                    body = json.dumps(endpoint.get("json", {})).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **endpoint.get("headers", {})}
+                    return endpoint.get("status", 200), headers, body
+                body = b"{}" if endpoint == 200 else b""
+                return endpoint, {"Content-Type": "application/json"} if endpoint == 200 else {}, body
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the benchmark corpus locally")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    args = parser.parse_args()
+
+    server = ReplayServer(latency=args.latency, jitter=args.jitter, port=args.port)
+    print(f"Replaying {len(server.sites)} sites on {server.base_url}/site/<name>/")
+    for name in server.sites:
+        print(f"  {server.url_for(name)}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite
+Runs the crawler, classifier, discovery and API benchmarks against the
+local replay server and a throwaway database, and prints the results as
+JSON so they can be compared between commits.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from benchmarks.replay_server import ReplayServer
+
+BENCHMARKS = ["shopify_detector", "fashion_classifier", "domain_discovery", "api"]
+
+# Run only with --only, they need extra dependencies (playwright and its Chromium)
+OPTIONAL_BENCHMARKS = ["rendering"]
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds for a list of durations in seconds"""
+    import numpy as np
+
+    values = np.array(durations) * 1000
+    return {
+        "count": len(durations),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "min_ms": round(float(values.min()), 3),
+        "max_ms": round(float(values.max()), 3),
+        "ops_per_sec": round(len(durations) / max(sum(durations), 1e-9), 2),
+    }
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return summarize(durations)
+
+
+def bench_shopify_detector(server: ReplayServer, iterations: int) -> Dict:
+    from app.services.shopify_detector import ShopifyDetector
+
+    detector = ShopifyDetector()
+    sites = server.sites
+    correct = 0
+    verified = []
+
+    def _detect_all():
+        nonlocal correct
+        for name, site in sites.items():
+            result = detector.detect_shopify(server.url_for(name))
+            correct += result["is_shopify"] == site["expected"]["is_shopify"]
+            if result["is_shopify"]:
+                verified.append(result)
+
+    html = [site["body"].decode("utf-8") for site in sites.values() if site["status"] == 200]
+    results = {
+        "detect_corpus": measure(_detect_all, iterations, warmup=0),
+        "analyze_html": measure(lambda: [detector.analyze_html(page) for page in html], iterations),
+    }
+    results["accuracy"] = round(correct / (len(sites) * iterations), 3)
+    if verified:
+        # Cost of verifying a Shopify store; the probe tier alone needs no homepage
+        results["requests_per_verified"] = round(sum(r["requests"] for r in verified) / len(verified), 2)
+        results["bytes_per_verified"] = round(sum(r["bytes"] for r in verified) / len(verified))
+        results["probe_tier_share"] = round(sum(r["tiers"] == ["probe"] for r in verified) / len(verified), 3)
+    return results
+
+
+def bench_fashion_classifier(server: ReplayServer, iterations: int) -> Dict:
+    from app.services.fashion_classifier import FashionClassifier
+
+    classifier = FashionClassifier(mode="keyword")
+    sites = server.sites
+    pages = [(name, site["body"].decode("utf-8")) for name, site in sites.items() if site["status"] == 200]
+    correct = 0
+
+    def _classify_fetched():
+        nonlocal correct
+        for name, site in sites.items():
+            result = classifier.classify_fashion(server.url_for(name))
+            correct += result["is_womens_fashion"] == site["expected"]["is_womens_fashion"]
+
+    results = {
+        "classify_html": measure(lambda: [classifier.classify_fashion(name, page) for name, page in pages], iterations),
+        "classify_batch_html": measure(lambda: classifier.classify_batch(pages), iterations),
+        "classify_fetched": measure(_classify_fetched, iterations, warmup=0),
+    }
+    results["accuracy"] = round(correct / (len(sites) * iterations), 3)
+    return results
+
+
+def bench_domain_discovery(iterations: int) -> Dict:
+    from app.services.domain_discovery import DomainDiscovery
+
+    discovery = DomainDiscovery()
+
+    async def _stream(region: str) -> List[Dict]:
+        return [item async for item in discovery.stream_domains(region, 50)]
+
+    # Spelling variants of the same stores, as several sources would report them
+    rng = random.Random(42)
+    candidates = []
+    for i in range(20000):
+        domain = f"store-{rng.randrange(5000)}.{rng.choice(['com', 'co.uk', 'de', 'ae'])}"
+        prefix = rng.choice(["", "www.", "https://", "https://www.", "HTTP://WWW."])
+        candidates.append({"domain": f"{prefix}{domain}/", "name": domain, "region": "europe"})
+
+    return {
+        "stream_domains": measure(
+            lambda: [asyncio.run(_stream(region)) for region in ("north_america", "europe", "middle_east")],
+            iterations
+        ),
+        "deduplicate_20k": measure(lambda: discovery._deduplicate_domains(candidates), max(iterations // 4, 1)),
+    }
+
+
+def seed_shops(count: int):
+    """Load count synthetic shops into the benchmark database"""
+    from app.core.database import SessionLocal, create_tables
+    from app.models.shop import Shop
+    from app.services.bulk_loader import BulkLoader
+    from benchmarks.synthetic import generate_shop_frames
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        BulkLoader(db, Shop.__table__).load_frames(generate_shop_frames(count))
+        db.commit()
+    finally:
+        db.close()
+
+
+def bench_api(iterations: int, shops: int, seed: bool) -> Dict:
+    from fastapi.testclient import TestClient
+    from main import app
+
+    if seed:
+        seed_shops(shops)
+
+    prefix = "/api/v1/shops"
+    rng = random.Random(7)
+    with TestClient(app) as client:
+        def _get(path: str):
+            response = client.get(path)
+            assert response.status_code == 200, f"{path}: {response.status_code}"
+
+        return {
+            "list_shops": measure(lambda: _get(f"{prefix}/?page=1&size=20"), iterations),
+            "list_shops_filtered": measure(
+                lambda: _get(f"{prefix}/?region=europe&is_shopify=true&is_womens_fashion=true&page=3&size=50"),
+                iterations
+            ),
+            "get_shop": measure(lambda: _get(f"{prefix}/{rng.randint(1, shops)}"), iterations),
+            "rankings": measure(lambda: _get(f"{prefix}/rankings/europe?limit=50"), iterations),
+        }
+
+
+def descendants_rss_mb() -> float:
+    """Resident memory of this process's child processes (e.g. Chromium), Linux only"""
+    children: Dict[int, List[int]] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/statm") as f:
+                rss_pages[int(entry)] = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return round(total * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+
+
+def bench_rendering(server: ReplayServer, iterations: int) -> Dict:
+    from app.services.browser_pool import BrowserPool
+
+    urls = [server.url_for(name) for name, site in server.sites.items() if site["status"] == 200]
+
+    async def _run() -> Dict:
+        pool = await BrowserPool().start()
+        durations = []
+        failures = 0
+
+        async def _render(url: str):
+            nonlocal failures
+            started = time.perf_counter()
+            failures += await pool.render(url) is None
+            durations.append(time.perf_counter() - started)
+
+        # More concurrent renders than contexts, so the pool bound is exercised
+        started = time.perf_counter()
+        await asyncio.gather(*[_render(url) for _ in range(iterations) for url in urls])
+        elapsed = time.perf_counter() - started
+        results = {
+            "render": summarize(durations),
+            "pages_per_sec": round(len(durations) / elapsed, 2),
+            "failures": failures,
+            "pool": pool.stats(),
+            "browser_rss_mb": descendants_rss_mb(),
+        }
+        await pool.close()
+        return results
+
+    return asyncio.run(_run())
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> bool:
+    """Print the p50 change per benchmark; False if any exceeds max_regression"""
+    ok = True
+    print(f"Comparing against {baseline.get('commit', 'baseline')}:", file=sys.stderr)
+    for group, cases in results["results"].items():
+        for case, stats in cases.items():
+            before = baseline.get("results", {}).get(group, {}).get(case)
+            if not isinstance(stats, dict) or not isinstance(before, dict) or not before.get("p50_ms"):
+                continue
+            change = stats["p50_ms"] / before["p50_ms"] - 1
+            flag = ""
+            if max_regression is not None and change > max_regression:
+                flag, ok = "  REGRESSION", False
+            print(f"  {group}.{case}: p50 {before['p50_ms']} -> {stats['p50_ms']} ms ({change:+.1%}){flag}",
+                  file=sys.stderr)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Comma-separated benchmarks to run, also: {', '.join(OPTIONAL_BENCHMARKS)}")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--shops", type=int, default=10000, help="Shops seeded for the API benchmarks")
+    parser.add_argument("--database-url", help="Benchmark an existing database instead of a temporary SQLite one")
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--max-regression", type=float, help="Exit 1 if any p50 regresses by more than this fraction")
+    args = parser.parse_args()
+
+    # The database must be chosen before the app modules read their settings
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    from app.core.config import settings
+    settings.SCRAPING_DELAY = 0
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    results = {}
+    with ReplayServer(latency=args.latency, jitter=args.jitter) as server:
+        for name in selected:
+            print(f"Running {name}...", file=sys.stderr)
+            if name == "shopify_detector":
+                results[name] = bench_shopify_detector(server, args.iterations)
+            elif name == "fashion_classifier":
+                results[name] = bench_fashion_classifier(server, args.iterations)
+            elif name == "domain_discovery":
+                results[name] = bench_domain_discovery(args.iterations)
+            elif name == "rendering":
+                results[name] = bench_rendering(server, args.iterations)
+            elif name == "api":
+                results[name] = bench_api(args.iterations, args.shops, seed=not args.database_url)
+            else:
+                parser.error(f"Unknown benchmark: {name}")
+    tmpdir.cleanup()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "shops": args.shops,
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
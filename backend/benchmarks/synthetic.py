@@ -0,0 +1,99 @@
+"""
+Synthetic shop catalog generator
+Produces shop rows with realistic distributions for load tests and seeding:
+regional mix, Shopify/fashion flags, heavy-tailed traffic, correlated scores.
+Generation is vectorized per chunk, so millions of rows take seconds.
+"""
+
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from app.models.shop import Region, ShopStatus
+
+REGION_WEIGHTS = {
+    Region.NORTH_AMERICA: 0.45,
+    Region.EUROPE: 0.38,
+    Region.MIDDLE_EAST: 0.17,
+}
+
+REGION_TLDS = {
+    Region.NORTH_AMERICA: (["com", "us", "ca", "shop", "store"], [0.72, 0.08, 0.1, 0.06, 0.04]),
+    Region.EUROPE: (["com", "co.uk", "de", "fr", "it", "es", "nl", "eu"], [0.35, 0.2, 0.14, 0.1, 0.07, 0.06, 0.05, 0.03]),
+    Region.MIDDLE_EAST: (["com", "ae", "sa", "com.tr", "qa"], [0.5, 0.22, 0.14, 0.1, 0.04]),
+}
+
+NAME_WORDS = [
+    "luna", "maison", "atelier", "bloom", "velvet", "silk", "linen", "rose", "ivy", "nova",
+    "aura", "jade", "pearl", "coral", "sage", "willow", "amber", "stella", "belle", "muse",
+    "studio", "house", "lane", "label", "closet", "boutique", "collective", "edit", "wear", "co",
+]
+
+STATUS_WEIGHTS = {ShopStatus.ACTIVE: 0.93, ShopStatus.INACTIVE: 0.05, ShopStatus.ERROR: 0.02}
+
+CHUNK_SIZE = 100000
+
+
+def generate_shop_frames(count: int, seed: int = 42, start: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Yield count synthetic shop rows as DataFrames of up to CHUNK_SIZE rows
+
+    Domains are unique for distinct (start + i), so several runs with
+    non-overlapping start offsets can be loaded into the same table.
+    """
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now('UTC').tz_localize(None)
+    regions = np.array([region.name for region in REGION_WEIGHTS])
+    statuses = np.array([status.name for status in STATUS_WEIGHTS])
+    words = np.array(NAME_WORDS, dtype=object)
+
+    for chunk_start in range(0, count, CHUNK_SIZE):
+        n = min(CHUNK_SIZE, count - chunk_start)
+        index = np.arange(start + chunk_start, start + chunk_start + n).astype(str).astype(object)
+
+        region_idx = rng.choice(len(regions), n, p=list(REGION_WEIGHTS.values()))
+        first = words[rng.integers(0, len(words), n)]
+        second = words[rng.integers(0, len(words), n)]
+        tlds = np.empty(n, dtype=object)
+        for i, region in enumerate(REGION_WEIGHTS):
+            mask = region_idx == i
+            choices, weights = REGION_TLDS[region]
+            tlds[mask] = rng.choice(choices, int(mask.sum()), p=weights)
+
+        is_shopify = rng.random(n) < 0.62
+        # Fashion stores are over-represented among discovered Shopify stores
+        is_fashion = rng.random(n) < np.where(is_shopify, 0.45, 0.2)
+        confidence = np.where(is_fashion, rng.beta(8, 2, n), rng.beta(2, 6, n))
+
+        # Heavy-tailed traffic; rank falls with visits plus noise
+        visits = rng.lognormal(9.0, 1.8, n).astype(np.int64)
+        rank = np.clip((2e9 / (visits + 1)) * rng.lognormal(0, 0.3, n), 1, 20_000_000).astype(np.int64)
+        popularity = np.log1p(visits) / np.log1p(visits.max() or 1)
+        social = np.clip(popularity * 8 + rng.normal(1, 1.5, n), 0, 10)
+        seo = np.clip(popularity * 7 + rng.normal(1.5, 1.5, n), 0, 10)
+        overall = np.clip(0.4 * popularity * 10 + 0.3 * social + 0.3 * seo, 0, 10)
+
+        age_days = rng.uniform(0, 730, n)
+        created_at = now - pd.to_timedelta(age_days, unit='D')
+        checked_at = now - pd.to_timedelta(age_days * rng.random(n), unit='D')
+        names = pd.Series(first).str.title() + ' ' + pd.Series(second).str.title()
+
+        yield pd.DataFrame({
+            'domain': first + '-' + second + '-' + index + '.' + tlds,
+            'name': names,
+            'region': regions[region_idx],
+            'is_shopify': is_shopify,
+            'shopify_verified_at': pd.Series(checked_at).where(is_shopify),
+            'is_womens_fashion': is_fashion,
+            'category_confidence': confidence.round(3),
+            'category_verified_at': checked_at,
+            'traffic_rank': rank,
+            'monthly_visits': visits,
+            'social_media_score': social.round(2),
+            'seo_score': seo.round(2),
+            'overall_score': overall.round(2),
+            'status': statuses[rng.choice(len(statuses), n, p=list(STATUS_WEIGHTS.values()))],
+            'last_checked': checked_at,
+            'created_at': created_at,
+            'updated_at': checked_at,
+            'description': names + ' online store',
+        })
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Catalog crawl script
+Reads the product catalogs of Shopify shops (/products.json, /collections.json)
+and stores product counts, price percentiles and the womenswear share.
+
+    python crawl_catalogs.py shop-a.com shop-b.com
+    python crawl_catalogs.py --stale-days 7 --rescore   # catalogs older than a week, then rescore
+    python crawl_catalogs.py --metrics-port 9102        # Prometheus metrics on :9102/metrics
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.metrics import serve_metrics
+from app.services.catalog_crawler import refresh_catalogs
+from rescore import rescore
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl and store Shopify shop catalogs")
+    parser.add_argument("domains", nargs="*")
+    parser.add_argument("--stale-days", type=float, help="Crawl shops whose catalog is older than this (default: all)")
+    parser.add_argument("--rescore", action="store_true", help="Recompute overall_score afterwards")
+    parser.add_argument(
+        "--metrics-port", type=int, default=settings.WORKER_METRICS_PORT,
+        help="Serve Prometheus metrics on this port while running (default: WORKER_METRICS_PORT, 0 = off)"
+    )
+    args = parser.parse_args()
+    serve_metrics(args.metrics_port)
+
+    totals = asyncio.run(refresh_catalogs(args.domains or None, args.stale_days))
+    print(f"Crawled {totals['crawled']} catalogs ({totals['failed']} failed)")
+    if args.rescore:
+        rescore()
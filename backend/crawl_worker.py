@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Distributed crawl worker
+Queues shop domains in Redis and crawls them from any number of nodes.
+
+    python crawl_worker.py enqueue --all              # every shop
+    python crawl_worker.py enqueue --stale-days 7     # shops not checked for a week
+    python crawl_worker.py enqueue shop-a.com shop-b.com
+    python crawl_worker.py run                        # crawl until stopped (SIGTERM/Ctrl-C)
+    python crawl_worker.py run --metrics-port 9100    # ... serving Prometheus metrics on :9100/metrics
+    python crawl_worker.py stats
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import or_, select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.shop import Shop, ShopStatus
+from app.services.work_queue import WorkQueue
+
+# Domains read from the shops table per enqueue batch
+ENQUEUE_BATCH_SIZE = 10000
+
+
+def enqueue(domains=None, all_shops: bool = False, stale_days: float = None, delay: float = 0.0) -> int:
+    """Queue the given domains, or active shops from the database"""
+    queue = WorkQueue()
+    if domains:
+        return queue.enqueue(domains, delay=delay)
+
+    statement = select(Shop.domain).where(Shop.status != ShopStatus.INACTIVE)
+    if stale_days is not None:
+        cutoff = datetime.utcnow() - timedelta(days=stale_days)
+        statement = statement.where(or_(Shop.last_checked.is_(None), Shop.last_checked < cutoff))
+    elif not all_shops:
+        raise ValueError("Pass domains, --all or --stale-days")
+
+    db = SessionLocal()
+    added = 0
+    try:
+        batch = []
+        for domain in db.execute(statement.execution_options(yield_per=ENQUEUE_BATCH_SIZE)).scalars():
+            batch.append(domain)
+            if len(batch) >= ENQUEUE_BATCH_SIZE:
+                added += queue.enqueue(batch, delay=delay)
+                batch = []
+        if batch:
+            added += queue.enqueue(batch, delay=delay)
+    finally:
+        db.close()
+    return added
+
+
+async def run_worker(
+    batch_size: int = None, max_batches: int = None, exit_when_empty: bool = False, metrics_port: int = None
+):
+    # Imported here so enqueue and stats do not load the crawl stack
+    from app.core.metrics import serve_metrics
+    from app.services.crawl_worker import CrawlWorker
+
+    serve_metrics(metrics_port)
+    worker = CrawlWorker(batch_size=batch_size)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # Finish the current batch, then exit
+        loop.add_signal_handler(sig, worker.stop)
+    totals = await worker.run(max_batches=max_batches, exit_when_empty=exit_when_empty)
+    print(
+        f"Crawled {totals['crawled']} domains in {totals['batches']} batches "
+        f"({totals['released']} released for retry, {totals['deferred']} cut off as slow hosts, "
+        f"{totals['dropped']} not active shops, {totals['merged']} merged as aliases)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed crawl queue and worker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Queue domains for crawling")
+    enqueue_parser.add_argument("domains", nargs="*")
+    enqueue_parser.add_argument("--all", action="store_true", help="Queue every active shop")
+    enqueue_parser.add_argument("--stale-days", type=float, help="Queue shops not checked for this many days")
+    enqueue_parser.add_argument("--delay", type=float, default=0.0, help="Seconds before the domains are due")
+
+    run_parser = commands.add_parser("run", help="Lease and crawl queued domains")
+    run_parser.add_argument("--batch-size", type=int)
+    run_parser.add_argument("--max-batches", type=int)
+    run_parser.add_argument("--exit-when-empty", action="store_true")
+    run_parser.add_argument(
+        "--metrics-port", type=int, default=settings.WORKER_METRICS_PORT,
+        help="Serve Prometheus metrics on this port (default: WORKER_METRICS_PORT, 0 = off)"
+    )
+
+    commands.add_parser("stats", help="Show queue sizes")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        if not (args.domains or args.all or args.stale_days is not None):
+            enqueue_parser.error("pass domains, --all or --stale-days")
+        added = enqueue(args.domains, all_shops=args.all, stale_days=args.stale_days, delay=args.delay)
+        print(f"Queued {added} domains")
+    elif args.command == "run":
+        asyncio.run(run_worker(args.batch_size, args.max_batches, args.exit_when_empty, args.metrics_port))
+    else:
+        print(json.dumps(WorkQueue().stats()))
+
+
+if __name__ == "__main__":
+    main()
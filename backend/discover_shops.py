@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Shop discovery script
+Discovers candidate domains for a region, verifies them as Shopify stores
+while discovery is still running, and stores the new stores as shops.
+
+    python discover_shops.py north_america --limit 100
+    python discover_shops.py europe middle_east
+    python discover_shops.py europe --metrics-port 9101   # Prometheus metrics on :9101/metrics
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.metrics import serve_metrics
+from app.models.shop import Region
+from app.services.discovery_pipeline import discover_shops
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discover and store Shopify fashion stores")
+    parser.add_argument("regions", nargs="+", choices=[region.value for region in Region])
+    parser.add_argument("--limit", type=int, default=50, help="Candidate domains per region")
+    parser.add_argument(
+        "--metrics-port", type=int, default=settings.WORKER_METRICS_PORT,
+        help="Serve Prometheus metrics on this port while running (default: WORKER_METRICS_PORT, 0 = off)"
+    )
+    args = parser.parse_args()
+    serve_metrics(args.metrics_port)
+
+    for region in args.regions:
+        totals = asyncio.run(discover_shops(region, args.limit))
+        print(f"{region}: verified {totals['verified']} domains, stored {totals['stored']} new shops")
@@ -1,7 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.database import create_tables
+from app.core.database import ensure_schema
+from app.core.metrics import MetricsMiddleware, render_metrics
 from app.api.api import api_router
 
 # Create FastAPI app
@@ -19,13 +21,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Request latency per route
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.on_event("startup")
 async def startup_event():
-    """Create database tables on startup"""
-    create_tables()
+    """Create database tables on startup, and add new columns to existing ones"""
+    ensure_schema()
 
 @app.get("/")
 def read_root():
@@ -37,4 +45,10 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type, headers={"Cache-Control": "no-store"}) 
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Page archive script
+Re-runs Shopify detection and fashion classification over the archived
+homepages (after a rule change) and manages the archive's retention.
+
+    python replay_archive.py replay                    # every archived shop
+    python replay_archive.py replay shop-a.com --workers 8
+    python replay_archive.py replay --since 2024-05-01
+    python replay_archive.py prune --retention-days 30
+    python replay_archive.py stats
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.page_archive import PageArchive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and prune the archive of fetched homepages")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="Re-analyze archived pages and store the results")
+    replay_parser.add_argument("domains", nargs="*")
+    replay_parser.add_argument("--since", type=datetime.fromisoformat, help="Only pages fetched at or after this date")
+    replay_parser.add_argument("--workers", type=int, help="Analysis processes (default: one per CPU)")
+
+    prune_parser = commands.add_parser("prune", help="Delete pages past the retention period")
+    prune_parser.add_argument("--retention-days", type=float)
+    prune_parser.add_argument("--keep-latest", type=int, help="Pages per domain kept regardless of age")
+
+    commands.add_parser("stats", help="Show archive size")
+    args = parser.parse_args()
+
+    try:
+        PageArchive()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.command == "replay":
+        # Imported here so prune and stats do not load the crawl stack
+        from app.services.archive_replay import ArchiveReplay
+
+        started = time.perf_counter()
+        totals = ArchiveReplay(workers=args.workers).run(args.domains or None, since=args.since)
+        print(
+            f"Replayed {totals['replayed']} pages in {time.perf_counter() - started:.1f}s "
+            f"({totals['changed']} shops changed, {totals['skipped']} not in the database, {totals['failed']} failed)"
+        )
+    elif args.command == "prune":
+        removed = PageArchive().prune(args.retention_days, args.keep_latest)
+        print(f"Removed {removed} archived pages")
+    else:
+        print(json.dumps(PageArchive().stats()))
+
+
+if __name__ == "__main__":
+    main()
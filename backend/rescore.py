@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Shop scoring script
+This script recomputes overall_score for all active shops
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.scoring import ScoringEngine, WEIGHT_PRESETS
+
+def rescore(weights: str = None):
+    """Rescore all active shops"""
+    db = SessionLocal()
+    
+    try:
+        stats = ScoringEngine(db, weights=weights).rescore()
+        print(
+            f"Scored {stats['shops_scored']} shops ({stats['shops_updated']} changed) "
+            f"in {stats['load_seconds'] + stats['compute_seconds'] + stats['write_seconds']:.2f}s "
+            f"[load {stats['load_seconds']}s, compute {stats['compute_seconds']}s, "
+            f"write {stats['write_seconds']}s]"
+        )
+    except Exception as e:
+        print(f"Error rescoring shops: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute overall_score for all shops")
+    parser.add_argument("--weights", choices=sorted(WEIGHT_PRESETS), help="Weighting preset")
+    args = parser.parse_args()
+    
+    print("Rescoring shops...")
+    rescore(args.weights)
+    print("Rescoring completed!")
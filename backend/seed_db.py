@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Database seeding script
+Bulk-loads shops from fixture files (JSON, CSV or Parquet) and optionally
+a synthetic dataset of a given size. On PostgreSQL rows go in with COPY.
+
+    python seed_db.py                              # fixtures/shops.json
+    python seed_db.py --truncate --rows 1000000    # fixtures + synthetic shops up to 1M rows
+    python seed_db.py staging.parquet --truncate
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Iterator, List
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from app.core.cache import bump_data_version
+from app.core.database import SessionLocal, create_tables, engine
+from app.models.shop import Region, Shop, ShopAlias, ShopStatus
+from app.services.bulk_loader import BulkLoader
+from app.services.search import drop_search_indexes, ensure_search_indexes
+from app.services.seen_domains import SeenDomainStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_FIXTURES = [os.path.join(FIXTURES_DIR, "shops.json")]
+
+# Rows read per chunk from CSV fixtures
+CSV_CHUNK_SIZE = 100000
+
+# Fixtures may use enum values ("europe") or names ("EUROPE")
+ENUM_COLUMNS = {
+    "region": {**{m.value: m.name for m in Region}, **{m.name: m.name for m in Region}},
+    "status": {**{m.value: m.name for m in ShopStatus}, **{m.name: m.name for m in ShopStatus}},
+}
+
+
+def read_fixture(path: str) -> Iterator[pd.DataFrame]:
+    """Read a fixture file as DataFrames of shop rows"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path) as f:
+            frames = [pd.DataFrame(json.load(f))]
+    elif extension == ".csv":
+        frames = pd.read_csv(path, chunksize=CSV_CHUNK_SIZE)
+    elif extension == ".parquet":
+        # Needs pyarrow or fastparquet
+        frames = [pd.read_parquet(path)]
+    else:
+        raise ValueError(f"Unsupported fixture format: {path}")
+
+    for frame in frames:
+        for column, lookup in ENUM_COLUMNS.items():
+            if column in frame:
+                frame[column] = frame[column].map(lookup, na_action="ignore")
+        yield frame
+
+
+def truncate_shops(db: Session):
+    """Empty the shops and shop_aliases tables, keeping the schema"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("TRUNCATE shop_aliases, shops RESTART IDENTITY CASCADE"))
+    else:
+        db.execute(ShopAlias.__table__.delete())
+        db.execute(Shop.__table__.delete())
+
+
+def seed(fixtures: List[str] = None, rows: int = 0, truncate: bool = False, seed_value: int = 42) -> int:
+    """
+    Load fixture files, then synthetic shops until the table holds rows shops
+
+    With truncate on PostgreSQL, the shops indexes (search indexes included)
+    are dropped for the load and rebuilt afterwards, which is much faster than maintaining them row
+    by row. Everything runs in one transaction.
+
+    Returns:
+        Number of shops loaded
+    """
+    fixtures = DEFAULT_FIXTURES if fixtures is None else fixtures
+    create_tables()
+    db = SessionLocal()
+    started = time.perf_counter()
+
+    try:
+        postgres = db.get_bind().dialect.name == "postgresql"
+        indexes = []
+        if truncate:
+            truncate_shops(db)
+            if postgres:
+                connection = db.connection()
+                indexes = list(Shop.__table__.indexes)
+                for index in indexes:
+                    index.drop(bind=connection)
+                drop_search_indexes(connection)
+
+        loader = BulkLoader(db, Shop.__table__)
+        loaded = 0
+        for path in fixtures:
+            count = loader.load_frames(read_fixture(path))
+            print(f"Loaded {count} shops from {os.path.basename(path)}")
+            loaded += count
+
+        existing = db.execute(select(func.count()).select_from(Shop)).scalar()
+        if rows > existing:
+            from benchmarks.synthetic import generate_shop_frames
+            count = loader.load_frames(generate_shop_frames(rows - existing, seed=seed_value, start=existing))
+            print(f"Loaded {count} synthetic shops")
+            loaded += count
+
+        for index in indexes:
+            index.create(bind=db.connection())
+
+        db.commit()
+        bump_data_version()
+        # Too many domains to queue one by one, rebuild the filter from the table instead
+        SeenDomainStore.invalidate()
+        if postgres:
+            ensure_search_indexes(engine)
+            db.execute(text("ANALYZE shops"))
+            db.commit()
+    except Exception as e:
+        print(f"Error seeding database: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Seeded {loaded} shops in {time.perf_counter() - started:.1f}s")
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load shops into the database")
+    parser.add_argument("fixtures", nargs="*", help="JSON, CSV or Parquet files (default: fixtures/shops.json)")
+    parser.add_argument("--rows", type=int, default=0, help="Top up with synthetic shops to this many rows")
+    parser.add_argument("--truncate", action="store_true", help="Empty the shop tables first")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for synthetic shops")
+    args = parser.parse_args()
+
+    seed(args.fixtures or DEFAULT_FIXTURES, rows=args.rows, truncate=args.truncate, seed_value=args.seed)
+
+
+if __name__ == "__main__":
+    main()
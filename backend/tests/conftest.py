@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings are read on import, so point the app at a throwaway SQLite
+# database before any test module imports it
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'test.db')}"
+
+import fakeredis  # noqa: E402
+from app.core import redis_client  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def redis():
+    """In-memory Redis (with Lua scripting) in place of REDIS_URL, fresh for every test"""
+    previous = redis_client._client
+    redis_client._client = fakeredis.FakeRedis()
+    yield redis_client._client
+    redis_client._client = previous
+
+
+@pytest.fixture
+def db():
+    """Session on the test database, emptied after the test"""
+    from app.core.database import SessionLocal, create_tables
+    from app.models.shop import Shop, ShopAlias
+
+    create_tables()
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.query(ShopAlias).delete()
+    session.query(Shop).delete()
+    session.commit()
+    session.close()
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from app.services.catalog_crawler import CatalogStats, PriceSketch
+
+
+def exact_percentile(values, q):
+    values = sorted(values)
+    return values[int(q / 100 * (len(values) - 1))]
+
+
+def test_empty_sketch_has_no_percentiles():
+    assert PriceSketch().percentile(50) is None
+
+
+def test_single_value_is_returned_exactly():
+    sketch = PriceSketch()
+    sketch.add(42.5)
+    assert [sketch.percentile(q) for q in (0, 50, 100)] == [42.5, 42.5, 42.5]
+
+
+@pytest.mark.parametrize("q", [1, 25, 50, 75, 99])
+def test_percentiles_are_within_the_relative_accuracy(q):
+    rng = random.Random(7)
+    prices = [round(rng.lognormvariate(3.5, 1.0), 2) for _ in range(5000)]
+    sketch = PriceSketch(accuracy=0.01)
+    for price in prices:
+        sketch.add(price)
+
+    exact = exact_percentile(prices, q)
+    assert sketch.percentile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_percentiles_stay_within_min_and_max():
+    sketch = PriceSketch(accuracy=0.05)
+    for price in (10.0, 10.0, 20.0):
+        sketch.add(price)
+
+    assert 10.0 <= sketch.percentile(0) <= sketch.percentile(100) <= 20.0
+    assert sketch.percentile(100) == pytest.approx(20.0, rel=0.05)
+
+
+def test_free_products_count_as_zero():
+    sketch = PriceSketch()
+    for price in (0, 0, 0, 30.0):
+        sketch.add(price)
+
+    assert sketch.percentile(50) == 0.0
+    assert sketch.percentile(100) == pytest.approx(30.0, rel=0.01)
+
+
+def test_memory_depends_on_the_price_range_not_the_count():
+    sketch = PriceSketch(accuracy=0.01)
+    rng = random.Random(1)
+    for _ in range(100000):
+        sketch.add(rng.uniform(10, 1000))
+    # log(100) / log(1.01 / 0.99) buckets cover 10..1000
+    assert len(sketch.buckets) <= 235
+
+
+def test_catalog_stats_price_products_at_their_cheapest_variant():
+    stats = CatalogStats()
+    stats.add_product({'variants': [{'price': '30.00'}, {'price': '20.00'}]})
+    stats.add_product({'variants': [{'price': None}]})
+    stats.add_collection({})
+
+    summary = stats.summary()
+    assert summary['product_count'] == 2
+    assert summary['collection_count'] == 1
+    assert summary['price_median'] == pytest.approx(20.0, rel=0.01)
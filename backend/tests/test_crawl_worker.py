@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.models.shop import Region, Shop, ShopStatus
+from app.services.crawl_worker import CrawlWorker
+from app.services.work_queue import WorkQueue
+
+
+# Page fingerprint carried by every pipeline result
+FINGERPRINT = {'content_digest': 'digest', 'content_simhash': 1}
+
+
+class FakePipeline:
+    """Stands in for CrawlPipeline; domains listed in errors fail to fetch"""
+
+    def __init__(self, errors=()):
+        self.errors = set(errors)
+        self.crawled = []
+
+    async def run(self, domains, *args):
+        for domain in domains:
+            self.crawled.append(domain)
+            if domain in self.errors:
+                yield {
+                    'domain': domain,
+                    'verification_result': {'is_shopify': False, 'confidence': 0.0, 'error': 'Connection reset'},
+                    'classification_result': {'is_womens_fashion': False, 'confidence': 0.0},
+                }
+                continue
+            yield {
+                'domain': domain,
+                'verification_result': {'is_shopify': True, 'confidence': 0.9, 'unchanged': True, **FINGERPRINT},
+                'classification_result': {'is_womens_fashion': True, 'confidence': 0.8, **FINGERPRINT},
+            }
+
+
+@pytest.fixture
+def queue(redis, monkeypatch):
+    monkeypatch.setattr(settings, "CRAWL_HOST_MIN_INTERVAL", 0)
+    return WorkQueue(client=redis, namespace="test:crawl", shards=1)
+
+
+def add_shops(db, *domains, status=ShopStatus.ACTIVE):
+    db.add_all([Shop(domain=domain, region=Region.EUROPE, status=status) for domain in domains])
+    db.commit()
+
+
+def test_shops_are_crawled_under_their_stored_domain(db, queue):
+    add_shops(db, "www.oldshop.com", "store.brand.com", "brand.com")
+    add_shops(db, "merged.com", status=ShopStatus.INACTIVE)
+    queue.enqueue(["www.oldshop.com", "store.brand.com", "brand.com", "merged.com", "unknown.com"])
+
+    pipeline = FakePipeline()
+    worker = CrawlWorker(queue=queue, pipeline=pipeline, batch_size=10)
+    totals = asyncio.run(worker.run(exit_when_empty=True))
+
+    assert sorted(pipeline.crawled) == ["brand.com", "store.brand.com", "www.oldshop.com"]
+    assert totals["crawled"] == 3
+    assert totals["dropped"] == 2
+    db.expire_all()
+    assert all(shop.last_checked for shop in db.query(Shop).filter(Shop.status == ShopStatus.ACTIVE))
+    assert queue.stats() == {"ready": 0, "leased": 0, "dead": 0}
+
+
+def test_fetch_errors_are_released_instead_of_stored(db, queue):
+    add_shops(db, "good.com", "flaky.com")
+    db.query(Shop).update({Shop.is_shopify: True})
+    db.commit()
+    queue.enqueue(["good.com", "flaky.com"])
+
+    worker = CrawlWorker(queue=queue, pipeline=FakePipeline(errors=["flaky.com"]), batch_size=10)
+    stats = asyncio.run(worker.process(queue.lease(10)))
+
+    assert stats["crawled"] == 1
+    assert stats["released"] == 1
+    db.expire_all()
+    flaky = db.query(Shop).filter(Shop.domain == "flaky.com").one()
+    # The failed fetch left the stored verdict alone
+    assert flaky.is_shopify
+    assert flaky.shopify_verified_at is None
+    assert queue.stats() == {"ready": 1, "leased": 0, "dead": 0}
@@ -0,0 +1,72 @@
+import pytest
+
+from app.utils.bloom import BloomFilter
+from app.utils.domains import is_valid_host, normalize_domain
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("shop.com", "shop.com"),
+    ("https://www.Shop.co.uk/collections/all?page=2", "shop.co.uk"),
+    ("WWW.SHOP.COM.", "shop.com"),
+    ("http://shop.com:8080", "shop.com"),
+    ("store.brand.com", "brand.com"),
+    ("foo.myshopify.com", "foo.myshopify.com"),
+    ("bücher.de", "xn--bcher-kva.de"),
+    ("https://www.bücher.de/", "xn--bcher-kva.de"),
+])
+def test_normalize_domain(raw, expected):
+    assert normalize_domain(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [
+    "", None, "localhost", "h&m.com", "shop_name.com", "-shop.com", "shop-.com", "shop..com", "http://", "a b.com",
+])
+def test_normalize_domain_rejects_invalid_hosts(raw):
+    assert normalize_domain(raw) is None
+
+
+def test_is_valid_host():
+    assert is_valid_host("xn--bcher-kva.de")
+    assert is_valid_host("a-b.c0m")
+    assert not is_valid_host("a" * 64 + ".com")
+    assert not is_valid_host(".".join(["a" * 50] * 6))
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    domains = [f"shop{i}.com" for i in range(1000)]
+    bloom.update(domains)
+
+    assert all(domain in bloom for domain in domains)
+    assert len(bloom) <= 1000
+
+
+def test_bloom_filter_add_reports_new_items():
+    bloom = BloomFilter(100)
+    assert bloom.add("shop.com")
+    assert not bloom.add("shop.com")
+    assert len(bloom) == 1
+
+
+def test_bloom_filter_false_positive_rate_stays_near_the_target():
+    bloom = BloomFilter(10000, 0.01)
+    bloom.update(f"shop{i}.com" for i in range(10000))
+
+    false_positives = sum(f"other{i}.com" in bloom for i in range(10000))
+    assert false_positives / 10000 < 0.02
+
+
+def test_bloom_filter_round_trips_through_bytes():
+    bloom = BloomFilter(1000, 0.01)
+    bloom.update(["a.com", "b.com"])
+
+    restored = BloomFilter.from_bytes(bloom.to_bytes())
+    assert (restored.num_bits, restored.num_hashes, len(restored)) == (bloom.num_bits, bloom.num_hashes, 2)
+    assert "a.com" in restored and "b.com" in restored
+    assert "c.com" not in restored
+
+
+def test_bloom_filter_rejects_truncated_payloads():
+    data = BloomFilter(1000).to_bytes()
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(data[:-1])
@@ -0,0 +1,47 @@
+from app.models.shop import Region, Shop
+from app.services.facets import SCORE_BUCKETS, _histogram, compute_facets
+
+
+def test_histogram_clamps_out_of_range_buckets():
+    histogram = _histogram({-1: 2, 0: 1, 9: 3, 10: 4})
+
+    assert len(histogram) == SCORE_BUCKETS
+    assert histogram[0] == {"lower": 0.0, "upper": 1.0, "count": 3}
+    # A perfect 10 falls in the last bucket
+    assert histogram[-1] == {"lower": 9.0, "upper": 10.0, "count": 7}
+    assert sum(bucket["count"] for bucket in histogram) == 10
+
+
+def test_compute_facets_buckets_scores(db):
+    db.add_all([
+        Shop(domain="a.com", region=Region.EUROPE, is_shopify=True, overall_score=0.0, seo_score=9.99),
+        Shop(domain="b.com", region=Region.EUROPE, is_shopify=True, overall_score=4.5, seo_score=10.0),
+        Shop(domain="c.com", region=Region.NORTH_AMERICA, overall_score=4.99, seo_score=None),
+    ])
+    db.commit()
+
+    facets = compute_facets(db)
+
+    assert facets["total"] == 3
+    assert facets["regions"] == {"north_america": 1, "europe": 2, "middle_east": 0}
+    assert facets["is_shopify"] == {"true": 2, "false": 1}
+    overall = [bucket["count"] for bucket in facets["score_histograms"]["overall_score"]]
+    assert overall == [1, 0, 0, 0, 2, 0, 0, 0, 0, 0]
+    # A missing score counts as 0, 9.99 and 10 share the last bucket
+    seo = [bucket["count"] for bucket in facets["score_histograms"]["seo_score"]]
+    assert seo == [1, 0, 0, 0, 0, 0, 0, 0, 0, 2]
+
+
+def test_compute_facets_applies_filters(db):
+    db.add_all([
+        Shop(domain="a.com", region=Region.EUROPE, is_shopify=True, is_womens_fashion=True),
+        Shop(domain="b.com", region=Region.EUROPE, is_shopify=False, is_womens_fashion=True),
+        Shop(domain="c.com", region=Region.MIDDLE_EAST, is_shopify=True, is_womens_fashion=False),
+    ])
+    db.commit()
+
+    facets = compute_facets(db, region=Region.EUROPE, is_shopify=True)
+
+    assert facets["total"] == 1
+    assert facets["regions"]["middle_east"] == 0
+    assert facets["is_womens_fashion"] == {"true": 1, "false": 0}
@@ -0,0 +1,37 @@
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import metrics
+from app.core.metrics import (
+    PoolCollector, capture_classification_timings, observe_classification,
+    record_classification_timings
+)
+
+
+def classification_count(stage):
+    return REGISTRY.get_sample_value('topshope_classification_duration_seconds_count', {'stage': stage}) or 0
+
+
+def test_captured_timings_are_recorded_only_when_replayed():
+    before = classification_count('analysis')
+    with capture_classification_timings() as timings:
+        observe_classification('analysis', 0.5)
+        observe_classification('model', 1.5)
+
+    assert timings == [('analysis', 0.5), ('model', 1.5)]
+    assert classification_count('analysis') == before
+
+    record_classification_timings(timings)
+    assert classification_count('analysis') == before + 1
+
+
+def test_pool_gauges_are_in_the_multiprocess_registry(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=3)
+    monkeypatch.setattr(metrics, '_live_collectors', [PoolCollector(engine)])
+
+    registry = metrics._registry()
+
+    assert isinstance(registry, CollectorRegistry)
+    assert b'topshope_db_pool_size 3.0' in generate_latest(registry)
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.models.shop import Region, Shop
+from app.services.result_writer import ResultWriter, classification_values, detection_values
+
+DETECTION = {'is_shopify': True, 'confidence': 0.9, 'content_digest': 'abc', 'content_simhash': 7, 'timings': {}}
+CLASSIFICATION = {'is_womens_fashion': True, 'confidence': 0.75, 'content_digest': 'abc', 'content_simhash': 7}
+
+
+class CapturingSession:
+    """Records the statements a ResultWriter executes, as if bound to PostgreSQL"""
+
+    class _Bind:
+        dialect = postgresql.dialect()
+
+    def __init__(self):
+        self.statements = []
+
+    def get_bind(self):
+        return self._Bind()
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_detection_values_skip_unchanged_pages():
+    checked_at = datetime(2024, 1, 1)
+    assert detection_values("shop.com", {'unchanged': True}, checked_at) == {'last_checked': checked_at}
+
+
+def test_errors_keep_the_stored_fingerprint():
+    row = detection_values("shop.com", {'is_shopify': False, 'confidence': 0.0, 'error': 'timeout'})
+    assert row['is_shopify'] is False
+    assert 'content_digest' not in row and 'last_detection_result' not in row
+
+    row = classification_values({'is_womens_fashion': False, 'confidence': 0.0, 'error': 'timeout'})
+    assert 'content_digest' not in row
+
+
+def test_stage_timings_are_not_stored():
+    assert 'timings' not in detection_values("shop.com", DETECTION)['last_detection_result']
+
+
+def test_postgres_flush_is_one_update_from_values_per_column_set():
+    db = CapturingSession()
+    writer = ResultWriter(db=db, batch_size=100)
+    writer.add_detection(1, "a.com", DETECTION)
+    writer.add_classification(1, CLASSIFICATION)
+    writer.add_detection(2, "b.com", DETECTION)
+    writer.add_classification(2, CLASSIFICATION)
+    writer.add_latency(3, {'ttfb': [0.1], 'total': [0.2]})
+
+    assert writer.flush() == 3
+    assert len(db.statements) == 2
+    sql = [str(statement) for statement in db.statements]
+    assert all(text.startswith("UPDATE shops SET") and "FROM (VALUES" in text for text in sql)
+    assert all("WHERE shops.id = v.id" in text for text in sql)
+    merged = next(text for text in sql if "is_womens_fashion" in text)
+    # Both shops of the merged column set go in one VALUES list
+    assert merged.count("), (") == 1
+
+
+def test_flush_splits_groups_into_batches():
+    db = CapturingSession()
+    writer = ResultWriter(db=db, batch_size=2)
+    for shop_id in range(5):
+        writer.add_latency(shop_id, {'ttfb': [0.1]})
+    writer.flush()
+
+    # add() flushed twice on full batches, the last flush writes the remaining shop
+    assert len(db.statements) == 3
+
+
+def test_writes_rows_on_sqlite(db):
+    db.add_all([Shop(domain="a.com", region=Region.EUROPE), Shop(domain="b.com", region=Region.EUROPE)])
+    db.commit()
+    ids = {shop.domain: shop.id for shop in db.query(Shop)}
+
+    with ResultWriter(flush_interval=0) as writer:
+        writer.add_detection(ids["a.com"], "a.com", DETECTION)
+        writer.add_classification(ids["a.com"], CLASSIFICATION)
+        writer.add_latency(ids["b.com"], {'ttfb': [0.1]})
+
+    db.expire_all()
+    a, b = db.query(Shop).order_by(Shop.domain).all()
+    assert (a.is_shopify, a.is_womens_fashion, a.category_confidence, a.content_digest) == (True, True, 0.75, 'abc')
+    assert b.fetch_latency == {'ttfb': [0.1]}
+    assert not b.is_shopify
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set")
+def test_update_from_values_on_postgres():
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            session = Session(bind=connection)
+            shops = [Shop(domain=f"writer-test-{i}.example", region=Region.EUROPE) for i in range(3)]
+            session.add_all(shops)
+            session.flush()
+
+            writer = ResultWriter(db=session)
+            for shop in shops:
+                writer.add_detection(shop.id, shop.domain, DETECTION)
+                writer.add_classification(shop.id, CLASSIFICATION)
+            writer.add_latency(shops[0].id, {'ttfb': [0.1]})
+            assert writer.flush() == 3
+
+            session.expire_all()
+            stored = session.query(Shop).filter(Shop.id.in_([shop.id for shop in shops])).all()
+            assert all(shop.is_shopify and shop.content_simhash == 7 for shop in stored)
+            assert {shop.fetch_latency is not None for shop in stored} == {True, False}
+        finally:
+            transaction.rollback()
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.work_queue import Lease, WorkQueue
+
+
+@pytest.fixture
+def queue(redis, monkeypatch):
+    monkeypatch.setattr(settings, "CRAWL_HOST_MIN_INTERVAL", 0)
+    monkeypatch.setattr(settings, "CRAWL_MAX_ATTEMPTS", 3)
+    return WorkQueue(client=redis, namespace="test:crawl", shards=4)
+
+
+def lease_all(queue: WorkQueue, count: int = 100, **kwargs):
+    """Lease from every shard until no due item is left"""
+    leases = []
+    while True:
+        lease = queue.lease(count, **kwargs)
+        if lease is None:
+            return leases
+        leases.append(lease)
+
+
+def test_items_keep_the_stored_domain(queue):
+    assert queue.enqueue(["www.oldshop.com", "store.brand.com", "brand.com"]) == 3
+
+    leased = {item for lease in lease_all(queue) for item in lease.items}
+    assert leased == {"www.oldshop.com", "store.brand.com", "brand.com"}
+
+
+def test_shops_of_one_host_share_a_shard(queue):
+    assert queue.shard_of("store.brand.com") == queue.shard_of("brand.com") == queue.shard_of("www.brand.com")
+    assert queue.host_key("https://www.Brand.com/") == "brand.com"
+
+
+def test_enqueue_skips_queued_and_leased_items(queue):
+    assert queue.enqueue(["a.com", "b.com"]) == 2
+    assert queue.enqueue(["a.com", " b.com "]) == 0
+
+    lease_all(queue)
+    assert queue.enqueue(["a.com"]) == 0
+    assert queue.stats() == {"ready": 0, "leased": 2, "dead": 0}
+
+
+def test_lease_respects_the_host_politeness_window(queue, monkeypatch):
+    monkeypatch.setattr(settings, "CRAWL_HOST_MIN_INTERVAL", 60)
+    queue.enqueue(["brand.com", "store.brand.com", "other.com"])
+
+    leases = lease_all(queue)
+    leased = [item for lease in leases for item in lease.items]
+    assert "other.com" in leased
+    # Only one shop of brand.com is crawled, the other waits for the window
+    assert len({"brand.com", "store.brand.com"} & set(leased)) == 1
+    assert queue.stats() == {"ready": 1, "leased": 2, "dead": 0}
+
+    # Queued again within its window, a host is not due before the window ends
+    for lease in leases:
+        queue.ack(lease)
+    assert queue.enqueue(["other.com"]) == 1
+    assert queue.lease(10) is None
+
+
+def test_heartbeat_renews_only_held_items(queue):
+    queue.enqueue(["a.com"])
+    lease = queue.lease(10)
+
+    assert queue.heartbeat(lease) == {"a.com"}
+    assert queue.heartbeat(Lease(lease.shard, "someone-else", lease.items)) == set()
+
+
+def test_ack_removes_items_and_ignores_foreign_tokens(queue):
+    queue.enqueue(["a.com"])
+    lease = queue.lease(10)
+
+    assert queue.ack(Lease(lease.shard, "someone-else", lease.items)) == 0
+    assert queue.ack(lease) == 1
+    assert queue.stats() == {"ready": 0, "leased": 0, "dead": 0}
+    # Acknowledged items can be queued again
+    assert queue.enqueue(["a.com"]) == 1
+
+
+def test_expired_leases_are_reclaimed(queue):
+    queue.enqueue(["a.com"])
+    first = queue.lease(10, visibility_timeout=0.05)
+    assert first.attempts == {"a.com": 1}
+
+    time.sleep(0.1)
+    second = queue.lease(10)
+    assert second.items == ["a.com"]
+    assert second.attempts == {"a.com": 2}
+
+    # The first worker lost its lease and can no longer acknowledge or renew it
+    assert queue.heartbeat(first) == set()
+    assert queue.ack(first) == 0
+    assert queue.ack(second) == 1
+
+
+def test_released_items_are_retried_then_dead_lettered(queue):
+    queue.enqueue(["a.com"])
+    for attempt in range(1, settings.CRAWL_MAX_ATTEMPTS):
+        lease = queue.lease(10)
+        assert lease.attempts == {"a.com": attempt}
+        assert queue.release(lease, delay=0) == 1
+
+    lease = queue.lease(10)
+    assert queue.release(lease, delay=0) == 0
+    assert queue.stats() == {"ready": 0, "leased": 0, "dead": 1}
+
+
+def test_expired_leases_are_dead_lettered_after_max_attempts(queue):
+    queue.enqueue(["a.com"])
+    for _ in range(settings.CRAWL_MAX_ATTEMPTS):
+        assert queue.lease(10, visibility_timeout=0.01) is not None
+        time.sleep(0.03)
+
+    assert queue.lease(10) is None
+    assert queue.stats() == {"ready": 0, "leased": 0, "dead": 1}
+
+
+def test_release_delays_the_retry(queue):
+    queue.enqueue(["a.com"])
+    queue.release(queue.lease(10), delay=60)
+
+    assert queue.lease(10) is None
+    assert queue.stats()["ready"] == 1
@@ -13,6 +13,7 @@ export enum ShopStatus {
 export interface Shop {
   id: number;
   domain: string;
+  canonical_domain?: string;
   name?: string;
   region: Region;
   description?: string;
@@ -26,6 +27,13 @@ export interface Shop {
   social_media_score: number;
   seo_score: number;
   overall_score: number;
+  catalog_product_count?: number;
+  catalog_collection_count?: number;
+  catalog_price_p25?: number;
+  catalog_price_median?: number;
+  catalog_price_p75?: number;
+  catalog_womenswear_share?: number;
+  catalog_crawled_at?: string;
   status: ShopStatus;
   last_checked: string;
   created_at: string;